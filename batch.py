@@ -0,0 +1,165 @@
+# batch.py
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from file_parser import MapFormatError, load_grid
+from grid import FOUR_CONNECTED, EIGHT_CONNECTED, CORNERS_BLOCKED, CORNER_RULES
+import hpa
+import tour
+from stats import SearchStats
+from script import ALGORITHMS, INEXACT_ALGORITHMS, select_algorithm, convert_path_to_directions, search_goals, optimality_gaps
+
+# Columns of the CSV report, in order
+REPORT_FIELDS = ['map', 'algorithm', 'goals_reached', 'path', 'directions', 'node_count', 'phase_node_counts', 'wall_time', 'stats', 'error']
+
+# Name used in reports for the --tour mode, which plans all goals from a distance matrix instead of running an algorithm
+TOUR = 'TOUR'
+
+def run_job(input_file, algorithm_name, find_all_goals=False, connectivity=FOUR_CONNECTED, corner_rule=CORNERS_BLOCKED,
+            collect_stats=False, trace_memory=False):
+    """Solve one (map, algorithm) pair without a GUI and return its report record.
+
+    With collect_stats the record also holds the search metrics (see stats.SearchStats), summed over every goal's search,
+    and for BEAM and SMASTAR each search's optimality gap (see script.optimality_gaps); trace_memory adds the peak
+    memory, at the cost of slower searches.
+    """
+    record = {'map': input_file, 'algorithm': algorithm_name.upper()}
+
+    # Binary maps load straight into the grid buffer; a bad map becomes the record's error
+    try:
+        grid, markers, goals = load_grid(input_file)
+    except (OSError, MapFormatError) as e:
+        record['error'] = f"Error: {e}"
+        return record
+    grid.set_connectivity(connectivity, corner_rule)
+
+    if record['algorithm'] == TOUR:
+        start_time = time.perf_counter()
+        result = tour.solve_tour(grid, markers[0], goals)
+        wall_time = time.perf_counter() - start_time
+
+        node_counts = result['node_counts']
+        final_path = result['path'] or []
+        record['goals_reached'] = result['order']
+        record['path'] = final_path
+        record['directions'] = convert_path_to_directions(final_path)
+        record['node_count'] = node_counts['distance_matrix'] + node_counts['stitching']
+        record['phase_node_counts'] = {'distance_matrix': node_counts['distance_matrix'], 'stitching': node_counts['stitching']}
+        record['wall_time'] = wall_time
+        return record
+
+    algorithm = select_algorithm(algorithm_name)
+    if record['algorithm'] == 'HPA':
+        hpa.abstract_graph(grid, map_file=input_file)  # Load (or build and save) the abstract graph outside the timed search
+
+    goals_reached = []
+    final_path = []
+    total_node_count = 0
+    paths = []
+    stats = SearchStats(trace_memory=trace_memory) if collect_stats else None
+
+    # Searches may print to the console, so keep their output out of the report
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for path, node_count in search_goals(algorithm, grid, markers[0], goals, find_all_goals, stats=stats):
+            total_node_count += node_count
+            paths.append(path)
+            if path:
+                goals_reached.append(path[-1])
+                final_path.extend(path[1:] if final_path else path)
+    wall_time = time.perf_counter() - start_time
+
+    record['goals_reached'] = goals_reached
+    record['path'] = final_path
+    record['directions'] = convert_path_to_directions(final_path)
+    record['node_count'] = total_node_count
+    record['wall_time'] = wall_time
+    if stats is not None:
+        record['stats'] = stats.as_dict()
+        if record['algorithm'] in INEXACT_ALGORITHMS:
+            record['stats']['optimality_gaps'] = optimality_gaps(grid, markers[0], goals, paths)
+    return record
+
+def run_batch(input_files, algorithm_names, find_all_goals=False, jobs=None, connectivity=FOUR_CONNECTED, corner_rule=CORNERS_BLOCKED,
+              collect_stats=False, trace_memory=False):
+    """Run every (map, algorithm) pair across a process pool and return the records in input order."""
+    pairs = [(input_file, algorithm_name) for input_file in input_files for algorithm_name in algorithm_names]
+    if not pairs:
+        return []
+
+    options = (find_all_goals, connectivity, corner_rule, collect_stats, trace_memory)
+    if jobs == 1:
+        return [run_job(input_file, algorithm_name, *options) for input_file, algorithm_name in pairs]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(run_job, input_file, algorithm_name, *options)
+                   for input_file, algorithm_name in pairs]
+        return [future.result() for future in futures]
+
+def write_report(records, output=None):
+    """Write the records as CSV if the output file ends in .csv, otherwise as JSON (to stdout if no file is given)."""
+    if output and output.lower().endswith('.csv'):
+        with open(output, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            for record in records:
+                row = dict(record)
+                for field in ('goals_reached', 'path', 'directions', 'phase_node_counts', 'stats'):
+                    if field in row:
+                        row[field] = json.dumps(row[field])  # Store list fields as JSON text in a single cell
+                writer.writerow(row)
+    else:
+        # One record per line keeps long paths readable and reports easy to diff
+        text = "[\n" + ",\n".join(json.dumps(record) for record in records) + "\n]\n"
+        if output:
+            with open(output, 'w') as file:
+                file.write(text)
+        else:
+            sys.stdout.write(text)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='script.py --batch', description='Run searches headlessly over many maps.')
+    parser.add_argument('--batch', nargs='+', required=True, metavar='INPUT_FILE', help='map files to solve')
+    parser.add_argument('--algorithms', default='ALL', help='comma separated algorithm names, or ALL (default)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='number of worker processes (default: CPU count)')
+    parser.add_argument('--all-goals', action='store_true', help='visit every goal instead of stopping at the first')
+    parser.add_argument('--tour', action='store_true', help='also plan each map\'s full goal tour from a distance matrix (reported as TOUR)')
+    parser.add_argument('--connectivity', type=int, choices=(FOUR_CONNECTED, EIGHT_CONNECTED), default=FOUR_CONNECTED, help='4 (default) or 8 to allow diagonal moves')
+    parser.add_argument('--corners', choices=CORNER_RULES, default=CORNERS_BLOCKED, help='corner rule for diagonal moves (default: blocked)')
+    parser.add_argument('--stats', action='store_true', help='add the search metrics (expansions, heap pushes, phase times, ...) to every record, and the optimality gap of BEAM and SMASTAR')
+    parser.add_argument('--trace-memory', action='store_true', help='with --stats, also measure peak memory (slows the searches down)')
+    parser.add_argument('--output', help='report file (.json or .csv); JSON goes to stdout if omitted')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.algorithms.upper() == 'ALL':
+        algorithm_names = list(ALGORITHMS)
+    else:
+        algorithm_names = [name.strip().upper() for name in args.algorithms.split(',') if name.strip()]
+        for algorithm_name in algorithm_names:
+            if select_algorithm(algorithm_name) is None:
+                print(f"Error: Algorithm '{algorithm_name}' not recognized.")
+                print("Available algorithms:", ", ".join(ALGORITHMS))
+                sys.exit(1)
+
+    if args.tour:
+        algorithm_names.append(TOUR)
+
+    start_time = time.perf_counter()
+    records = run_batch(args.batch, algorithm_names, args.all_goals, args.jobs, args.connectivity, args.corners, args.stats, args.trace_memory)
+    write_report(records, args.output)
+
+    if args.output:
+        print(f"Solved {len(records)} (map, algorithm) pairs in {time.perf_counter() - start_time:.2f}s, report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,502 @@
+# benchmark.py
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from grid import clip_walls, create_grid, fill_wall_slices, fill_wall_sweep, rasterize_walls
+import hpa
+from dstar_lite import DynamicPlanner
+from memory_bounded import optimality_gap
+from multi_agent import route_agents
+from wavefront import distance_field, field_path
+from map_generator import GENERATORS, generate_map, write_map_file
+from script import ALGORITHMS, select_algorithm
+from stats import SearchStats
+
+DEFAULT_SIZES = [10, 64, 256, 1024, 4096]
+
+def time_search(algorithm, grid, start, goals, repeats=3, warmup=1):
+    """Run a search (after warm-up runs) several times and return the list of wall times, the path and the node count."""
+    for _ in range(warmup):
+        algorithm(grid, start, goals)
+
+    times = []
+    path, node_count = None, 0
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        path, node_count = algorithm(grid, start, goals)
+        times.append(time.perf_counter() - start_time)
+    return times, path, node_count
+
+def peak_memory(algorithm, grid, start, goals):
+    """Run a search once under tracemalloc and return the peak number of bytes it allocated."""
+    tracemalloc.start()
+    try:
+        algorithm(grid, start, goals)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def bfs_scaling(sizes, repeats=3):
+    """Time BFS across empty square grids of growing size; time per node should stay flat if BFS is linear."""
+    print(f"{'size':>11} {'cells':>10} {'nodes':>10} {'seconds':>9} {'us/node':>8}")
+    for size in sizes:
+        # Start and goal in opposite corners so BFS expands (almost) the whole grid
+        start = (0, 0)
+        goals = [(size - 1, size - 1)]
+        grid = create_grid(size, size, [start], goals)
+
+        times, path, node_count = time_search(select_algorithm('BFS'), grid, start, goals, repeats, warmup=0)
+        seconds = min(times)
+        print(f"{size:>5}x{size:<5} {size * size:>10} {node_count:>10} {seconds:>9.3f} {seconds / node_count * 1e6:>8.2f}")
+
+def hpa_latency(sizes, queries=50, seed=0, map_kind='random', cluster_size=hpa.CLUSTER_SIZE):
+    """Compare the per-query latency of HPA* against plain A* on random start/goal pairs of the same maps.
+
+    The one-off cost of building the abstract graph is reported separately, since a saved graph is reused by every query.
+    """
+    print(f"{'map':<12}{'size':>6} {'build s':>8} {'algorithm':<10}{'mean ms':>10}{'p95 ms':>10}{'nodes':>10}{'length':>8}")
+    for size in sizes:
+        rows, cols, markers, goals, walls = generate_map(map_kind, size, seed)
+        grid = create_grid(rows, cols, markers, goals, walls)
+
+        start_time = time.perf_counter()
+        graph = hpa.build_abstract_graph(grid, cluster_size)
+        build_time = time.perf_counter() - start_time
+
+        # Random pairs of open cells that are connected, so both searches return a path
+        rng = random.Random(seed)
+        open_cells = [cell_id for cell_id in range(grid.size) if not grid.is_wall(cell_id)]
+        pairs = []
+        while len(pairs) < queries:
+            start, goal = grid.cell(rng.choice(open_cells)), grid.cell(rng.choice(open_cells))
+            if start != goal and hpa.hpa_star(grid, start, [goal], None, graph)[0]:
+                pairs.append((start, goal))
+
+        for algorithm_name, search in (('ASTAR', select_algorithm('ASTAR')), ('HPA', lambda grid, start, goals: hpa.hpa_star(grid, start, goals, None, graph))):
+            times, node_counts, lengths = [], [], []
+            for start, goal in pairs:
+                query_start = time.perf_counter()
+                path, node_count = search(grid, start, [goal])
+                times.append(time.perf_counter() - query_start)
+                node_counts.append(node_count)
+                lengths.append(len(path))
+            times.sort()
+            print(f"{map_kind:<12}{size:>6} {build_time:>8.2f} {algorithm_name:<10}{statistics.mean(times) * 1000:>10.2f}"
+                  f"{times[int(0.95 * (len(times) - 1))] * 1000:>10.2f}{statistics.mean(node_counts):>10.0f}{statistics.mean(lengths):>8.1f}")
+
+def raster_scaling(size=1024, wall_counts=(100, 1000, 10000), wall_sizes=(4, 32, 256), repeats=3, seed=0):
+    """Time wall rasterisation on a square grid across wall counts and wall sizes (the longest side of a random wall).
+
+    Reports both fill strategies and the one rasterize_walls picks, so the SWEEP_MIN_HEIGHT switch can be checked.
+    """
+    print(f"{'walls':>7} {'max side':>9} {'slices s':>9} {'sweep s':>9} {'auto s':>9}")
+    for wall_count in wall_counts:
+        for wall_size in wall_sizes:
+            rng = random.Random(seed)
+            walls = [(rng.randrange(size), rng.randrange(size), rng.randint(1, wall_size), rng.randint(1, wall_size))
+                     for _ in range(wall_count)]
+            bounds = clip_walls(size, size, walls)
+
+            fills = (lambda: fill_wall_slices(bytearray(size * size), size, bounds),
+                     lambda: fill_wall_sweep(bytearray(size * size), size, size, bounds),
+                     lambda: rasterize_walls(size, size, walls))
+            seconds = []
+            for fill in fills:
+                times = []
+                for _ in range(repeats):
+                    start_time = time.perf_counter()
+                    fill()
+                    times.append(time.perf_counter() - start_time)
+                seconds.append(min(times))
+            print(f"{wall_count:>7} {wall_size:>9} {seconds[0]:>9.4f} {seconds[1]:>9.4f} {seconds[2]:>9.4f}")
+
+def distance_field_speedup(sizes, queries=50, seed=0, map_kind='random'):
+    """Compare one distance field from the start against a BFS per goal, on random open goal cells of the same maps.
+
+    Reports the break-even point: how many goals a single field answers before it beats repeated searches.
+    """
+    print(f"{'map':<12}{'size':>6} {'field s':>8} {'bfs ms/goal':>12} {'paths ms/goal':>14} {'break-even goals':>17}")
+    for size in sizes:
+        rows, cols, markers, goals, walls = generate_map(map_kind, size, seed)
+        grid = create_grid(rows, cols, markers, goals, walls)
+        start = markers[0]
+        grid.neighbor_table()  # Built once per grid for every search, so keep it out of the timings
+
+        start_time = time.perf_counter()
+        field = distance_field(grid, [start])
+        field_time = time.perf_counter() - start_time
+
+        # Random open goal cells the start can reach, so every BFS has to find its path
+        rng = random.Random(seed)
+        reachable = [cell_id for cell_id in range(grid.size) if field[0][cell_id] > 0]
+        targets = [grid.cell(rng.choice(reachable)) for _ in range(queries)]
+
+        bfs = select_algorithm('BFS')
+        start_time = time.perf_counter()
+        for target in targets:
+            bfs(grid, start, [target])
+        bfs_time = (time.perf_counter() - start_time) / len(targets)
+
+        start_time = time.perf_counter()
+        for target in targets:
+            field_path(grid, field, target)
+        path_time = (time.perf_counter() - start_time) / len(targets)
+
+        print(f"{map_kind:<12}{size:>6} {field_time:>8.2f} {bfs_time * 1000:>12.2f} {path_time * 1000:>14.3f} {field_time / bfs_time:>17.1f}")
+
+def replan_latency(sizes, edits=50, seed=0, map_kind='random'):
+    """Compare repairing a D* Lite plan against a full A* re-run after each of a series of small wall edits.
+
+    Every edit either blocks a random cell of the current path or clears a random wall, so each repair has real work to do.
+    """
+    print(f"{'map':<12}{'size':>6} {'initial s':>10} {'repair ms':>10} {'astar ms':>10} {'repair nodes':>13} {'astar nodes':>12}")
+    astar = select_algorithm('ASTAR')
+    for size in sizes:
+        rows, cols, markers, goals, walls = generate_map(map_kind, size, seed)
+        grid = create_grid(rows, cols, markers, goals, walls)
+        start = markers[0]
+
+        start_time = time.perf_counter()
+        planner = DynamicPlanner(grid, start, goals)
+        path, _ = planner.plan()
+        initial_time = time.perf_counter() - start_time
+
+        rng = random.Random(seed)
+        wall_cells = [grid.cell(cell_id) for cell_id in range(grid.size) if grid.is_wall(cell_id)]
+        repair_times, astar_times, repair_nodes, astar_nodes = [], [], [], []
+        for _ in range(edits):
+            if path and len(path) > 2 and (not wall_cells or rng.random() < 0.5):
+                change = {'added': [rng.choice(path[1:-1])]}
+            elif wall_cells:
+                change = {'removed': [wall_cells.pop(rng.randrange(len(wall_cells)))]}
+            else:
+                break
+
+            start_time = time.perf_counter()
+            planner.set_walls(**change)
+            path, node_count = planner.plan()
+            repair_times.append(time.perf_counter() - start_time)
+            repair_nodes.append(node_count)
+
+            start_time = time.perf_counter()
+            _, node_count = astar(grid, start, goals)
+            astar_times.append(time.perf_counter() - start_time)
+            astar_nodes.append(node_count)
+
+        print(f"{map_kind:<12}{size:>6} {initial_time:>10.2f} {statistics.mean(repair_times) * 1000:>10.2f} {statistics.mean(astar_times) * 1000:>10.2f}"
+              f"{statistics.mean(repair_nodes):>14.0f}{statistics.mean(astar_nodes):>13.0f}")
+
+def agent_routing(sizes, agents=50, seed=0, map_kind='random', jobs=None):
+    """Compare routing many agents with route_agents against one A* call per agent, on the same maps.
+
+    'shared' sends every agent to the map's goals, so one reverse search answers them all; 'pool' gives every
+    agent a goal of its own and spreads the searches over a process pool of jobs workers.
+    """
+    print(f"{'map':<12}{'size':>6} {'agents':>7} {'loop s':>8} {'shared s':>9} {'speedup':>8} {'own goals s':>12} {'pool s':>8} {'speedup':>8}")
+    astar = select_algorithm('ASTAR')
+    for size in sizes:
+        rows, cols, markers, goals, walls = generate_map(map_kind, size, seed)
+        grid = create_grid(rows, cols, markers, goals, walls)
+        grid.neighbor_table()  # Built once per grid for every search, so keep it out of the timings
+
+        # Random open start and goal cells in the same area as the map's goals, so every query has a path
+        rng = random.Random(seed)
+        area = grid.component(grid.index(goals[0]))
+        open_cells = [grid.cell(cell_id) for cell_id in range(grid.size) if grid.component(cell_id) == area]
+        shared_queries = [(rng.choice(open_cells), goals) for _ in range(agents)]
+        own_queries = [(rng.choice(open_cells), [rng.choice(open_cells)]) for _ in range(agents)]
+
+        timings = []
+        for queries, run in ((shared_queries, None), (shared_queries, 1), (own_queries, None), (own_queries, jobs)):
+            start_time = time.perf_counter()
+            if run is None:
+                for start, query_goals in queries:
+                    astar(grid, start, query_goals)
+            else:
+                route_agents(grid, queries, astar, jobs=run)
+            timings.append(time.perf_counter() - start_time)
+
+        loop_time, shared_time, own_time, pool_time = timings
+        print(f"{map_kind:<12}{size:>6} {agents:>7} {loop_time:>8.2f} {shared_time:>9.2f} {loop_time / shared_time:>7.1f}x"
+              f" {own_time:>12.2f} {pool_time:>8.2f} {own_time / pool_time:>7.1f}x")
+
+def bounded_run(map_kind, size, seed, algorithm_name):
+    """Run one search in this (fresh) process and return its time, nodes, optimality gap and peak RSS in bytes.
+
+    The RSS is read before and after the search, once the map is built, so the search's own growth can be told apart.
+    """
+    import resource  # Unix only, so only imported where it is used
+    scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+
+    rows, cols, markers, goals, walls = generate_map(map_kind, size, seed)
+    grid = create_grid(rows, cols, markers, goals, walls)
+    grid.neighbor_table()
+    grid.component_labels()
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+    start_time = time.perf_counter()
+    path, node_count = select_algorithm(algorithm_name)(grid, markers[0], goals)
+    seconds = time.perf_counter() - start_time
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+    cost, optimal, gap = optimality_gap(grid, markers[0], goals, path)
+    return {'seconds': seconds, 'node_count': node_count, 'cost': cost, 'optimal': optimal, 'gap': gap,
+            'rss_before': before, 'rss_peak': after}
+
+def bounded_memory(sizes, map_kind='random', seed=0, algorithm_names=('ASTAR', 'SMASTAR', 'BEAM')):
+    """Compare the peak RSS, run time and optimality gap of the memory-bounded searches against A*.
+
+    Every search runs in a fresh process, since the peak RSS of a process never goes back down.
+    """
+    if importlib.util.find_spec('resource') is None:
+        print("Peak RSS needs the resource module, which this platform does not have.")
+        return
+
+    print(f"{'map':<12}{'size':>6} {'algorithm':<10}{'nodes':>9} {'cost':>8} {'gap %':>7} {'seconds':>8} {'peak RSS MB':>12} {'search MB':>10}")
+    context = multiprocessing.get_context('spawn')
+    for size in sizes:
+        for algorithm_name in algorithm_names:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(bounded_run, map_kind, size, seed, algorithm_name).result()
+            cost = '-' if result['cost'] is None else result['cost']
+            gap = '-' if result['cost'] is None else f"{result['gap'] * 100:.1f}"
+            print(f"{map_kind:<12}{size:>6} {algorithm_name:<10}{result['node_count']:>9} {cost:>8} {gap:>7} {result['seconds']:>8.2f}"
+                  f" {result['rss_peak'] / 2 ** 20:>12.1f} {(result['rss_peak'] - result['rss_before']) / 2 ** 20:>10.1f}")
+
+def heap_usage(sizes, map_kinds, algorithm_names=('ASTAR', 'GBFS'), repeats=3, seed=0):
+    """Report how much the priority queue of each search holds and churns through, next to its run time.
+
+    pushes/node close to 1 and no stale pops mean the heap only ever holds live entries; run the same command
+    on an older revision to see the reduction.
+    """
+    print(f"{'map':<12}{'size':>6} {'algorithm':<10}{'nodes':>9} {'pushes':>9} {'stale':>7} {'peak heap':>10} {'pushes/node':>12} {'ms':>9}")
+    for map_kind in map_kinds:
+        for size in sizes:
+            rows, cols, markers, goals, walls = generate_map(map_kind, size, seed)
+            grid = create_grid(rows, cols, markers, goals, walls)
+            grid.neighbor_table()  # Built once per grid for every search, so keep it out of the timings
+            for algorithm_name in algorithm_names:
+                algorithm = select_algorithm(algorithm_name)
+                stats = SearchStats()
+                algorithm(grid, markers[0], goals, stats=stats)
+                times, _, _ = time_search(algorithm, grid, markers[0], goals, repeats, warmup=0)
+                pushes_per_node = stats.heap_pushes / stats.expansions if stats.expansions else 0
+                print(f"{map_kind:<12}{size:>6} {algorithm_name:<10}{stats.expansions:>9} {stats.heap_pushes:>9} {stats.stale_pops:>7}"
+                      f" {stats.peak_frontier:>10} {pushes_per_node:>12.2f} {statistics.median(times) * 1000:>9.1f}")
+
+def run_suite(map_kinds, sizes, algorithm_names, repeats=3, warmup=1, seed=0, budget=30.0, map_dir=None):
+    """Benchmark every algorithm on every (map kind, size) and return one result record per run.
+
+    Sizes are run smallest first. If the previous size suggests a run would take longer than the budget
+    (in seconds), that algorithm is skipped for the remaining larger sizes of that map kind.
+    """
+    results = []
+    print(f"{'map':<12}{'size':>6} {'algorithm':<10}{'nodes':>10}{'path':>8}{'seconds':>10}{'nodes/s':>12}{'peak MB':>9}")
+
+    for kind in map_kinds:
+        last_time = {}  # Median time of the previous size per algorithm, used to predict the next one
+        previous_cells = None
+
+        for size in sorted(sizes):
+            rows, cols, markers, goals, walls = generate_map(kind, size, seed)
+            if map_dir:
+                write_map_file(f"{map_dir}/{kind}_{size}.txt", rows, cols, markers, goals, walls)
+            grid = create_grid(rows, cols, markers, goals, walls)
+            cells = rows * cols
+
+            for algorithm_name in algorithm_names:
+                record = {'map': kind, 'size': size, 'seed': seed, 'algorithm': algorithm_name}
+
+                # Skip this run if the previous size scaled by area would exceed the time budget
+                if algorithm_name in last_time and last_time[algorithm_name] * cells / previous_cells > budget:
+                    record['skipped'] = 'over budget'
+                    results.append(record)
+                    last_time[algorithm_name] = float('inf')
+                    print(f"{kind:<12}{size:>6} {algorithm_name:<10}{'skipped (over budget)':>40}")
+                    continue
+
+                algorithm = select_algorithm(algorithm_name)
+                try:
+                    # Some searches print progress to the console, which would be timed along with them
+                    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                        times, path, node_count = time_search(algorithm, grid, markers[0], goals, repeats, warmup)
+                        memory = peak_memory(algorithm, grid, markers[0], goals)
+                except RecursionError:
+                    record['skipped'] = 'recursion limit'
+                    results.append(record)
+                    last_time[algorithm_name] = float('inf')
+                    print(f"{kind:<12}{size:>6} {algorithm_name:<10}{'skipped (recursion limit)':>40}")
+                    continue
+
+                median = statistics.median(times)
+                last_time[algorithm_name] = median
+                record.update({
+                    'node_count': node_count,
+                    'path_length': len(path) if path else 0,
+                    'wall_time': median,
+                    'min_time': min(times),
+                    'nodes_per_sec': node_count / median if median else 0.0,
+                    'peak_memory': memory
+                })
+                results.append(record)
+                print(f"{kind:<12}{size:>6} {algorithm_name:<10}{node_count:>10}{record['path_length']:>8}"
+                      f"{median:>10.4f}{record['nodes_per_sec']:>12.0f}{memory / 1e6:>9.2f}")
+
+            previous_cells = cells
+
+    return results
+
+def git_revision():
+    """Return the current git commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def save_results(output_file, results, settings):
+    """Save the results with enough metadata to compare two revisions later."""
+    report = {
+        'revision': git_revision(),
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'settings': settings,
+        'results': results
+    }
+    with open(output_file, 'w') as file:
+        json.dump(report, file, indent=1)
+
+def compare_results(old_file, new_file, threshold=0.10):
+    """Print the time and memory change of every run present in both result files and return the regressions."""
+    with open(old_file) as file:
+        old = json.load(file)
+    with open(new_file) as file:
+        new = json.load(file)
+
+    def key(record):
+        return (record['map'], record['size'], record['algorithm'])
+
+    old_results = {key(record): record for record in old['results'] if 'wall_time' in record}
+    regressions = []
+
+    print(f"Comparing {old.get('revision')} -> {new.get('revision')}")
+    print(f"{'map':<12}{'size':>6} {'algorithm':<10}{'old s':>10}{'new s':>10}{'time':>8}{'memory':>8}{'nodes':>8}")
+    for record in new['results']:
+        previous = old_results.get(key(record))
+        if previous is None or 'wall_time' not in record:
+            continue
+        time_ratio = record['wall_time'] / previous['wall_time'] if previous['wall_time'] else 1.0
+        memory_ratio = record['peak_memory'] / previous['peak_memory'] if previous['peak_memory'] else 1.0
+        nodes = 'same' if record['node_count'] == previous['node_count'] else 'CHANGED'
+        flag = ''
+        if time_ratio > 1 + threshold or memory_ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions.append(key(record))
+        print(f"{record['map']:<12}{record['size']:>6} {record['algorithm']:<10}{previous['wall_time']:>10.4f}"
+              f"{record['wall_time']:>10.4f}{time_ratio:>7.2f}x{memory_ratio:>7.2f}x{nodes:>8}{flag}")
+
+    print(f"{len(regressions)} regression(s) above {threshold:.0%}")
+    return regressions
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Benchmark the search algorithms on seeded synthetic maps.')
+    parser.add_argument('--maps', default=','.join(GENERATORS), help='comma separated map kinds: ' + ', '.join(GENERATORS))
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='square map sizes (default: 10 64 256 1024 4096)')
+    parser.add_argument('--algorithms', default='DFS,BFS,GBFS,ASTAR,CUS1,CUS2', help='comma separated algorithm names, or ALL')
+    parser.add_argument('--repeats', type=int, default=3, help='timed runs per case; the median is reported')
+    parser.add_argument('--warmup', type=int, default=1, help='untimed runs before timing')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the map generators')
+    parser.add_argument('--budget', type=float, default=30.0, help='skip larger sizes once a run is predicted to exceed this many seconds')
+    parser.add_argument('--save', metavar='FILE', help='save the results as JSON')
+    parser.add_argument('--write-maps', metavar='DIR', help='also write the generated maps to this directory')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two saved result files instead of running')
+    parser.add_argument('--threshold', type=float, default=0.10, help='relative slowdown reported as a regression (default: 0.10)')
+    parser.add_argument('--bfs-scaling', type=int, nargs='*', metavar='SIZE', help='only run the BFS scaling check on empty maps')
+    parser.add_argument('--hpa-latency', type=int, nargs='*', metavar='SIZE', help='only compare HPA* and A* query latency, on the first --maps kind')
+    parser.add_argument('--raster', type=int, nargs='?', const=1024, metavar='SIZE', help='only time wall rasterisation on a SIZE x SIZE grid (default: 1024)')
+    parser.add_argument('--distance-field', type=int, nargs='*', metavar='SIZE', help='only compare one BFS distance field against a BFS per goal, on the first --maps kind')
+    parser.add_argument('--replan', type=int, nargs='*', metavar='SIZE', help='only compare D* Lite repairs against A* re-runs after small wall edits, on the first --maps kind')
+    parser.add_argument('--agents', type=int, nargs='*', metavar='SIZE', help='only compare batch agent routing against an A* call per agent, on the first --maps kind')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes for the --agents pool (default: one per CPU)')
+    parser.add_argument('--bounded', type=int, nargs='*', metavar='SIZE', help='only compare the peak RSS and optimality gap of SMASTAR and BEAM against ASTAR, on the first --maps kind')
+    parser.add_argument('--heap', type=int, nargs='*', metavar='SIZE', help='only report the priority queue use of ASTAR and GBFS, on every --maps kind')
+    parser.add_argument('--queries', type=int, default=50, help='random queries (edits for --replan, agents for --agents) per size for --hpa-latency, --distance-field, --replan and --agents (default: 50)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.compare:
+        regressions = compare_results(args.compare[0], args.compare[1], args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    if args.bfs_scaling is not None:
+        bfs_scaling(args.bfs_scaling or [125, 250, 500, 1000])
+        return
+
+    if args.raster is not None:
+        raster_scaling(args.raster, repeats=args.repeats, seed=args.seed)
+        return
+
+    if args.hpa_latency is not None:
+        hpa_latency(args.hpa_latency or [256, 1024], args.queries, args.seed, args.maps.split(',')[0].strip())
+        return
+
+    if args.distance_field is not None:
+        distance_field_speedup(args.distance_field or [256, 1024], args.queries, args.seed, args.maps.split(',')[0].strip())
+        return
+
+    if args.replan is not None:
+        replan_latency(args.replan or [256, 1024], args.queries, args.seed, args.maps.split(',')[0].strip())
+        return
+
+    if args.bounded is not None:
+        bounded_memory(args.bounded or [256, 1024], args.maps.split(',')[0].strip(), args.seed)
+        return
+
+    if args.agents is not None:
+        agent_routing(args.agents or [256, 1024], args.queries, args.seed, args.maps.split(',')[0].strip(), args.jobs)
+        return
+
+    map_kinds = [kind.strip() for kind in args.maps.split(',') if kind.strip()]
+    for kind in map_kinds:
+        if kind not in GENERATORS:
+            print(f"Error: Map kind '{kind}' not recognized.")
+            print("Available map kinds:", ", ".join(GENERATORS))
+            sys.exit(1)
+
+    if args.heap is not None:
+        heap_usage(args.heap or [256, 1024], map_kinds, repeats=args.repeats, seed=args.seed)
+        return
+
+    if args.algorithms.upper() == 'ALL':
+        algorithm_names = list(ALGORITHMS)
+    else:
+        algorithm_names = [name.strip().upper() for name in args.algorithms.split(',') if name.strip()]
+    for algorithm_name in algorithm_names:
+        if select_algorithm(algorithm_name) is None:
+            print(f"Error: Algorithm '{algorithm_name}' not recognized.")
+            print("Available algorithms:", ", ".join(ALGORITHMS))
+            sys.exit(1)
+
+    results = run_suite(map_kinds, args.sizes, algorithm_names, args.repeats, args.warmup, args.seed, args.budget, args.write_maps)
+
+    if args.save:
+        settings = {key: value for key, value in vars(args).items() if key not in ('compare', 'save', 'bfs_scaling', 'hpa_latency', 'raster', 'distance_field', 'replan', 'heap', 'agents', 'bounded', 'jobs', 'queries')}
+        save_results(args.save, results, settings)
+        print(f"Results saved to {args.save}")
+
+if __name__ == "__main__":
+    main()
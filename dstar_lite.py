@@ -0,0 +1,232 @@
+# dstar_lite.py
+
+import heapq
+from array import array
+from grid import WALL, EMPTY, EIGHT_CONNECTED
+from pathfinding import RESET, EXPANDED, GOAL, ids_to_cells, tie_break
+from stats import SETUP, SEARCH, RECONSTRUCTION
+
+# D* Lite: incremental replanning on a map whose walls change between queries.
+# The search runs backwards, from the goals towards the start, and keeps for every cell it has touched
+# g (its cost to the nearest goal as last expanded) and rhs (the one-step lookahead from its neighbours'
+# g values). A wall change only upsets the rhs values next to it, so repairing the plan re-expands the
+# cells whose cost actually changed instead of searching again from scratch. With a start that never
+# moves this is exactly LPA*; moving the start is handled with the usual key offset (km).
+
+INFINITE_COST = 2 ** 31 - 1  # g and rhs of cells with no known path to a goal
+
+class DynamicPlanner:
+    """Shortest paths from a start to the nearest of several goals, repaired after every batch of wall changes.
+
+    The planner changes the grid it is given: walls added or removed through it are applied to the
+    grid's cells (and neighbour masks) in place. Steps cost the terrain cost of the cell entered.
+    """
+
+    def __init__(self, grid, start, goals):
+        self.grid = grid
+        self.start_id = grid.index(start)
+        self.goal_ids = {grid.index(goal) for goal in goals}
+        self.min_cost = grid.min_cost()
+        self.km = 0  # Grows by the heuristic distance the start has moved, so old queue keys stay lower bounds
+
+        self.g = array('i', [INFINITE_COST]) * grid.size
+        self.rhs = array('i', [INFINITE_COST]) * grid.size
+        self.open_list = []  # (key, key tie-break, cell tie-break, cell id); stale entries are skipped when popped
+        self.queued = {}  # Cell id -> its current key, for the cells that are really in the queue
+        self.heap_pushes = 0  # Over the life of the planner, for the stats of each plan
+        self.stale_pops = 0
+
+        for goal_id in self.goal_ids:
+            if not grid.is_wall(goal_id):
+                self.rhs[goal_id] = 0
+                self.push(goal_id)
+
+    def heuristic(self, cell_id):
+        """Lower bound on the cost between the start and a cell: Manhattan (Chebyshev if 8-connected) steps at the cheapest cost."""
+        cols = self.grid.cols
+        row, col = divmod(cell_id, cols)
+        start_row, start_col = divmod(self.start_id, cols)
+        if self.grid.connectivity == EIGHT_CONNECTED:
+            steps = max(abs(row - start_row), abs(col - start_col))
+        else:
+            steps = abs(row - start_row) + abs(col - start_col)
+        return steps * self.min_cost
+
+    def key(self, cell_id):
+        """Queue key of a cell: the A*-like estimate through it, then its own cost to break ties."""
+        best = min(self.g[cell_id], self.rhs[cell_id])
+        if best == INFINITE_COST:
+            return (INFINITE_COST, INFINITE_COST)
+        return (best + self.heuristic(cell_id) + self.km, best)
+
+    def push(self, cell_id):
+        key = self.key(cell_id)
+        self.queued[cell_id] = key
+        heapq.heappush(self.open_list, (key[0], key[1], tie_break(self.grid, cell_id), cell_id))
+        self.heap_pushes += 1
+
+    def top(self):
+        """Drop stale entries off the queue and return the smallest (key, cell id), or None if it is empty."""
+        open_list = self.open_list
+        while open_list:
+            k1, k2, _, cell_id = open_list[0]
+            if self.queued.get(cell_id) == (k1, k2):
+                return (k1, k2), cell_id
+            heapq.heappop(open_list)
+            self.stale_pops += 1
+        return None
+
+    def lookahead(self, cell_id):
+        """Best cost to a goal through one of the cell's neighbours (the rhs value), from their current g values."""
+        if cell_id in self.goal_ids:
+            return 0 if not self.grid.is_wall(cell_id) else INFINITE_COST
+        if self.grid.is_wall(cell_id):
+            return INFINITE_COST
+        masks, moves = self.grid.neighbor_table()
+        costs = self.grid.costs
+        g = self.g
+        best = INFINITE_COST
+        for offset in moves[masks[cell_id]]:
+            neighbor = cell_id + offset
+            if g[neighbor] != INFINITE_COST:
+                best = min(best, g[neighbor] + (costs[neighbor] if costs is not None else 1))
+        return best
+
+    def update_cell(self, cell_id):
+        """Queue a cell whose g and rhs disagree (or take it out of the queue once they agree)."""
+        if self.g[cell_id] != self.rhs[cell_id]:
+            self.push(cell_id)
+        else:
+            self.queued.pop(cell_id, None)
+
+    def compute(self, events=None, stats=None):
+        """Expand cells until the start's cost is settled; returns the number of cells expanded and the peak queue length.
+
+        The peak is only tracked when stats are collected (it is 0 otherwise).
+        """
+        grid = self.grid
+        masks, moves = grid.neighbor_table()
+        costs = grid.costs
+        g, rhs = self.g, self.rhs
+        start_id = self.start_id
+        node_count = 0
+        peak_frontier = 0
+
+        while True:
+            if stats is not None and len(self.queued) > peak_frontier:
+                peak_frontier = len(self.queued)
+            top = self.top()
+            if top is None:
+                break
+            key, current = top
+            if key >= self.key(start_id) and rhs[start_id] == g[start_id]:
+                break
+
+            new_key = self.key(current)
+            if key < new_key:
+                self.push(current)  # The start moved since it was queued, so its key is out of date
+                continue
+
+            heapq.heappop(self.open_list)
+            del self.queued[current]
+            node_count += 1
+            if events is not None:
+                events.append((EXPANDED, current))
+
+            # The cells that can step onto current are its open neighbours (moves are symmetric), none for a wall
+            neighbors = [current + offset for offset in moves[masks[current]]] if not grid.is_wall(current) else []
+            step_cost = costs[current] if costs is not None else 1
+            if g[current] > rhs[current]:
+                # Overconsistent: current got cheaper, so settle it and offer the new cost to its neighbours
+                g[current] = rhs[current]
+                through_current = g[current] + step_cost
+                for neighbor in neighbors:
+                    if through_current < rhs[neighbor] and neighbor not in self.goal_ids:
+                        rhs[neighbor] = through_current
+                        self.update_cell(neighbor)
+            else:
+                # Underconsistent: current got dearer, so forget its cost and recheck every cell that relied on it
+                old_through_current = g[current] + step_cost
+                g[current] = INFINITE_COST
+                for neighbor in neighbors:
+                    if rhs[neighbor] == old_through_current:
+                        rhs[neighbor] = self.lookahead(neighbor)
+                        self.update_cell(neighbor)
+                rhs[current] = self.lookahead(current)
+                self.update_cell(current)
+
+        return node_count, peak_frontier
+
+    def plan(self, events=None, stats=None):
+        """Repair the search after any changes and return (path, node_count) like the searches in pathfinding.
+
+        node_count (and stats, if given) only cover the work of this call, so after a small change they stay small.
+        """
+        if stats is not None:
+            stats.begin()
+            pushes, stale_pops = self.heap_pushes, self.stale_pops
+            stats.phase(SETUP)
+
+        if events is not None:
+            events.append((RESET, -1))
+        node_count, peak_frontier = self.compute(events, stats)
+        if stats is not None:
+            pushes, stale_pops = self.heap_pushes - pushes, self.stale_pops - stale_pops
+        if self.g[self.start_id] == INFINITE_COST:
+            if stats is not None:
+                stats.end(SEARCH, node_count, pushes, pushes, stale_pops, peak_frontier)
+            return None, node_count
+
+        if stats is not None:
+            stats.phase(SEARCH)
+
+        # Walk downhill from the start: every step goes to the neighbour with the cheapest cost to a goal
+        grid = self.grid
+        masks, moves = grid.neighbor_table()
+        costs = grid.costs
+        g = self.g
+        path = [self.start_id]
+        current = self.start_id
+        while current not in self.goal_ids:
+            best, best_cost = None, INFINITE_COST
+            for offset in moves[masks[current]]:
+                neighbor = current + offset
+                if g[neighbor] != INFINITE_COST and g[neighbor] + (costs[neighbor] if costs is not None else 1) < best_cost:
+                    best, best_cost = neighbor, g[neighbor] + (costs[neighbor] if costs is not None else 1)
+            current = best
+            path.append(current)
+        if events is not None:
+            events.append((GOAL, current))
+        path = ids_to_cells(grid, path)
+        if stats is not None:
+            stats.end(RECONSTRUCTION, node_count, pushes, pushes, stale_pops, peak_frontier)
+        return path, node_count
+
+    def move_start(self, start):
+        """Move the start (e.g. after following the path for a few steps); the next plan carries on from there."""
+        start_id = self.grid.index(start)
+        self.km += self.heuristic(start_id)  # Heuristic distance between the old start and the new one
+        self.start_id = start_id
+
+    def set_walls(self, added=(), removed=()):
+        """Apply a batch of wall changes, given as (col, row) cells, and mark the cells whose costs they affect.
+
+        The grid is updated at once; the search itself is only repaired by the next plan call.
+        """
+        grid = self.grid
+        added = [grid.index(cell) for cell in added if not grid.is_wall(grid.index(cell))]
+        removed = [grid.index(cell) for cell in removed if grid.is_wall(grid.index(cell))]
+        grid.set_cells(added, WALL)
+        grid.set_cells(removed, EMPTY)
+
+        # A wall changes the moves of the 3x3 block around it (diagonals included), so recheck those cells
+        cols = grid.cols
+        changed = set()
+        for cell_id in added + removed:
+            row, col = divmod(cell_id, cols)
+            for r in range(max(row - 1, 0), min(row + 2, grid.rows)):
+                for c in range(max(col - 1, 0), min(col + 2, cols)):
+                    changed.add(r * cols + c)
+        for cell_id in changed:
+            self.rhs[cell_id] = self.lookahead(cell_id)
+            self.update_cell(cell_id)
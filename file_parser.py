@@ -1,46 +1,254 @@
 # file_parser.py
 
-def parse_coordinates(coord_string):
-    """Helper function to parse a string of coordinates in the format (col, row)."""
-    coord_string = coord_string.split(')')[0] + ')'
-    coord = coord_string.strip('()').split(',')
-    return tuple(map(int, coord))
+import argparse
+import mmap
+import re
+import struct
+import sys
+from grid import Grid, WALL, WALL_MASK, MARKER, GOAL, UNIT_COST, MAX_COST, create_grid
+
+# Text format:
+#   [rows,cols]
+#   (col,row)                  start marker
+#   (col,row) | (col,row) ...  goals
+#   (col,row,width,height)     one wall rectangle per line, blank lines are ignored
+#   (col,row,width,height,cost)  or a terrain rectangle whose cells cost that much to enter
+
+DIMENSIONS = re.compile(r'\[\s*(\d+)\s*,\s*(\d+)\s*\]')
+CELL = re.compile(r'\(\s*(-?\d+)\s*,\s*(-?\d+)\s*\)')
+WALL_RECT = re.compile(r'\(\s*(-?\d+)\s*,\s*(-?\d+)\s*,\s*(-?\d+)\s*,\s*(-?\d+)\s*\)')
+TERRAIN_RECT = re.compile(r'\(\s*(-?\d+)\s*,\s*(-?\d+)\s*,\s*(-?\d+)\s*,\s*(-?\d+)\s*,\s*(\d+)\s*\)')
+WALL_RUN = re.compile(b'\x01+')  # A run of walls in a WALL_MASK-translated row
+TERRAIN_RUN = re.compile(b'([^\x01])\\1*', re.DOTALL)  # A run of cells with the same cost other than UNIT_COST
+
+# Binary format: a fixed header, the goals, then one bit per cell (1 for walls), row by row and least
+# significant bit first, and with FLAG_COSTS one cost byte per cell after that. Little-endian throughout.
+MAGIC = b'GMAP'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIIII')  # Magic, version, flags, rows, cols, start col, start row, goal count
+GOAL_ENTRY = struct.Struct('<II')  # Goal col, row
+FLAG_COSTS = 1  # The map has terrain costs
+
+WALL_DIGITS = bytes.maketrans(b'\x00\x01', b'01')  # Wall mask bytes to '0'/'1' digits
+BIT_PLANES = [bytes(WALL if value >> bit & 1 else 0 for value in range(256)) for bit in range(8)]  # Raster byte -> cell of one bit
+
+class MapFormatError(ValueError):
+    """A map file that cannot be parsed, with the file name and line number in the message."""
+
+    def __init__(self, source, line_number, message):
+        location = f"{source}, line {line_number}" if line_number else source
+        super().__init__(f"{location}: {message}")
+        self.source = source
+        self.line_number = line_number
+
+def parse_text_map(lines, source='<map>'):
+    """Parse the text format from any iterable of lines, one line at a time.
+
+    Returns (rows, cols, markers, goals, walls). Raises MapFormatError naming the line of the first problem.
+    """
+    line_number = 0
+    header = []  # The dimension, start and goal lines, in order
+
+    def cell_in_bounds(cell, what):
+        if not (0 <= cell[0] < cols and 0 <= cell[1] < rows):
+            raise MapFormatError(source, line_number, f"{what} {cell} is outside the {rows}x{cols} grid")
+        return cell
+
+    walls = []
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+
+        if len(header) == 0:
+            match = DIMENSIONS.fullmatch(line)
+            if not match:
+                raise MapFormatError(source, line_number, f"expected grid dimensions like [rows,cols], got {line!r}")
+            rows, cols = int(match.group(1)), int(match.group(2))
+            if rows == 0 or cols == 0:
+                raise MapFormatError(source, line_number, "the grid needs at least one row and one column")
+            header.append(line)
+
+        elif len(header) == 1:
+            match = CELL.fullmatch(line)
+            if not match:
+                raise MapFormatError(source, line_number, f"expected the start cell like (col,row), got {line!r}")
+            start = cell_in_bounds((int(match.group(1)), int(match.group(2))), "start")
+            header.append(line)
+
+        elif len(header) == 2:
+            goals = []
+            for part in line.split('|'):
+                match = CELL.fullmatch(part.strip())
+                if not match:
+                    raise MapFormatError(source, line_number, f"expected goals like (col,row) | (col,row), got {part.strip()!r}")
+                goals.append(cell_in_bounds((int(match.group(1)), int(match.group(2))), "goal"))
+            header.append(line)
+
+        else:
+            match = WALL_RECT.fullmatch(line) or TERRAIN_RECT.fullmatch(line)
+            if not match:
+                raise MapFormatError(source, line_number, f"expected a wall like (col,row,width,height) or terrain like (col,row,width,height,cost), got {line!r}")
+            wall = tuple(map(int, match.groups()))
+            if wall[2] <= 0 or wall[3] <= 0:
+                raise MapFormatError(source, line_number, f"rectangle {wall} needs a positive width and height")
+            if len(wall) == 5 and not UNIT_COST <= wall[4] <= MAX_COST:
+                raise MapFormatError(source, line_number, f"terrain cost {wall[4]} is outside {UNIT_COST}..{MAX_COST}")
+            walls.append(wall)
+
+    if len(header) < 3:
+        missing = ("grid dimensions", "start cell", "goals")[len(header)]
+        raise MapFormatError(source, 0, f"file ends before the {missing}")
+
+    return rows, cols, [start], goals, walls
+
+def is_binary_map(input_file):
+    """Check the first bytes of a file for the binary map magic."""
+    with open(input_file, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+def read_binary_map(input_file):
+    """Memory-map a binary map and return (rows, cols, markers, goals, cells, costs).
+
+    cells is a grid cell buffer holding the walls, costs the grid's cost buffer (None without terrain).
+    """
+    with open(input_file, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if len(data) < HEADER.size:
+            raise MapFormatError(input_file, 0, "file is too short for the binary map header")
+        magic, version, flags, rows, cols, start_col, start_row, goal_count = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise MapFormatError(input_file, 0, "not a binary map file")
+        if version != VERSION:
+            raise MapFormatError(input_file, 0, f"unsupported binary map version {version}")
+
+        offset = HEADER.size
+        size = rows * cols
+        raster_size = (size + 7) // 8
+        costs_size = size if flags & FLAG_COSTS else 0
+        if len(data) != offset + goal_count * GOAL_ENTRY.size + raster_size + costs_size:
+            raise MapFormatError(input_file, 0, f"file size does not match a {rows}x{cols} map with {goal_count} goals")
+        goals = [GOAL_ENTRY.unpack_from(data, offset + i * GOAL_ENTRY.size) for i in range(goal_count)]
+        offset += goal_count * GOAL_ENTRY.size
+
+        # Unpack the raster straight into the cell buffer one bit position at a time: bit k of every byte
+        # becomes every 8th cell from k on; then cut off the padding bits
+        raster = data[offset:offset + raster_size]
+        cells = bytearray(raster_size * 8)
+        for bit, plane in enumerate(BIT_PLANES):
+            cells[bit::8] = raster.translate(plane)
+        del cells[size:]
+        offset += raster_size
+
+        costs = bytearray(data[offset:offset + costs_size]) if costs_size else None
+        if costs is not None and costs.find(0) != -1:
+            raise MapFormatError(input_file, 0, "terrain costs must be at least 1")
+
+    for cell in [(start_col, start_row)] + goals:
+        if not (0 <= cell[0] < cols and 0 <= cell[1] < rows):
+            raise MapFormatError(input_file, 0, f"cell {cell} is outside the {rows}x{cols} grid")
+    return rows, cols, [(start_col, start_row)], goals, cells, costs
+
+def write_binary_map(output_file, rows, cols, markers, goals, cells, costs=None):
+    """Write a map in the binary format, given its wall layout as a grid cell buffer and its terrain as a cost buffer."""
+    digits = bytes(cells).translate(WALL_MASK).translate(WALL_DIGITS)
+    raster_size = (rows * cols + 7) // 8
+    raster = int(digits[::-1] or b'0', 2).to_bytes(raster_size, 'little')
+    with open(output_file, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, FLAG_COSTS if costs is not None else 0,
+                               rows, cols, markers[0][0], markers[0][1], len(goals)))
+        for goal in goals:
+            file.write(GOAL_ENTRY.pack(*goal))
+        file.write(raster)
+        if costs is not None:
+            file.write(costs)
+
+def walls_from_cells(cells, rows, cols, costs=None):
+    """Turn a grid cell buffer into wall rectangles, one per horizontal run of walls, followed by
+    terrain rectangles for the runs of equal cost in a cost buffer."""
+    walls = []
+    mask = bytes(cells).translate(WALL_MASK)
+    for row in range(rows):
+        row_start = row * cols
+        for match in WALL_RUN.finditer(mask, row_start, row_start + cols):
+            walls.append((match.start() - row_start, row, match.end() - match.start(), 1))
+
+    if costs is not None:
+        costs = bytes(costs)
+        for row in range(rows):
+            row_start = row * cols
+            for match in TERRAIN_RUN.finditer(costs, row_start, row_start + cols):
+                walls.append((match.start() - row_start, row, match.end() - match.start(), 1, costs[match.start()]))
+    return walls
+
+def load_map(input_file):
+    """Read a map in either format and return (rows, cols, markers, goals, walls).
+
+    Raises OSError if the file cannot be read and MapFormatError if it is not a valid map.
+    """
+    if is_binary_map(input_file):
+        rows, cols, markers, goals, cells, costs = read_binary_map(input_file)
+        return rows, cols, markers, goals, walls_from_cells(cells, rows, cols, costs)
 
-def read_input_file(input_file):
-    """Read and parse the input file to extract grid dimensions, markers, goals, and walls."""
     try:
         with open(input_file, 'r') as file:
-            # First line: grid dimensions
-            first_line = file.readline().strip()
-            grid_dimensions = first_line.split(']')[0] + ']'
-            rows, cols = map(int, grid_dimensions.strip('[]').split(','))
-
-            # Second line: marker coordinates (column index, row index)
-            second_line = file.readline().strip()
-            col_idx, row_idx = parse_coordinates(second_line)
-
-            # Third line: goal states (coordinates) e.g. (7,0) | (10,3)
-            third_line = file.readline().strip()
-            goal_coords = third_line.split('|')
-            goals = [parse_coordinates(goal.strip()) for goal in goal_coords]
-
-            # Remaining lines: walls (col, row, width, height)
-            walls = []
-            for line in file:
-                line = line.strip()
-                if line:  # Ignore empty lines
-                    wall_coordinates = parse_coordinates(line)
-                    if len(wall_coordinates) == 4:
-                        walls.append(wall_coordinates)
-
-            return rows, cols, [(col_idx, row_idx)], goals, walls
+            return parse_text_map(file, input_file)
+    except UnicodeDecodeError:
+        raise MapFormatError(input_file, 0, "not a text map file")
+
+def load_grid(input_file):
+    """Read a map in either format straight into a grid and return (grid, markers, goals).
 
+    Binary maps skip the wall rectangles entirely, their raster becomes the grid buffer as is.
+    """
+    if not is_binary_map(input_file):
+        rows, cols, markers, goals, walls = load_map(input_file)
+        return create_grid(rows, cols, markers, goals, walls), markers, goals
+
+    rows, cols, markers, goals, cells, costs = read_binary_map(input_file)
+    grid = Grid(rows, cols)
+    grid.cells = cells
+    grid.costs = costs
+    # Same precedence as create_grid: markers, then goals, and walls win over both
+    for cell, value in [(marker, MARKER) for marker in markers] + [(goal, GOAL) for goal in goals]:
+        if grid.cells[grid.index(cell)] != WALL:
+            grid.cells[grid.index(cell)] = value
+    return grid, markers, goals
+
+def read_input_file(input_file):
+    """Read and parse the input file to extract grid dimensions, markers, goals, and walls."""
+    try:
+        return load_map(input_file)
     except FileNotFoundError:
         print(f"Error: The file '{input_file}' was not found.")
         return None
-    except ValueError as e:
-        print(f"Error: Unable to parse grid dimensions or coordinates. {e}")
+    except MapFormatError as e:
+        print(f"Error: Unable to parse the map. {e}")
         return None
-    except Exception as e:
-        print(f"An error occurred: {e}")
+    except OSError as e:
+        print(f"Error: Unable to read the map. {e}")
         return None
+
+def convert_map(input_file, output_file):
+    """Convert a map between the text and binary formats; the output format follows from the output file extension."""
+    rows, cols, markers, goals, walls = load_map(input_file)
+    if output_file.lower().endswith(('.gmap', '.bin')):
+        grid = create_grid(rows, cols, walls=walls)
+        write_binary_map(output_file, rows, cols, markers, goals, grid.cells, grid.costs)
+    else:
+        from map_generator import write_map_file
+        write_map_file(output_file, rows, cols, markers, goals, walls)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert a map between the text format and the binary (.gmap) format.')
+    parser.add_argument('input_file', help='map to read (text or binary)')
+    parser.add_argument('output_file', help='map to write; binary if it ends in .gmap or .bin, text otherwise')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    try:
+        convert_map(args.input_file, args.output_file)
+    except (OSError, MapFormatError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,376 @@
 # grid.py
 
-def create_grid(rows, cols, markers=None, goals=None, walls=None):
-    """Create a grid representation with markers, goals, and walls."""
-    grid = [[' ' for _ in range(cols)] for _ in range(rows)]
-    
-    if markers:
-        for marker in markers:
-            grid[marker[1]][marker[0]] = 'M'  # M for Marker
-
-    if goals:
-        for goal in goals:
-            grid[goal[1]][goal[0]] = 'G'  # G for Goal
+import re
+from array import array
 
+# Cell types stored in the grid buffer
+EMPTY = 0
+WALL = 1
+MARKER = 2
+GOAL = 3
+
+WALL_MASK = bytes(1 if value == WALL else 0 for value in range(256))  # Maps cell types to 1 for walls, 0 otherwise
+OPEN_MASK = bytes(0 if value == WALL else 1 for value in range(256))  # Maps cell types to 1 for open cells, 0 for walls
+
+NO_COMPONENT = -1  # Component label of wall cells
+OPEN_RUN = re.compile(b'\x00+')  # A run of open cells in a WALL_MASK-translated row
+
+# Traversal costs: entering a cell costs its terrain cost, 1 unless a terrain rectangle says otherwise
+UNIT_COST = 1
+MAX_COST = 255  # Costs are stored one byte per cell
+
+# Movement: 4-connected grids move UP, LEFT, DOWN, RIGHT; 8-connected grids also move diagonally, one step each
+FOUR_CONNECTED = 4
+EIGHT_CONNECTED = 8
+
+# Corner rules for diagonal moves, by the two orthogonal cells the move passes between
+CORNERS_BLOCKED = 'blocked'  # Both must be open, so a diagonal never touches a wall corner
+CORNERS_CUT = 'cut'  # At least one must be open: a wall corner may be cut, but not squeezed between two walls
+CORNERS_FREE = 'free'  # Diagonals ignore them, even slipping between two walls that touch at a corner
+CORNER_RULES = (CORNERS_BLOCKED, CORNERS_CUT, CORNERS_FREE)
+
+# Mean wall height (in rows) from which the sweep over a difference array beats filling row slices one by one
+SWEEP_MIN_HEIGHT = 32
+
+class Grid:
+    """Flat grid stored in a bytearray. Each cell is addressed by its integer id (row * cols + col)."""
+
+    def __init__(self, rows, cols, connectivity=FOUR_CONNECTED, corner_rule=CORNERS_BLOCKED):
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+        self.cells = bytearray(self.size)  # One byte per cell, EMPTY by default
+
+        # Cost of entering each cell, or None while every cell costs UNIT_COST (the searches then skip the lookups)
+        self.costs = None
+
+        # Connected component of every cell, labelled on first use and cleared whenever the walls change
+        self.labels = None
+
+        # Passability mask of every cell (one bit per move the cell allows), built on first use and cleared
+        # whenever the walls or the movement rules change; see neighbor_table
+        self.masks = None
+
+        self.set_connectivity(connectivity, corner_rule)
+
+    def set_connectivity(self, connectivity, corner_rule=CORNERS_BLOCKED):
+        """Switch between 4- and 8-connected movement, with the corner rule for diagonal moves."""
+        if connectivity not in (FOUR_CONNECTED, EIGHT_CONNECTED):
+            raise ValueError(f"Connectivity must be {FOUR_CONNECTED} or {EIGHT_CONNECTED}, not {connectivity}")
+        if corner_rule not in CORNER_RULES:
+            raise ValueError(f"Corner rule must be one of {', '.join(CORNER_RULES)}, not {corner_rule!r}")
+        self.connectivity = connectivity
+        self.corner_rule = corner_rule
+        self.labels = None  # Free diagonals can join areas that only touch at a corner
+        self.masks = None
+
+        # Id offsets of the moves, bit by bit: UP, LEFT, DOWN, RIGHT, UP-LEFT, DOWN-LEFT, DOWN-RIGHT, UP-RIGHT,
+        # and for every possible mask the offsets of the moves it allows, in that (tie-break) order
+        cols = self.cols
+        offsets = (-cols, -1, cols, 1, -cols - 1, cols - 1, cols + 1, -cols + 1)
+        self.move_offsets = offsets
+        self.moves = tuple(tuple(offsets[bit] for bit in range(8) if mask >> bit & 1) for mask in range(256))
+
+    def index(self, cell):
+        """Convert a (col, row) cell into its integer id."""
+        return cell[1] * self.cols + cell[0]
+
+    def cell(self, idx):
+        """Convert an integer id back into a (col, row) cell."""
+        row, col = divmod(idx, self.cols)
+        return (col, row)
+
+    def in_bounds(self, cell):
+        """Check if a (col, row) cell lies inside the grid."""
+        return 0 <= cell[0] < self.cols and 0 <= cell[1] < self.rows
+
+    def is_wall(self, idx):
+        """Check if the cell with the given id is a wall."""
+        return self.cells[idx] == WALL
+
+    def get(self, cell):
+        """Return the cell type at a (col, row) cell."""
+        return self.cells[self.index(cell)]
+
+    def neighbors(self, idx):
+        """Return the ids of the open neighbours of a cell, in UP, LEFT, DOWN, RIGHT order.
+
+        8-connected grids follow with the diagonals the corner rule allows, in UP-LEFT, DOWN-LEFT,
+        DOWN-RIGHT, UP-RIGHT order. Search loops use neighbor_table directly instead of building this list.
+        """
+        masks, moves = self.neighbor_table()
+        return [idx + offset for offset in moves[masks[idx]]]
+
+    def neighbor_table(self):
+        """Return (masks, moves): the passability mask of every cell id and the move offsets of every mask.
+
+        The open neighbours of a cell are idx + offset for offset in moves[masks[idx]], already in tie-break
+        order, so the hot loop of a search does two lookups and no bounds or wall checks. The masks are
+        built once for all cells with whole-grid integer shifts: each cell is one byte of a big integer,
+        so shifting by a row (or a row plus or minus one cell) lines every cell up with a neighbour.
+        """
+        if self.masks is not None:
+            return self.masks, self.moves
+
+        size, cols = self.size, self.cols
+        cell_bits = 8
+        row_bits = cell_bits * cols
+        every_cell = (1 << (cell_bits * size)) - 1
+        open_cells = int.from_bytes(bytes(self.cells).translate(OPEN_MASK), 'little')
+        not_first = int.from_bytes((b'\x00' + b'\x01' * (cols - 1)) * self.rows, 'little')  # 1 except in column 0
+        not_last = int.from_bytes((b'\x01' * (cols - 1) + b'\x00') * self.rows, 'little')  # 1 except in the last column
+
+        # 1 in the byte of every cell whose neighbour in that direction is inside the grid and open
+        up = (open_cells << row_bits) & every_cell
+        left = (open_cells << cell_bits) & not_first
+        down = open_cells >> row_bits
+        right = (open_cells >> cell_bits) & not_last
+        masks = up | left << 1 | down << 2 | right << 3
+
+        if self.connectivity == EIGHT_CONNECTED:
+            diagonals = (((open_cells << (row_bits + cell_bits)) & not_first & every_cell, up, left),
+                         ((open_cells >> (row_bits - cell_bits)) & not_first, down, left),
+                         ((open_cells >> (row_bits + cell_bits)) & not_last, down, right),
+                         ((open_cells << (row_bits - cell_bits)) & not_last & every_cell, up, right))
+            for bit, (diagonal, first, second) in enumerate(diagonals, 4):
+                if self.corner_rule == CORNERS_BLOCKED:
+                    diagonal &= first & second
+                elif self.corner_rule == CORNERS_CUT:
+                    diagonal &= first | second
+                masks |= diagonal << bit
+
+        self.masks = bytearray(masks.to_bytes(size, 'little'))
+        return self.masks, self.moves
+
+    def cell_mask(self, idx):
+        """Work out the passability mask of a single cell, the same way neighbor_table does for the whole grid."""
+        row, col = divmod(idx, self.cols)
+        cells, cols = self.cells, self.cols
+        up = row > 0 and cells[idx - cols] != WALL
+        left = col > 0 and cells[idx - 1] != WALL
+        down = row < self.rows - 1 and cells[idx + cols] != WALL
+        right = col < cols - 1 and cells[idx + 1] != WALL
+        mask = up | left << 1 | down << 2 | right << 3
+
+        if self.connectivity == EIGHT_CONNECTED:
+            top, bottom, first_col, last_col = row > 0, row < self.rows - 1, col > 0, col < cols - 1
+            diagonals = ((top and first_col and cells[idx - cols - 1] != WALL, up, left),
+                         (bottom and first_col and cells[idx + cols - 1] != WALL, down, left),
+                         (bottom and last_col and cells[idx + cols + 1] != WALL, down, right),
+                         (top and last_col and cells[idx - cols + 1] != WALL, up, right))
+            for bit, (diagonal, first, second) in enumerate(diagonals, 4):
+                if self.corner_rule == CORNERS_BLOCKED:
+                    diagonal = diagonal and first and second
+                elif self.corner_rule == CORNERS_CUT:
+                    diagonal = diagonal and (first or second)
+                mask |= bool(diagonal) << bit
+        return mask
+
+    def set_cells(self, cell_ids, value):
+        """Set the cells with the given ids to a cell type, patching the masks around them instead of rebuilding them."""
+        self.labels = None  # A new or removed wall can split or join areas
+        for idx in cell_ids:
+            self.cells[idx] = value
+        if self.masks is None:
+            return
+
+        # A cell only appears in the masks of the 3x3 block around it
+        cols = self.cols
+        for idx in cell_ids:
+            row, col = divmod(idx, cols)
+            for r in range(max(row - 1, 0), min(row + 2, self.rows)):
+                for c in range(max(col - 1, 0), min(col + 2, cols)):
+                    self.masks[r * cols + c] = self.cell_mask(r * cols + c)
+
+    def fill_rect(self, col, row, width, height, value):
+        """Set every cell of a rectangle (clipped to the grid) to the given cell type."""
+        col_start, col_end = max(col, 0), min(col + width, self.cols)
+        row_start, row_end = max(row, 0), min(row + height, self.rows)
+        if col_start >= col_end or row_start >= row_end:
+            return
+        self.labels = None  # The walls may change, so the components have to be labelled again
+        self.masks = None
+        span = bytes([value]) * (col_end - col_start)
+        for r in range(row_start, row_end):
+            start = r * self.cols + col_start
+            self.cells[start:start + len(span)] = span  # Slice assignment fills the whole row segment at once
+
+    def cost(self, idx):
+        """Return the cost of stepping onto the cell with the given id."""
+        return self.costs[idx] if self.costs is not None else UNIT_COST
+
+    def min_cost(self):
+        """Return the cheapest step cost on the grid, by which step-count heuristics are scaled to stay admissible."""
+        return min(self.costs) if self.costs is not None else UNIT_COST
+
+    def fill_cost_rect(self, col, row, width, height, cost):
+        """Set the terrain cost of every cell of a rectangle (clipped to the grid)."""
+        if not UNIT_COST <= cost <= MAX_COST:
+            raise ValueError(f"Terrain cost {cost} is outside {UNIT_COST}..{MAX_COST}")
+        if self.costs is None:
+            self.costs = bytearray([UNIT_COST]) * self.size
+        fill_wall_slices(self.costs, self.cols, clip_walls(self.rows, self.cols, [(col, row, width, height)]), bytes([cost]))
+
+    def component_labels(self):
+        """Return an array with the connected component (open area) of every cell id, NO_COMPONENT for walls.
+
+        Open cells are labelled run by run: each row is split into runs of open cells, runs that touch a
+        run of the row above are joined with union-find, and every run is then filled with its label.
+        Diagonal moves under CORNERS_BLOCKED or CORNERS_CUT always have an open side to go round by, so
+        they join nothing new; only CORNERS_FREE also joins runs that touch the run above at a corner.
+        """
+        if self.labels is not None:
+            return self.labels
+
+        cols = self.cols
+        walls = bytes(self.cells).translate(WALL_MASK)
+        reach = 1 if self.connectivity == EIGHT_CONNECTED and self.corner_rule == CORNERS_FREE else 0  # Columns a run reaches past its ends
+        parent = []  # Union-find forest over the runs, runs are numbered row by row
+        run_starts = []  # First cell id of every run
+        run_ends = []  # Cell id after the last cell of every run
+
+        def find(run):
+            while parent[run] != run:
+                parent[run] = parent[parent[run]]  # Path halving
+                run = parent[run]
+            return run
+
+        above_first = above_last = 0  # Runs of the previous row are run numbers above_first to above_last - 1
+        for row_start in range(0, self.size, cols):
+            first = len(run_starts)
+            for match in OPEN_RUN.finditer(walls, row_start, row_start + cols):
+                run_starts.append(match.start())
+                run_ends.append(match.end())
+            last = len(run_starts)
+            parent.extend(range(first, last))
+
+            # Join the runs that overlap a run of the previous row (both are sorted by column)
+            i, j = first, above_first
+            while i < last and j < above_last:
+                start, end = run_starts[i] - cols, run_ends[i] - cols  # Moved up a row to compare with the runs above
+                if start - reach < run_ends[j] and run_starts[j] < end + reach:
+                    root, above_root = find(i), find(j)
+                    if root != above_root:
+                        parent[root] = above_root
+                if end < run_ends[j]:
+                    i += 1
+                else:
+                    j += 1
+
+            above_first, above_last = first, last
+
+        # Number the components in order of their first cell and fill every run with its label
+        labels = array('i', [NO_COMPONENT]) * self.size
+        component_of_root = {}
+        for run in range(len(run_starts)):
+            label = component_of_root.setdefault(find(run), len(component_of_root))
+            start = run_starts[run]
+            labels[start:run_ends[run]] = array('i', [label]) * (run_ends[run] - start)
+
+        self.labels = labels
+        return labels
+
+    def component(self, idx):
+        """Return the connected component label of a cell id (NO_COMPONENT for walls)."""
+        return self.component_labels()[idx]
+
+    def connected(self, a, b):
+        """Check in O(1) (after the first labelling) whether two cell ids lie in the same open area."""
+        labels = self.component_labels()
+        return labels[a] != NO_COMPONENT and labels[a] == labels[b]
+
+def is_terrain(rect):
+    """Map rectangles are walls (col, row, width, height) or terrain patches (col, row, width, height, cost)."""
+    return len(rect) == 5
+
+def clip_walls(rows, cols, walls):
+    """Clip (col, row, width, height) wall rectangles to the grid, as (col start, row start, col end, row end) bounds."""
+    bounds = []
+    for wall_col, wall_row, wall_width, wall_height in walls:
+        col_start, col_end = max(wall_col, 0), min(wall_col + wall_width, cols)
+        row_start, row_end = max(wall_row, 0), min(wall_row + wall_height, rows)
+        if col_start < col_end and row_start < row_end:
+            bounds.append((col_start, row_start, col_end, row_end))
+    return bounds
+
+def fill_wall_slices(mask, cols, bounds, value=b'\x01'):
+    """Set the cells of every wall to 1 (or another byte value) with one slice assignment per wall row."""
+    for col_start, row_start, col_end, row_end in bounds:
+        span = value * (col_end - col_start)
+        for start in range(row_start * cols + col_start, row_end * cols + col_start, cols):
+            mask[start:start + len(span)] = span
+
+def fill_wall_sweep(mask, rows, cols, bounds):
+    """Set the cells of every wall to 1 by sweeping a 2D difference array down the rows.
+
+    Each wall adds +1/-1 at its two columns on its first row and undoes them below its last row. Only
+    the rows where some wall starts or ends are worked out (from the running column deltas); the rows
+    down to the next such row repeat them, so tall and overlapping walls cost next to nothing.
+    """
+    changes = {}  # Row -> (col start, col end, +1 or -1) of the walls starting or ending there
+    for col_start, row_start, col_end, row_end in bounds:
+        changes.setdefault(row_start, []).append((col_start, col_end, 1))
+        if row_end < rows:
+            changes.setdefault(row_end, []).append((col_start, col_end, -1))
+
+    deltas = {}  # Column -> change in wall count there, for the current row; zero entries are dropped
+    change_rows = sorted(changes)
+    for i, row in enumerate(change_rows):
+        for col_start, col_end, sign in changes[row]:
+            for col, delta in ((col_start, sign), (col_end, -sign)):
+                delta += deltas.get(col, 0)
+                if delta:
+                    deltas[col] = delta
+                else:
+                    del deltas[col]
+
+        # Prefix sum along the row: cells with a positive wall count are walls
+        line = bytearray(cols)
+        count = 0
+        run_start = 0
+        for col in sorted(deltas):
+            if count == 0:
+                run_start = col
+            count += deltas[col]
+            if count == 0:
+                line[run_start:col] = b'\x01' * (col - run_start)
+
+        next_row = change_rows[i + 1] if i + 1 < len(change_rows) else rows
+        mask[row * cols:next_row * cols] = line * (next_row - row)
+
+def rasterize_walls(rows, cols, walls):
+    """Return a bytearray with 1 for every cell covered by a wall rectangle and 0 elsewhere, indexed by cell id.
+
+    Rectangles are clipped to the grid and may overlap; terrain rectangles are skipped. Short walls are filled row slice by row slice;
+    when the walls are tall on average, a difference-array sweep is used instead.
+    """
+    mask = bytearray(rows * cols)
+    bounds = clip_walls(rows, cols, [wall for wall in walls if not is_terrain(wall)])
+    if not bounds:
+        return mask
+    if sum(row_end - row_start for _, row_start, _, row_end in bounds) >= SWEEP_MIN_HEIGHT * len(bounds):
+        fill_wall_sweep(mask, rows, cols, bounds)
+    else:
+        fill_wall_slices(mask, cols, bounds)
+    return mask
+
+def create_grid(rows, cols, markers=None, goals=None, walls=None, connectivity=FOUR_CONNECTED, corner_rule=CORNERS_BLOCKED):
+    """Create a grid representation with markers, goals, walls and terrain costs."""
+    grid = Grid(rows, cols, connectivity, corner_rule)
+
+    # The wall mask holds 1 for walls, which is WALL, so it becomes the cell buffer as is
     if walls:
-        for wall in walls:
-            wall_col, wall_row, wall_width, wall_height = wall
-            for r in range(wall_row, wall_row + wall_height):
-                for c in range(wall_col, wall_col + wall_width):
-                    grid[r][c] = 'W'  # W for Wall
+        grid.cells = rasterize_walls(rows, cols, walls)
+
+        # Terrain patches in file order, so a later patch overrides an earlier one where they overlap
+        for rect in walls:
+            if is_terrain(rect):
+                grid.fill_cost_rect(*rect)
+
+    # Walls win over markers and goals placed on them
+    for cells, value in ((markers, MARKER), (goals, GOAL)):
+        for cell in cells or []:
+            if grid.cells[grid.index(cell)] != WALL:
+                grid.cells[grid.index(cell)] = value
 
-    return grid
\ No newline at end of file
+    return grid
@@ -1,6 +1,22 @@
 # gui.py
 
 import tkinter as tk
+from grid import UNIT_COST, clip_walls, is_terrain, rasterize_walls
+from pathfinding import RESET, EXPANDED, FRONTIER, GOAL
+
+# Colours of walls, markers and goals, which the search replay never paints over
+FIXED_COLORS = ('gray', 'red', 'green')
+
+# Terrain shading runs from light to dark brown, reaching the darkest colour at this cost
+DARKEST_TERRAIN_COST = 9
+
+def terrain_color(cost):
+    """Fill colour for a cell with the given terrain cost; unit-cost cells stay white."""
+    if cost <= UNIT_COST:
+        return 'white'
+    level = min(cost - UNIT_COST, DARKEST_TERRAIN_COST - UNIT_COST) / (DARKEST_TERRAIN_COST - UNIT_COST)
+    light, dark = (245, 222, 179), (139, 69, 19)
+    return '#%02x%02x%02x' % tuple(round(a + (b - a) * level) for a, b in zip(light, dark))
 
 class GridDisplay:
     def __init__(self, rows, cols, markers=None, goals=None, walls=None):
@@ -10,16 +26,29 @@ class GridDisplay:
         self.goals = goals if goals else []
         self.walls = walls if walls else []
         self.final_path = []  # Store the final path for re-drawing after resize
-        self.visited_cells = [] # Store visited cells to re-render them
         self.current_pathfinding_cell = None  # Store the current pathfinding cell
+        self.path_cell_item = None  # Canvas item of the pathfinding cell, moved instead of redrawn
         self.cell_size = 50  # Default size of each cell in pixels
 
+        # Colour of every cell by cell id (row * cols + col): the initial colours, and the colours currently shown
+        self.base_colors = self.initial_colors()
+        self.cell_colors = self.base_colors[:]
+        self.search_cells = set()  # Ids of cells coloured by the search, so a reset only touches those
+        self.cell_items = []  # One canvas rectangle per cell, recoloured instead of drawing new rectangles
+
+        # Event replay state
+        self.events = []
+        self.event_index = 0
+        self.frame_delay = 100  # Milliseconds between frames
+        self.expansions_per_frame = 1  # Expansions (with their frontier additions) drawn per frame
+        self.on_replay_done = None
+
         self.root = tk.Tk()
         self.root.title("Pathfinding Visualization")
 
         # Set the default window size (Width x Height)
-        default_width = 600 
-        default_height = 275 
+        default_width = 600
+        default_height = 275
         self.root.geometry(f"{default_width}x{default_height}")
 
         self.canvas = tk.Canvas(self.root)
@@ -30,41 +59,55 @@ class GridDisplay:
 
         self.draw_grid()
 
+    def initial_colors(self):
+        """Work out the colour of every cell before the search starts."""
+        # Walls come from the same rasterisation as the search grid; markers and goals are drawn over them
+        colors = ['gray' if wall else 'white' for wall in rasterize_walls(self.rows, self.cols, self.walls)]
+
+        # Terrain patches in file order (a later patch wins), shaded darker the more a cell costs to enter
+        for rect in self.walls:
+            if is_terrain(rect):
+                color = terrain_color(rect[4])
+                for col_start, row_start, col_end, row_end in clip_walls(self.rows, self.cols, [rect[:4]]):
+                    for row in range(row_start, row_end):
+                        for cell_id in range(row * self.cols + col_start, row * self.cols + col_end):
+                            if colors[cell_id] != 'gray':
+                                colors[cell_id] = color
+        for goal in self.goals:
+            colors[goal[1] * self.cols + goal[0]] = 'green'
+        for marker in self.markers:
+            colors[marker[1] * self.cols + marker[0]] = 'red'
+        return colors
+
     def on_resize(self, event):
         """Handle window resizing."""
         new_width = event.width
         new_height = event.height
         self.cell_size = min(new_width // self.cols, new_height // self.rows)
 
-        # Redraw the grid with the new cell size
+        # Redraw the grid (with the current search colours) at the new cell size
         self.canvas.delete("all")
+        self.path_cell_item = None
         self.draw_grid()
 
-        # Redraw visited cells and final path after resizing
-        self.update_search_cells(self.visited_cells)
+        # Redraw the final path after resizing
         if self.final_path:
             self.draw_final_path(self.final_path)
-        
+
         # Redraw the pathfinding cell after resizing
         if self.current_pathfinding_cell:
             self.update_pathfinding_cell(self.current_pathfinding_cell)
 
     def draw_grid(self):
-        """Draw the entire grid with walls, markers, and goals."""
+        """Draw the entire grid, creating the one canvas rectangle each cell keeps for the rest of the run."""
+        self.cell_items = []
         for row in range(self.rows):
             for col in range(self.cols):
-                color = 'white'
-                if (col, row) in self.markers:
-                    color = 'red'
-                elif (col, row) in self.goals:
-                    color = 'green'
-                elif any(wall[0] <= col < wall[0] + wall[2] and wall[1] <= row < wall[1] + wall[3] for wall in self.walls):
-                    color = 'gray'
-
                 # Draw the cell with the updated cell size
-                self.canvas.create_rectangle(col * self.cell_size, row * self.cell_size,
-                                             (col + 1) * self.cell_size, (row + 1) * self.cell_size,
-                                             fill=color, outline='')
+                item = self.canvas.create_rectangle(col * self.cell_size, row * self.cell_size,
+                                                    (col + 1) * self.cell_size, (row + 1) * self.cell_size,
+                                                    fill=self.cell_colors[row * self.cols + col], outline='')
+                self.cell_items.append(item)
 
         # Draw grid lines
         self.draw_grid_lines()
@@ -76,60 +119,93 @@ class GridDisplay:
         for i in range(self.cols + 1):
             self.canvas.create_line(i * self.cell_size, 0, i * self.cell_size, self.rows * self.cell_size, fill='black')
 
-    def update_search_cells(self, visited_cells):
-        """Update the grid to show all searched cells in light green."""
-        self.visited_cells = visited_cells  # Store visited cells for re-rendering
-        for cell in visited_cells:
-            if cell not in self.goals and cell not in self.markers:
-                x1 = cell[0] * self.cell_size
-                y1 = cell[1] * self.cell_size
-                x2 = x1 + self.cell_size
-                y2 = y1 + self.cell_size
-                self.visited_cells.add(cell)
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill='lightgreen', outline='black', tags="visited_cell")
-
-        self.draw_grid_lines()
+    def set_cell_colors(self, colors):
+        """Recolour only the cells whose colour actually changed, given a {cell id: colour} dict."""
+        for cell_id, color in colors.items():
+            if self.cell_colors[cell_id] != color:
+                self.cell_colors[cell_id] = color
+                self.canvas.itemconfigure(self.cell_items[cell_id], fill=color)
 
     def update_pathfinding_cell(self, path_cell):
         """Update the position of the pathfinding cell."""
         self.current_pathfinding_cell = path_cell  # Store the current pathfinding cell for re-rendering
-        self.canvas.delete("path_cell")
         smaller_square_size = self.cell_size * 0.7
         offset = (self.cell_size - smaller_square_size) // 2
         path_x1 = path_cell[0] * self.cell_size + offset
         path_y1 = path_cell[1] * self.cell_size + offset
         path_x2 = path_x1 + smaller_square_size
         path_y2 = path_y1 + smaller_square_size
-        self.canvas.create_rectangle(path_x1, path_y1, path_x2, path_y2, fill='red3', tags="path_cell")
-
-        self.root.update()
+        if self.path_cell_item is None:
+            self.path_cell_item = self.canvas.create_rectangle(path_x1, path_y1, path_x2, path_y2, fill='red3', tags="path_cell")
+        else:
+            self.canvas.coords(self.path_cell_item, path_x1, path_y1, path_x2, path_y2)
+            self.canvas.tag_raise(self.path_cell_item)  # Keep it on top of the final path
 
     def draw_final_path(self, path):
         """Draw the final path as a blue line after the goal is reached."""
         self.final_path = path  # Store the final path for re-drawing after resize
-        for i in range(len(path) - 1):
-            x1 = path[i][0] * self.cell_size + self.cell_size // 2
-            y1 = path[i][1] * self.cell_size + self.cell_size // 2
-            x2 = path[i + 1][0] * self.cell_size + self.cell_size // 2
-            y2 = path[i + 1][1] * self.cell_size + self.cell_size // 2
-            self.canvas.create_line(x1, y1, x2, y2, fill='purple', width=5)
-
-    def update_potential_nodes(self, potential_nodes):
-        """Highlight potential nodes being evaluated."""
-        for node in potential_nodes:
-            x1 = node[0] * self.cell_size
-            y1 = node[1] * self.cell_size
-            x2 = x1 + self.cell_size
-            y2 = y1 + self.cell_size
-            if node not in self.goals and node not in self.markers and node not in self.visited_cells:
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill='lightpink', outline='black', tags="potential_node")
-
-        self.root.update()
+        if len(path) < 2:
+            return
+        # One polyline through the cell centres, with round joins so diagonal turns stay smooth
+        points = []
+        for col, row in path:
+            points += [col * self.cell_size + self.cell_size // 2, row * self.cell_size + self.cell_size // 2]
+        self.canvas.create_line(*points, fill='purple', width=5, joinstyle=tk.ROUND, capstyle=tk.ROUND)
 
     def reset(self):
         """Reset the grid to its initial state."""
-        self.visited_cells = []
-        self.draw_grid()  # Redraw the grid in its initial state
+        self.set_cell_colors({cell_id: self.base_colors[cell_id] for cell_id in self.search_cells})
+        self.search_cells = set()
+
+    def play_events(self, events, fps=10, expansions_per_frame=1, on_done=None):
+        """Replay a list of search events at the given frame rate, drawing expansions_per_frame expansions per frame."""
+        if fps < 1 or expansions_per_frame < 1:
+            raise ValueError("The frame rate and the expansions per frame must be at least 1")
+        self.events = events
+        self.event_index = 0
+        self.frame_delay = max(1, int(1000 / fps))
+        self.expansions_per_frame = expansions_per_frame
+        self.on_replay_done = on_done
+        self.root.after(0, self.render_frame)
+
+    def render_frame(self):
+        """Apply the next batch of events and redraw only the cells they changed."""
+        changed = {}  # Cell id -> new colour; a cell touched by several events is only redrawn once
+        current = None
+        expansions = 0
+
+        while self.event_index < len(self.events):
+            event, cell_id = self.events[self.event_index]
+            if event == EXPANDED:
+                if expansions == self.expansions_per_frame:
+                    break  # Leave the next expansion for the next frame
+                expansions += 1
+            self.event_index += 1
+
+            if event == RESET:
+                for search_cell in self.search_cells:
+                    changed[search_cell] = self.base_colors[search_cell]
+                self.search_cells = set()
+            elif event == EXPANDED or event == GOAL:
+                current = cell_id
+                if event == EXPANDED and self.base_colors[cell_id] not in FIXED_COLORS:
+                    changed[cell_id] = 'lightgreen'  # Goals and markers keep their colour
+                    self.search_cells.add(cell_id)
+            elif event == FRONTIER:
+                # Highlight potential nodes being evaluated, unless already searched
+                if self.base_colors[cell_id] not in FIXED_COLORS and changed.get(cell_id, self.cell_colors[cell_id]) != 'lightgreen':
+                    changed[cell_id] = 'lightpink'
+                    self.search_cells.add(cell_id)
+
+        self.set_cell_colors(changed)
+        if current is not None:
+            row, col = divmod(current, self.cols)
+            self.update_pathfinding_cell((col, row))
+
+        if self.event_index < len(self.events):
+            self.root.after(self.frame_delay, self.render_frame)
+        elif self.on_replay_done:
+            self.on_replay_done()
 
 def display_grid_gui(rows, cols, markers=None, goals=None, walls=None):
     """Create the GUI and handle updates during DFS."""
@@ -0,0 +1,164 @@
+# heuristics.py
+
+from array import array
+from functools import lru_cache
+from itertools import chain
+from grid import Grid, WALL_MASK, FOUR_CONNECTED, EIGHT_CONNECTED, CORNERS_BLOCKED
+
+# With more goals than this, a precomputed field is cheaper than taking the min over every goal per node
+FIELD_MIN_GOALS = 8
+
+# Fields kept per cache; each one holds one integer per cell
+FIELD_CACHE_SIZE = 8
+
+def goal_key(goals):
+    """Hashable, order-independent key for a goal list."""
+    return tuple(sorted(set(goals)))
+
+@lru_cache(maxsize=FIELD_CACHE_SIZE)
+def manhattan_field(rows, cols, goals, connectivity=FOUR_CONNECTED):
+    """Manhattan distance from every cell to its nearest goal (walls ignored), as an array indexed by cell id.
+
+    goals is a goal_key tuple. The distance transform is separable: each goal row is swept left and
+    right, then the rows are swept down and up the grid, combining whole rows at a time. On 8-connected
+    grids each row also takes the diagonal neighbours of the row before, which gives the Chebyshev
+    (octile with diagonal steps costing 1) distance instead.
+    """
+    far = rows + cols  # Larger than any distance on the grid
+    lines = [None] * rows
+    goal_cols = {}
+    for goal_col, goal_row in goals:
+        goal_cols.setdefault(goal_row, []).append(goal_col)
+
+    # Distance along the row to the nearest goal in that row
+    empty_line = [far] * cols
+    for row in range(rows):
+        if row not in goal_cols:
+            lines[row] = empty_line
+            continue
+        line = empty_line[:]
+        for goal_col in goal_cols[row]:
+            line[goal_col] = 0
+        for col in range(1, cols):
+            if line[col - 1] + 1 < line[col]:
+                line[col] = line[col - 1] + 1
+        for col in range(cols - 2, -1, -1):
+            if line[col + 1] + 1 < line[col]:
+                line[col] = line[col + 1] + 1
+        lines[row] = line
+
+    # Carry the distances down and then up the columns (and diagonally when diagonal steps are allowed)
+    if connectivity == EIGHT_CONNECTED:
+        def step(line):
+            wider = [far] + line + [far]
+            return [min(a, b, c) + 1 for a, b, c in zip(wider, line, wider[2:])]
+    else:
+        def step(line):
+            return [value + 1 for value in line]
+    for row in range(1, rows):
+        lines[row] = [a if a <= b else b for a, b in zip(lines[row], step(lines[row - 1]))]
+    for row in range(rows - 2, -1, -1):
+        lines[row] = [a if a <= b else b for a, b in zip(lines[row], step(lines[row + 1]))]
+
+    return array('i', chain.from_iterable(lines))
+
+def nearest_goal_heuristic(grid, goals):
+    """Return a function giving the Manhattan distance from a cell id to the nearest goal.
+
+    On 8-connected grids, where a diagonal step costs the same as a straight one, the octile distance
+    reduces to the Chebyshev distance max(|dx|, |dy|), which is used instead.
+    Few goals are evaluated directly; with more than FIELD_MIN_GOALS goals the distances are read from
+    a cached manhattan_field, so each lookup is O(1) however many goals there are.
+    """
+    if len(goals) > FIELD_MIN_GOALS:
+        return manhattan_field(grid.rows, grid.cols, goal_key(goals), grid.connectivity).__getitem__
+
+    cols = grid.cols
+    diagonal = grid.connectivity == EIGHT_CONNECTED
+    if len(goals) == 1:
+        goal_col, goal_row = goals[0]
+
+        if diagonal:
+            def heuristic(cell_id):
+                row, col = divmod(cell_id, cols)
+                return max(abs(col - goal_col), abs(row - goal_row))
+            return heuristic
+
+        def heuristic(cell_id):
+            row, col = divmod(cell_id, cols)
+            return abs(col - goal_col) + abs(row - goal_row)
+        return heuristic
+
+    goal_cells = [(goal[0], goal[1]) for goal in goals]
+
+    if diagonal:
+        def heuristic(cell_id):
+            row, col = divmod(cell_id, cols)
+            return min(max(abs(col - goal_col), abs(row - goal_row)) for goal_col, goal_row in goal_cells)
+        return heuristic
+
+    def heuristic(cell_id):
+        row, col = divmod(cell_id, cols)
+        return min(abs(col - goal_col) + abs(row - goal_row) for goal_col, goal_row in goal_cells)
+    return heuristic
+
+@lru_cache(maxsize=FIELD_CACHE_SIZE)
+def true_distance_field(rows, cols, walls, goals, connectivity=FOUR_CONNECTED, corner_rule=CORNERS_BLOCKED):
+    """Exact step distance from every cell to its nearest goal, by one breadth-first search from all goals.
+
+    walls is the grid's cells translated with WALL_MASK (1 for walls), so the cache notices any change
+    to the walls. Cells that cannot reach a goal get rows * cols, more than any real distance.
+    Moves are symmetric, so searching outwards from the goals gives the distance to them.
+    """
+    size = rows * cols
+    unreachable = size
+    distance = array('i', [unreachable]) * size
+
+    # A grid of just the walls, for its neighbour table (the wall mask holds 1 for walls, which is WALL)
+    wall_grid = Grid(rows, cols, connectivity, corner_rule)
+    wall_grid.cells = bytearray(walls)
+    masks, moves = wall_grid.neighbor_table()
+
+    # Preallocated FIFO queue seeded with every goal, each cell is enqueued at most once
+    queue = array('i', [0]) * size
+    tail = 0
+    for goal_col, goal_row in goals:
+        goal_id = goal_row * cols + goal_col
+        if not walls[goal_id] and distance[goal_id] == unreachable:
+            distance[goal_id] = 0
+            queue[tail] = goal_id
+            tail += 1
+
+    head = 0
+    while head < tail:
+        current = queue[head]
+        head += 1
+        next_distance = distance[current] + 1
+        for offset in moves[masks[current]]:
+            neighbor = current + offset
+            if distance[neighbor] == unreachable:
+                distance[neighbor] = next_distance
+                queue[tail] = neighbor
+                tail += 1
+
+    return distance
+
+def true_distance_heuristic(grid, goals):
+    """Return a function giving the exact step distance from a cell id to the nearest goal.
+
+    The field behind it is cached per (walls, goal set), so repeated queries on the same map and goals
+    only pay for the reverse search once.
+    """
+    walls = bytes(grid.cells).translate(WALL_MASK)
+    return true_distance_field(grid.rows, grid.cols, walls, goal_key(goals), grid.connectivity, grid.corner_rule).__getitem__
+
+def cost_heuristic(grid, goals):
+    """Return a function giving a lower bound on the cost from a cell id to the nearest goal on a weighted grid.
+
+    Every step costs at least grid.min_cost(), so the Manhattan distance scaled by it stays admissible.
+    """
+    heuristic = nearest_goal_heuristic(grid, goals)
+    min_cost = grid.min_cost()
+    if min_cost == 1:
+        return heuristic
+    return lambda cell_id: heuristic(cell_id) * min_cost
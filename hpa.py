@@ -0,0 +1,371 @@
+# hpa.py
+
+import heapq
+import json
+import os
+import zlib
+from collections import OrderedDict, deque
+from grid import WALL, WALL_MASK, FOUR_CONNECTED
+from heuristics import nearest_goal_heuristic
+from pathfinding import RESET, EXPANDED, FRONTIER, GOAL, astar, tie_break, ids_to_cells, reachable_goals
+from stats import SETUP, SEARCH, RECONSTRUCTION
+
+# Hierarchical path-finding A* (HPA*): the map is cut into square clusters, and the cells where two
+# clusters can be crossed become the nodes of a small abstract graph. Queries search that graph and
+# then fill in the cell-level path inside the clusters the abstract path goes through.
+
+CLUSTER_SIZE = 16  # Cluster width and height in cells
+
+# Openings between two clusters shorter than this get one transition in the middle, longer ones one at each end
+LONG_ENTRANCE = 6
+
+GRAPH_VERSION = 1  # Bumped whenever the saved file layout changes
+GRAPH_CACHE_SIZE = 4  # Abstract graphs kept in memory
+
+OPEN_DIGITS = bytes.maketrans(b'\x00\x01', b'10')  # Wall mask bytes to '1' for open cells and '0' for walls
+
+graph_cache = OrderedDict()  # (rows, cols, cluster size, wall mask) -> graph, least recently used first
+
+def cluster_bounds(grid, cell_id, cluster_size):
+    """Return the (first col, first row, last col, last row) of the cluster holding a cell."""
+    row, col = divmod(cell_id, grid.cols)
+    first_col = col - col % cluster_size
+    first_row = row - row % cluster_size
+    return first_col, first_row, min(first_col + cluster_size, grid.cols) - 1, min(first_row + cluster_size, grid.rows) - 1
+
+def cluster_bfs(grid, source, bounds, targets=()):
+    """Breadth-first search from source that never leaves the cluster rectangle given by bounds.
+
+    Stops early once every target is reached. Returns (distance, parent, node_count), with distance
+    and parent as dicts over the reached cell ids.
+    """
+    first_col, first_row, last_col, last_row = bounds
+    cols = grid.cols
+    cells = grid.cells
+    distance = {source: 0}
+    parent = {source: None}
+    remaining = set(targets)
+    remaining.discard(source)
+    queue = deque([source])
+    node_count = 0
+
+    while queue and (remaining or not targets):
+        current = queue.popleft()
+        node_count += 1
+        next_distance = distance[current] + 1
+        row, col = divmod(current, cols)
+
+        # Same UP, LEFT, DOWN, RIGHT neighbours as grid.neighbors, but bounded by the cluster instead of the grid
+        for neighbor, inside in ((current - cols, row > first_row), (current - 1, col > first_col),
+                                 (current + cols, row < last_row), (current + 1, col < last_col)):
+            if inside and cells[neighbor] != WALL and neighbor not in distance:
+                distance[neighbor] = next_distance
+                parent[neighbor] = current
+                queue.append(neighbor)
+                remaining.discard(neighbor)
+
+    return distance, parent, node_count
+
+def build_abstract_graph(grid, cluster_size=CLUSTER_SIZE):
+    """Find the entrances between neighbouring clusters and the distances between the entrances of each cluster.
+
+    Returns the graph as a dict with the cluster size, the edges, which map each abstract node (a cell id)
+    to a {neighbour cell id: step cost} dict, and the clusters, which map cluster bounds to their nodes.
+    """
+    rows, cols = grid.rows, grid.cols
+    cells = bytes(grid.cells).translate(WALL_MASK)
+    edges = {}
+
+    def add_transition(a, b):
+        # Two open cells facing each other across a cluster border, one step apart
+        edges.setdefault(a, {})[b] = 1
+        edges.setdefault(b, {})[a] = 1
+
+    def add_entrance(pairs):
+        # pairs lists the facing (inside, outside) cell ids along one maximal opening
+        if len(pairs) < LONG_ENTRANCE:
+            add_transition(*pairs[len(pairs) // 2])
+        else:
+            add_transition(*pairs[0])
+            add_transition(*pairs[-1])
+
+    # Openings across the vertical borders, scanned one cluster band at a time so entrances stay within one cluster pair
+    for border_col in range(cluster_size, cols, cluster_size):
+        for band_start in range(0, rows, cluster_size):
+            pairs = []
+            for row in range(band_start, min(band_start + cluster_size, rows)):
+                left = row * cols + border_col - 1
+                if not cells[left] and not cells[left + 1]:
+                    pairs.append((left, left + 1))
+                elif pairs:
+                    add_entrance(pairs)
+                    pairs = []
+            if pairs:
+                add_entrance(pairs)
+
+    # Openings across the horizontal borders
+    for border_row in range(cluster_size, rows, cluster_size):
+        for band_start in range(0, cols, cluster_size):
+            pairs = []
+            for col in range(band_start, min(band_start + cluster_size, cols)):
+                above = (border_row - 1) * cols + col
+                if not cells[above] and not cells[above + cols]:
+                    pairs.append((above, above + cols))
+                elif pairs:
+                    add_entrance(pairs)
+                    pairs = []
+            if pairs:
+                add_entrance(pairs)
+
+    # Distances between the entrances of each cluster; distances are symmetric, so each search only looks for the later entrances
+    clusters = group_by_cluster(grid, edges, cluster_size)
+    for bounds, cluster_nodes in clusters.items():
+        open_bits, stride = cluster_open_bits(cells, cols, bounds)
+        first_col, first_row = bounds[0], bounds[1]
+        bits = [(node // cols - first_row) * stride + node % cols - first_col for node in cluster_nodes]
+        for i in range(len(cluster_nodes) - 1):
+            distances = wavefront_distances(open_bits, stride, bits[i], bits[i + 1:])
+            for bit, other in zip(bits[i + 1:], cluster_nodes[i + 1:]):
+                if bit in distances:
+                    edges[cluster_nodes[i]][other] = distances[bit]
+                    edges[other][cluster_nodes[i]] = distances[bit]
+
+    return {'cluster_size': cluster_size, 'edges': edges, 'clusters': clusters}
+
+def cluster_open_bits(walls, cols, bounds):
+    """Open cells of a cluster as one integer bitmask, given the grid's wall mask (1 for walls).
+
+    Bit row * stride + col is set for the open cell at that (col, row) inside the cluster. Every row has
+    one spare, always-clear bit at the end, so shifting by one never wraps onto the next row.
+    """
+    first_col, first_row, last_col, last_row = bounds
+    width = last_col - first_col + 1
+    text = b''.join(b'0' + walls[row * cols + first_col:row * cols + last_col + 1].translate(OPEN_DIGITS)[::-1]
+                    for row in range(last_row, first_row - 1, -1))
+    return int(text, 2), width + 1
+
+def wavefront_distances(open_bits, stride, source, targets):
+    """Step distances from the source bit to the target bits, growing the whole wavefront one step per big-integer operation.
+
+    Returns a {target bit: distance} dict without the targets that cannot be reached.
+    """
+    visited = frontier = 1 << source
+    remaining = [target for target in targets if target != source]
+    distances = {source: 0} if source in targets else {}
+    step = 0
+    while frontier and remaining:
+        step += 1
+        frontier = (frontier << 1 | frontier >> 1 | frontier << stride | frontier >> stride) & open_bits & ~visited
+        visited |= frontier
+        still_remaining = []
+        for target in remaining:
+            if frontier >> target & 1:
+                distances[target] = step
+            else:
+                still_remaining.append(target)
+        remaining = still_remaining
+    return distances
+
+def group_by_cluster(grid, nodes, cluster_size):
+    """Group abstract nodes into a {cluster bounds: [cell ids]} dict."""
+    clusters = {}
+    for node in nodes:
+        clusters.setdefault(cluster_bounds(grid, node, cluster_size), []).append(node)
+    return clusters
+
+def wall_signature(grid):
+    """Checksum of the wall layout, stored with a saved graph so a changed map is noticed."""
+    return zlib.crc32(bytes(grid.cells).translate(WALL_MASK))
+
+def save_abstract_graph(graph, grid, output_file):
+    """Write an abstract graph to a JSON file."""
+    data = {
+        'version': GRAPH_VERSION,
+        'rows': grid.rows,
+        'cols': grid.cols,
+        'cluster_size': graph['cluster_size'],
+        'walls': wall_signature(grid),
+        'edges': [[node, [[neighbor, cost] for neighbor, cost in neighbors.items()]] for node, neighbors in graph['edges'].items()]
+    }
+    # Write to a temporary file first, so parallel batch workers never see (or leave) a half-written graph
+    temporary_file = f"{output_file}.{os.getpid()}.tmp"
+    with open(temporary_file, 'w') as file:
+        json.dump(data, file, separators=(',', ':'))
+    os.replace(temporary_file, output_file)
+
+def load_abstract_graph(input_file, grid, cluster_size=CLUSTER_SIZE):
+    """Read an abstract graph saved by save_abstract_graph, or return None if it is missing or was built for another map."""
+    try:
+        with open(input_file) as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    if (data.get('version'), data.get('rows'), data.get('cols'), data.get('cluster_size'), data.get('walls')) != \
+            (GRAPH_VERSION, grid.rows, grid.cols, cluster_size, wall_signature(grid)):
+        return None
+    edges = {node: {neighbor: cost for neighbor, cost in neighbors} for node, neighbors in data['edges']}
+    return {'cluster_size': cluster_size, 'edges': edges, 'clusters': group_by_cluster(grid, edges, cluster_size)}
+
+def graph_file(map_file):
+    """Name of the file the abstract graph of a map is saved in, next to the map."""
+    return map_file + '.hpa.json'
+
+def abstract_graph(grid, cluster_size=CLUSTER_SIZE, map_file=None):
+    """Return the abstract graph of a grid, from memory, from the file next to map_file, or by building (and saving) it."""
+    key = (grid.rows, grid.cols, cluster_size, bytes(grid.cells).translate(WALL_MASK))
+    graph = graph_cache.get(key)
+    if graph is not None:
+        graph_cache.move_to_end(key)
+        return graph
+
+    graph = load_abstract_graph(graph_file(map_file), grid, cluster_size) if map_file else None
+    if graph is None:
+        graph = build_abstract_graph(grid, cluster_size)
+        if map_file:
+            try:
+                save_abstract_graph(graph, grid, graph_file(map_file))
+            except OSError as e:
+                print(f"Warning: Unable to save the abstract graph. {e}")
+
+    graph_cache[key] = graph
+    if len(graph_cache) > GRAPH_CACHE_SIZE:
+        graph_cache.popitem(last=False)
+    return graph
+
+# Hierarchical A* (HPA*)
+def hpa_star(grid, start, goals, events=None, graph=None, stats=None):
+    """Search the abstract graph from the start to the nearest goal, then refine the path cluster by cluster.
+
+    The path is near-optimal rather than optimal: it only crosses cluster borders at the chosen entrances.
+    The node count adds up the abstract expansions and the cells expanded while connecting the start and
+    goals to the graph and while refining the path. The clusters and entrances are 4-connected and count
+    steps, so 8-connected grids and grids with terrain are searched with plain A* instead. With stats, the setup phase covers connecting
+    the start and goals, the search phase the abstract search and the reconstruction phase the refinement;
+    the cells of the cluster searches count as generated once each.
+    """
+    if grid.connectivity != FOUR_CONNECTED or grid.costs is not None:
+        return astar(grid, start, goals, events, stats=stats)
+
+    if stats is not None:
+        stats.begin()
+
+    if events is not None:
+        events.append((RESET, -1))  # Clear the GUI before starting the search, in case there are multiple to be done
+
+    if graph is None:
+        graph = abstract_graph(grid)
+    cluster_size = graph['cluster_size']
+    edges = graph['edges']
+    clusters = graph['clusters']
+
+    # Goals in another connected area can never be reached, so leave them out (and stop at once if none is left)
+    goals = reachable_goals(grid, start, goals)
+    if not goals:
+        if stats is not None:
+            stats.end(SETUP, 0, 0)
+        return None, 0
+
+    start_id = grid.index(start)
+    goal_ids = {grid.index(goal) for goal in goals}  # Goal cell ids for O(1) goal checks
+    node_count = 0
+
+    # Connect the start to the entrances of its cluster, and to any goal inside it
+    start_bounds = cluster_bounds(grid, start_id, cluster_size)
+    targets = clusters.get(start_bounds, []) + [goal_id for goal_id in goal_ids if cluster_bounds(grid, goal_id, cluster_size) == start_bounds]
+    distance, _, count = cluster_bfs(grid, start_id, start_bounds, targets)
+    node_count += count
+    start_edges = {target: distance[target] for target in targets if target in distance and target != start_id}
+
+    # Connect every goal to the entrances of its cluster (edges towards the goal)
+    goal_edges = {}
+    for goal_id in goal_ids:
+        bounds = cluster_bounds(grid, goal_id, cluster_size)
+        distance, _, count = cluster_bfs(grid, goal_id, bounds, clusters.get(bounds, ()))
+        node_count += count
+        for node in clusters.get(bounds, ()):
+            if node in distance:
+                goal_edges.setdefault(node, {})[goal_id] = distance[node]
+
+    # A* over the abstract graph, with the start and goals joined to it
+    heuristic = nearest_goal_heuristic(grid, goals)
+    g_score = {start_id: 0}
+    parent = {start_id: None}
+    closed = set()
+    open_list = [(heuristic(start_id), 0, tie_break(grid, start_id), start_id)]
+    abstract_path = None
+    cluster_node_count = node_count  # Cells expanded by the cluster searches so far
+    abstract_count = 0  # Abstract nodes expanded
+    stale_pops = 0
+    peak_frontier = 0
+    if stats is not None:
+        stats.phase(SETUP)
+
+    while open_list:
+        if stats is not None and len(open_list) > peak_frontier:
+            peak_frontier = len(open_list)
+        _, current_g, _, current = heapq.heappop(open_list)
+        if current in closed:
+            stale_pops += 1
+            continue
+        closed.add(current)
+        node_count += 1
+        abstract_count += 1
+
+        # Record the expansion for the GUI (if an events list is provided)
+        if events is not None:
+            events.append((EXPANDED, current))
+
+        if current in goal_ids:
+            abstract_path = []
+            while current is not None:
+                abstract_path.append(current)
+                current = parent[current]
+            abstract_path.reverse()
+            break
+
+        neighbors = list(edges.get(current, {}).items())
+        if current == start_id:
+            neighbors += start_edges.items()
+        if current in goal_edges:
+            neighbors += goal_edges[current].items()
+
+        for neighbor, cost in neighbors:
+            tentative_g_score = current_g + cost
+            if neighbor not in closed and tentative_g_score < g_score.get(neighbor, tentative_g_score + 1):
+                g_score[neighbor] = tentative_g_score
+                parent[neighbor] = current
+                heapq.heappush(open_list, (tentative_g_score + heuristic(neighbor), tentative_g_score, tie_break(grid, neighbor), neighbor))
+                if events is not None:
+                    events.append((FRONTIER, neighbor))
+
+    pushes = abstract_count + stale_pops + len(open_list)  # Every push was either popped or is still queued
+    if abstract_path is None:
+        if stats is not None:
+            stats.end(SEARCH, node_count, cluster_node_count + pushes, pushes, stale_pops, peak_frontier)
+        return None, node_count  # If no path is found
+
+    if stats is not None:
+        stats.phase(SEARCH)
+
+    # Refine: abstract nodes one step apart are already adjacent, the others share a cluster and are joined by a BFS inside it
+    path = [start_id]
+    for a, b in zip(abstract_path, abstract_path[1:]):
+        if g_score[b] - g_score[a] == 1:
+            path.append(b)
+            continue
+        _, link, count = cluster_bfs(grid, a, cluster_bounds(grid, a, cluster_size), (b,))
+        node_count += count
+        cluster_node_count += count
+        segment = []
+        while b != a:
+            segment.append(b)
+            b = link[b]
+        path.extend(reversed(segment))
+
+    if events is not None:
+        events.append((GOAL, path[-1]))
+    path = ids_to_cells(grid, path)
+    if stats is not None:
+        stats.end(RECONSTRUCTION, node_count, cluster_node_count + pushes, pushes, stale_pops, peak_frontier)
+    return path, node_count
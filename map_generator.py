@@ -0,0 +1,113 @@
+# map_generator.py
+
+import random
+from file_parser import walls_from_cells
+from grid import WALL, rasterize_walls
+
+# Every generator returns the same (rows, cols, markers, goals, walls) tuple as file_parser.read_input_file,
+# with walls given as (col, row, width, height) rectangles
+
+def open_map(size, seed=0):
+    """Empty square map with the start and goal in opposite corners."""
+    return size, size, [(0, size - 1)], [(size - 1, 0)], []
+
+def random_map(size, seed=0, density=0.3):
+    """Square map cluttered with small random wall blocks covering roughly the given fraction of cells."""
+    rng = random.Random(seed)
+    walls = []
+    covered = 0
+    while covered < density * size * size:
+        width = rng.randint(1, min(5, size))
+        height = rng.randint(1, min(5, size))
+        walls.append((rng.randrange(size - width + 1), rng.randrange(size - height + 1), width, height))
+        covered += width * height
+
+    # Start and goal near opposite corners, on the closest cells that are not walls
+    occupancy = rasterize_walls(size, size, walls)
+    start = nearest_free_cell(occupancy, size, size, (0, size - 1))
+    goal = nearest_free_cell(occupancy, size, size, (size - 1, 0))
+    if start is None or goal is None or start == goal:
+        return size, size, [(0, size - 1)], [(size - 1, 0)], []  # Fully walled off (tiny maps only); fall back to an open map
+    return size, size, [start], [goal], walls
+
+def maze_map(size, seed=0):
+    """Perfect maze (one path between any two rooms) carved with an iterative recursive backtracker."""
+    rng = random.Random(seed)
+    rooms = (size + 1) // 2  # Rooms sit on even (col, row) cells, the odd cells between them are walls or passages
+    cells = bytearray([WALL]) * (size * size)  # A grid cell buffer, all walls until carved out
+
+    # Carve the maze with an explicit stack so large mazes do not hit the recursion limit
+    visited = bytearray(rooms * rooms)
+    visited[0] = 1
+    cells[0] = 0
+    stack = [(0, 0)]
+    while stack:
+        room_col, room_row = stack[-1]
+        options = []
+        for d_col, d_row in ((0, -1), (-1, 0), (0, 1), (1, 0)):
+            n_col, n_row = room_col + d_col, room_row + d_row
+            if 0 <= n_col < rooms and 0 <= n_row < rooms and not visited[n_row * rooms + n_col]:
+                options.append((n_col, n_row))
+        if not options:
+            stack.pop()
+            continue
+        n_col, n_row = rng.choice(options)
+        visited[n_row * rooms + n_col] = 1
+        cells[(room_row + n_row) * size + (room_col + n_col)] = 0  # Passage between the two rooms
+        cells[(2 * n_row) * size + 2 * n_col] = 0
+        stack.append((n_col, n_row))
+
+    # The goal is the room in the opposite corner
+    last = 2 * (rooms - 1)
+    return size, size, [(0, 0)], [(last, last)], walls_from_cells(cells, size, size)
+
+def corridor_map(size, seed=0):
+    """Serpentine corridor: every odd row is a wall with a gap at alternating ends, so the path snakes through the whole map."""
+    walls = []
+    for row in range(1, size, 2):
+        if (row // 2) % 2 == 0:
+            walls.append((0, row, size - 1, 1))  # Gap on the right
+        else:
+            walls.append((1, row, size - 1, 1))  # Gap on the left
+    goal_row = size - 1 if size % 2 == 1 else size - 2
+    goal_col = size - 1 if (goal_row // 2) % 2 == 0 else 0
+    return size, size, [(0, 0)], [(goal_col, goal_row)], walls
+
+def unreachable_map(size, seed=0):
+    """Map split in two by a full-height wall, with the start and goal on different sides."""
+    middle = size // 2
+    return size, size, [(0, size - 1)], [(size - 1, 0)], [(middle, 0, 1, size)]
+
+# Maps the map kind to its generator
+GENERATORS = {
+    'open': open_map,
+    'random': random_map,
+    'maze': maze_map,
+    'corridor': corridor_map,
+    'unreachable': unreachable_map
+}
+
+def generate_map(kind, size, seed=0):
+    """Generate a map of the given kind and size; the same seed always gives the same map."""
+    return GENERATORS[kind](size, seed)
+
+def nearest_free_cell(occupancy, rows, cols, cell):
+    """Find the free cell closest (by Manhattan distance) to the given (col, row) cell."""
+    target_col, target_row = cell
+    for distance in range(rows + cols):
+        for d_col in range(-distance, distance + 1):
+            d_row = distance - abs(d_col)
+            for n_row in {target_row - d_row, target_row + d_row}:
+                n_col = target_col + d_col
+                if 0 <= n_col < cols and 0 <= n_row < rows and not occupancy[n_row * cols + n_col]:
+                    return (n_col, n_row)
+    return None
+
+def write_map_file(output_file, rows, cols, markers, goals, walls):
+    """Write a map in the text format read by file_parser.read_input_file."""
+    with open(output_file, 'w') as file:
+        file.write(f"[{rows},{cols}]\n")
+        file.write(f"({markers[0][0]},{markers[0][1]})\n")
+        file.write(" | ".join(f"({goal[0]},{goal[1]})" for goal in goals) + "\n")
+        for wall in walls:
+            file.write("(" + ",".join(str(value) for value in wall) + ")\n")  # Walls have 4 values, terrain 5
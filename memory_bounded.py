@@ -0,0 +1,377 @@
+# memory_bounded.py
+
+import heapq
+from heuristics import cost_heuristic, nearest_goal_heuristic
+from pathfinding import (RESET, EXPANDED, FRONTIER, GOAL, NO_PARENT, astar, ids_to_cells, path_cost, priority_bits,
+                         reachable_goals, tie_break)
+from stats import SETUP, SEARCH, RECONSTRUCTION
+
+# Searches whose memory does not grow with the map. The searches in pathfinding keep a few arrays with an entry
+# for every cell; on the largest maps that alone can be too much per query. Beam search keeps only the best
+# few nodes of every layer (plus one bit per cell to mark them), and SMA* keeps at most a fixed number of nodes,
+# forgetting the least promising ones when it runs out and regenerating them later if it has to (plus one bit
+# per cell to notice when it keeps regenerating the same ones).
+# Neither is guaranteed to find the shortest path; optimality_gap says how far off an answer is.
+
+BEAM_WIDTH = 64  # Nodes kept per layer by beam_search
+SMA_BUDGET = 100000  # Nodes held at once by sma_star
+UNBOUNDED = float('inf')  # f-value of nodes that cannot lead to a goal within the budget
+REGENERATION_FACTOR = 100  # sma_star gives up once it has expanded cells again this many times as often as for the first time
+COMPACT_FACTOR = 2  # SMA* rebuilds its heaps once stale entries make them this many times the budget
+
+def beam_search(grid, start, goals, events=None, heuristic=None, stats=None, width=BEAM_WIDTH, bitset=True):
+    """Greedy best-first search that keeps only the width best nodes of each layer.
+
+    Every layer is expanded in full, and of the new nodes it reaches only the width with the lowest heuristic
+    survive into the next one; the rest are dropped for good, so the search can miss a path that exists.
+    Memory is width nodes per layer: the parents of the kept nodes, and a visited set of them, one bit per
+    cell (size / 8 bytes) with bitset, or a set of cell ids (which only grows with the nodes kept) without.
+    """
+    if stats is not None:
+        stats.begin()
+
+    if events is not None:
+        events.append((RESET, -1))  # Clear the GUI before starting the search, in case there are multiple to be done
+
+    # Goals in another connected area can never be reached, so leave them out (and stop at once if none is left)
+    goals = reachable_goals(grid, start, goals)
+    if not goals:
+        if stats is not None:
+            stats.end(SETUP, 0, 0)
+        return None, 0
+
+    start_id = grid.index(start)
+    goal_ids = {grid.index(goal) for goal in goals}  # Goal cell ids for O(1) goal checks
+
+    if heuristic is None:
+        heuristic = cost_heuristic(grid, goals)
+
+    masks, moves = grid.neighbor_table()  # Open neighbours of a cell: current + offset for offset in moves[masks[current]]
+
+    # Layers are ranked by single integers, heuristic << tie_bits | tie-break (see priority_bits)
+    rows, cols = grid.rows, grid.cols
+    tie_bits, _ = priority_bits(grid)
+    tie_mask = (1 << tie_bits) - 1
+
+    if bitset:
+        visited_bits = bytearray((grid.size + 7) >> 3)
+        visited_bits[start_id >> 3] |= 1 << (start_id & 7)
+    else:
+        visited = {start_id}
+    parent = {start_id: NO_PARENT}  # Only the nodes ever kept in the beam
+    beam = [start_id]
+    node_count = 0
+    generated = 1
+    peak_frontier = 0
+    if stats is not None:
+        stats.phase(SETUP)
+
+    while beam:
+        if stats is not None and len(beam) > peak_frontier:
+            peak_frontier = len(beam)
+
+        # Expand the whole layer, best node first; candidates maps each new node to the first node that reached it
+        candidates = {}
+        for current in beam:
+            node_count += 1
+            if events is not None:
+                events.append((EXPANDED, current))
+
+            if current in goal_ids:
+                if events is not None:
+                    events.append((GOAL, current))
+                if stats is not None:
+                    stats.phase(SEARCH)
+                path = [current]
+                while parent[path[-1]] != NO_PARENT:
+                    path.append(parent[path[-1]])
+                path.reverse()  # Reverse the path to get from start to goal
+                path = ids_to_cells(grid, path)
+                if stats is not None:
+                    stats.end(RECONSTRUCTION, node_count, generated, 0, 0, peak_frontier)
+                return path, node_count
+
+            for offset in moves[masks[current]]:
+                neighbor = current + offset
+                if bitset:
+                    if visited_bits[neighbor >> 3] & (1 << (neighbor & 7)):
+                        continue
+                elif neighbor in visited:
+                    continue
+                if neighbor not in candidates:
+                    candidates[neighbor] = current
+
+        # Keep the width best candidates as the next layer, in the order they will be expanded
+        ranked = []
+        for neighbor in candidates:
+            row, col = divmod(neighbor, cols)
+            ranked.append(heuristic(neighbor) << tie_bits | col * rows + row)
+        beam = []
+        for key in heapq.nsmallest(width, ranked):
+            neighbor_col, neighbor_row = divmod(key & tie_mask, rows)
+            neighbor = neighbor_row * cols + neighbor_col
+            beam.append(neighbor)
+            parent[neighbor] = candidates[neighbor]
+            if bitset:
+                visited_bits[neighbor >> 3] |= 1 << (neighbor & 7)
+            else:
+                visited.add(neighbor)
+            if events is not None:
+                events.append((FRONTIER, neighbor))
+        generated += len(beam)
+
+    # Every node left in reach was dropped from an earlier layer (or there is no path at all)
+    if stats is not None:
+        stats.end(SEARCH, node_count, generated, 0, 0, peak_frontier)
+    return None, node_count
+
+class Node:
+    """A node SMA* holds in memory: a cell reached along the path through its parent node."""
+    __slots__ = ('cell', 'g', 'f', 'parent', 'depth', 'expanded', 'children', 'forgotten', 'queued')
+
+    def __init__(self, cell, g, f, parent, depth):
+        self.cell = cell
+        self.g = g
+        self.f = f  # Lower bound on a path through it; once it has lost its children, the lowest f they had (backed up)
+        self.parent = parent  # Id of the parent node, NO_PARENT for the start
+        self.depth = depth
+        self.expanded = False
+        # Both made on first use, as most nodes are leaves that never need them
+        self.children = None  # Ids of the nodes in memory whose parent this is; a node without any is a leaf
+        self.forgotten = None  # Cell id -> f of the children dropped from memory since, to regenerate them with
+        self.queued = None  # The f it is queued for expansion with, None while it is not queued
+
+def sma_star(grid, start, goals, events=None, heuristic=None, stats=None, budget=SMA_BUDGET):
+    """Simplified memory-bounded A* (SMA*): A* that holds at most budget nodes at once.
+
+    When memory is full the leaf with the highest f (the shallowest of those) is dropped, and its parent
+    remembers its f; the parent is queued again with that f, so the dropped node is only regenerated (with
+    the f it had) once nothing in memory looks better. A node left without children backs up the lowest f
+    it forgot, so f-values only grow as the search learns more. Nodes too deep to fit in the budget with their
+    path get f = infinity. A successor is not generated if memory already holds its cell at least as cheaply,
+    and a node whose cell was since reached more cheaply is a dead end. With a consistent heuristic and a
+    budget that never runs out the path is a shortest one; with less memory it can be dearer (see
+    optimality_gap), and None means no path was found within the budget.
+
+    Budgets that can barely hold the path make SMA* thrash, regenerating the same nodes over and over, so it
+    gives up and returns (None, node_count) rather than search on: at once if the budget is smaller than the
+    step distance to the nearest goal plus one (no path could fit), and otherwise once it has expanded cells
+    again REGENERATION_FACTOR times as often as for the first time (one bit per cell keeps track). The
+    second limit can miss a path that a much longer search would have found.
+    """
+    if budget < grid.connectivity + 1:
+        raise ValueError(f"SMA* needs a budget of at least {grid.connectivity + 1} nodes, not {budget}")
+
+    if stats is not None:
+        stats.begin()
+
+    if events is not None:
+        events.append((RESET, -1))  # Clear the GUI before starting the search, in case there are multiple to be done
+
+    # Goals in another connected area can never be reached, so leave them out (and stop at once if none is left)
+    goals = reachable_goals(grid, start, goals)
+    if not goals:
+        if stats is not None:
+            stats.end(SETUP, 0, 0)
+        return None, 0
+
+    start_id = grid.index(start)
+    goal_ids = {grid.index(goal) for goal in goals}  # Goal cell ids for O(1) goal checks
+
+    # Every path takes at least the step distance to the nearest goal, plus one node for the start; if that
+    # many nodes cannot be held at once, no path can be, so give up before searching
+    if nearest_goal_heuristic(grid, goals)(start_id) + 1 > budget:
+        if stats is not None:
+            stats.end(SETUP, 0, 0)
+        return None, 0
+
+    if heuristic is None:
+        heuristic = cost_heuristic(grid, goals)
+
+    costs = grid.costs
+    masks, moves = grid.neighbor_table()  # Open neighbours of a cell: current + offset for offset in moves[masks[current]]
+
+    root = 0  # Node ids count up from the start's node
+    nodes = {root: Node(start_id, 0, heuristic(start_id), NO_PARENT, 0)}
+    cheapest = {start_id: root}  # Cell id -> id of the node in memory that reaches it most cheaply
+    next_id = 1
+    # Both heaps skip stale entries when popped: the open list gives the lowest f (deepest first) to expand,
+    # and the leaves the highest f (shallowest first) to drop when memory is full
+    open_list = []
+    leaves = []
+    pushes = 0
+    stale_pops = 0
+    peak_frontier = 0
+
+    def queue(node_id, node, f):
+        nonlocal pushes
+        node.queued = f
+        heapq.heappush(open_list, (f, -node.depth, tie_break(grid, node.cell), node_id))
+        pushes += 1
+
+    def add_leaf(node_id, node):
+        heapq.heappush(leaves, (-node.f, node.depth, tie_break(grid, node.cell), node_id))
+
+    def compact():
+        # Stale entries pile up in long searches; rebuild both heaps from the nodes in memory
+        open_list[:] = [(node.queued, -node.depth, tie_break(grid, node.cell), node_id)
+                        for node_id, node in nodes.items() if node.queued is not None]
+        leaves[:] = [(-node.f, node.depth, tie_break(grid, node.cell), node_id)
+                     for node_id, node in nodes.items() if not node.children]
+        heapq.heapify(open_list)
+        heapq.heapify(leaves)
+
+    def make_leaf(node_id, node):
+        # An expanded node left without children backs up the lowest f it forgot. Only leaves are dropped or
+        # remembered by their parents, so the f of a node with children is never read and is not kept up to date
+        node.f = min(node.forgotten.values()) if node.forgotten else UNBOUNDED
+        add_leaf(node_id, node)
+
+    def drop_leaf(expanding):
+        # Forget the worst leaf and hand its f to its parent; never the start, nor the node being expanded
+        # (a leaf again if all its new children were dropped). Returns False if there is no other leaf
+        kept = None
+        while leaves:
+            entry = heapq.heappop(leaves)
+            negative_f, depth, _, node_id = entry
+            node = nodes.get(node_id)
+            if node is None or node.children or node.f != -negative_f or node.depth != depth or node_id == root:
+                continue
+            if node_id == expanding:
+                kept = entry
+                continue
+            if kept is not None:
+                heapq.heappush(leaves, kept)
+
+            del nodes[node_id]
+            if cheapest.get(node.cell) == node_id:
+                del cheapest[node.cell]
+            parent = nodes[node.parent]
+            parent.children.remove(node_id)
+            if parent.forgotten is None:
+                parent.forgotten = {}
+            parent.forgotten[node.cell] = min(node.f, parent.forgotten.get(node.cell, UNBOUNDED))
+            f = min(parent.forgotten.values())
+            if parent.queued is None or f < parent.queued:
+                queue(node.parent, parent, f)  # To regenerate what was dropped, once it is the best option again
+            if not parent.children:
+                make_leaf(node.parent, parent)
+            return True
+        if kept is not None:
+            heapq.heappush(leaves, kept)
+        return False
+
+    queue(root, nodes[root], nodes[root].f)
+    add_leaf(root, nodes[root])
+    node_count = 0
+    seen = bytearray((grid.size + 7) >> 3)  # One bit per cell, set once the cell has been expanded
+    cells_expanded = 0  # Cells expanded at least once
+    regenerations = 0  # Expansions of cells expanded before, their nodes having been forgotten and regenerated
+    if stats is not None:
+        stats.phase(SETUP)
+
+    while open_list:
+        if stats is not None and len(open_list) > peak_frontier:
+            peak_frontier = len(open_list)
+        if len(open_list) + len(leaves) > COMPACT_FACTOR * budget:
+            compact()
+
+        f, _, _, node_id = heapq.heappop(open_list)
+        node = nodes.get(node_id)
+        if node is None or node.queued != f:
+            stale_pops += 1
+            continue
+        if f == UNBOUNDED:
+            break  # Every path left is too long to fit in the budget
+        node.queued = None
+        current = node.cell
+
+        if cheapest.get(current) != node_id:
+            # Memory holds a cheaper way to this cell, which is searched from there instead
+            node.forgotten = None
+            node.expanded = True
+            if not node.children:
+                make_leaf(node_id, node)
+            continue
+
+        node_count += 1
+        if events is not None:
+            events.append((EXPANDED, current))
+
+        if current in goal_ids:
+            if events is not None:
+                events.append((GOAL, current))
+            if stats is not None:
+                stats.phase(SEARCH)
+            path = []
+            while node_id != NO_PARENT:
+                path.append(nodes[node_id].cell)
+                node_id = nodes[node_id].parent
+            path.reverse()  # Reverse the path to get from start to goal
+            path = ids_to_cells(grid, path)
+            if stats is not None:
+                stats.end(RECONSTRUCTION, node_count, next_id, pushes, stale_pops, peak_frontier)
+            return path, node_count
+
+        if seen[current >> 3] >> (current & 7) & 1:
+            regenerations += 1
+            if regenerations > REGENERATION_FACTOR * cells_expanded:
+                break  # Thrashing: the same few cells over and over, as memory cannot hold what it takes to get past them
+        else:
+            seen[current >> 3] |= 1 << (current & 7)
+            cells_expanded += 1
+
+        # The first expansion generates every successor not held as cheaply already; later ones only
+        # regenerate the forgotten ones, with the f they had when they were dropped
+        forgotten = node.forgotten or {}
+        node.forgotten = None
+        depth = node.depth + 1
+        for offset in moves[masks[current]]:
+            neighbor = current + offset
+            if node.expanded and neighbor not in forgotten:
+                continue
+            g = node.g + (costs[neighbor] if costs is not None else 1)
+            if neighbor in cheapest and nodes[cheapest[neighbor]].g <= g:
+                continue
+
+            # A path one node longer than the budget could never be held in memory at once
+            if depth >= budget - 1 and neighbor not in goal_ids:
+                child_f = UNBOUNDED
+            else:
+                child_f = max(node.f, g + heuristic(neighbor), forgotten.get(neighbor, 0))
+
+            child_id = next_id
+            next_id += 1
+            child = Node(neighbor, g, child_f, node_id, depth)
+            nodes[child_id] = child
+            cheapest[neighbor] = child_id  # Any dearer node of this cell becomes a dead end
+            if node.children is None:
+                node.children = []
+            node.children.append(child_id)
+            queue(child_id, child, child_f)
+            add_leaf(child_id, child)
+            if events is not None:
+                events.append((FRONTIER, neighbor))
+
+            while len(nodes) > budget and drop_leaf(node_id):
+                pass
+        node.expanded = True
+        if not node.children:
+            make_leaf(node_id, node)
+
+    if stats is not None:
+        stats.end(SEARCH, node_count, next_id, pushes, stale_pops, peak_frontier)
+    return None, node_count
+
+def optimality_gap(grid, start, goals, path):
+    """How close a path is to optimal: (cost, optimal cost, gap), gap being the extra cost as a fraction of the optimum.
+
+    The optimum comes from a full A* search. A missing path gets a cost of None and an infinite gap when a path
+    exists (0.0 when none does); a path to the start itself has a gap of 0.0.
+    """
+    best, _ = astar(grid, start, goals)
+    optimal = path_cost(grid, best) if best is not None else None
+    cost = path_cost(grid, path) if path is not None else None
+    if cost is None:
+        return None, optimal, UNBOUNDED if optimal is not None else 0.0
+    return cost, optimal, (cost - optimal) / optimal if optimal else 0.0
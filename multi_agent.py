@@ -0,0 +1,184 @@
+# multi_agent.py
+
+import heapq
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from grid import Grid
+from heuristics import goal_key
+from pathfinding import astar, NO_SCORE
+from wavefront import NO_DIRECTION, distance_field, field_path
+
+# Batch routing of many agents on one map: route_agents takes a list of (start, goals) queries and returns the
+# (path, node_count) every query would get from a search of its own. Agents heading for the same goal set share
+# one reverse search from those goals, and every such agent reads its path off the resulting tree (moves are
+# symmetric, so a path from the goals to the start walked backwards is a path from the start to the goals).
+# The remaining queries are independent and can be spread over a process pool; the workers read the grid (with
+# its neighbour masks and component labels) straight from a shared memory block instead of a copy of their own.
+
+SHARED_TREE_MIN = 2  # Agents with the same goal set from which one reverse search replaces their own searches
+CHUNKS_PER_WORKER = 4  # Independent queries are handed out in this many chunks per worker, to even out the load
+
+worker_grid = None  # The grid of a pool worker, attached from shared memory once when the worker starts
+worker_block = None  # The shared memory block behind worker_grid, kept open for the life of the worker
+
+def cost_field(grid, sources):
+    """Cheapest cost from every cell to the nearest of the (col, row) sources, on a grid with terrain costs.
+
+    Same shape as wavefront.distance_field (which does unit-cost grids), so field_path reads paths off it:
+    distances by cell id, NO_SCORE where no source can be reached, and the move towards the next cell on the
+    way to a source. A step costs the terrain cost of the cell entered, so a cell's cost is that of the path
+    from it to a source, not from the source to it.
+    """
+    masks, moves = grid.neighbor_table()
+    costs = grid.costs
+    offsets = grid.move_offsets[:grid.connectivity]
+    steps = [tuple((offsets[move], move ^ 2) for move in range(len(offsets)) if mask >> move & 1) for mask in range(256)]
+
+    distance = array('i', [NO_SCORE]) * grid.size
+    direction = bytearray([NO_DIRECTION]) * grid.size
+    settled = bytearray(grid.size)
+
+    # Heap entries are single integers cost << id_bits | cell id, as in astar
+    id_bits = grid.size.bit_length()
+    id_mask = (1 << id_bits) - 1
+    heap = []
+    for source in sources:
+        source_id = grid.index(source)
+        if not grid.is_wall(source_id) and distance[source_id] != 0:
+            distance[source_id] = 0
+            heap.append(source_id)
+    heapq.heapify(heap)
+
+    while heap:
+        current = heapq.heappop(heap) & id_mask
+        if settled[current]:
+            continue
+        settled[current] = 1
+
+        # Stepping from a neighbour onto current costs current's terrain cost
+        through_current = distance[current] + costs[current]
+        for offset, back in steps[masks[current]]:
+            neighbor = current + offset
+            if not settled[neighbor] and (distance[neighbor] == NO_SCORE or through_current < distance[neighbor]):
+                distance[neighbor] = through_current
+                direction[neighbor] = back
+                heapq.heappush(heap, through_current << id_bits | neighbor)
+
+    return distance, direction
+
+def goal_tree(grid, goals):
+    """One reverse search from a goal set; returns (field, node_count) for tree_path."""
+    field = (distance_field if grid.costs is None else cost_field)(grid, goals)
+    return field, grid.size - field[0].count(NO_SCORE)  # Every cell the search reached was expanded once
+
+def tree_path(grid, field, start):
+    """Path from a (col, row) start to the nearest goal of a goal_tree field, or None if no goal can be reached."""
+    path = field_path(grid, field, start)
+    if path is not None:
+        path.reverse()  # The field's paths run from the goal out to the start
+    return path
+
+def route_group(grid, goals, starts):
+    """Route every start to the shared goals with one reverse search; every query reports the search's node count."""
+    field, node_count = goal_tree(grid, goals)
+    return [(tree_path(grid, field, start), node_count) for start in starts]
+
+def route_each(grid, queries, algorithm):
+    """Run the algorithm on every (start, goals) query on its own."""
+    return [algorithm(grid, start, goals) for start, goals in queries]
+
+def share_grid(grid):
+    """Copy the grid into a new shared memory block: its component labels, cells, neighbour masks and terrain costs.
+
+    The masks and labels are built here first, so the workers never build their own. Returns the block, which
+    the caller must close and unlink, and the spec the workers attach to it with.
+    """
+    masks, _ = grid.neighbor_table()
+    labels = grid.component_labels()
+    has_costs = grid.costs is not None
+    size = grid.size
+    # Labels first, so that their 4-byte items start on the (page-aligned) start of the block
+    block = shared_memory.SharedMemory(create=True, size=labels.itemsize * size + size * (3 if has_costs else 2))
+    offset = labels.itemsize * size
+    block.buf[:offset] = labels.tobytes()
+    for buffer in (grid.cells, masks) + ((grid.costs,) if has_costs else ()):
+        block.buf[offset:offset + size] = buffer
+        offset += size
+    spec = (block.name, grid.rows, grid.cols, grid.connectivity, grid.corner_rule, labels.typecode, has_costs)
+    return block, spec
+
+def attach_grid(spec):
+    """Pool worker initializer: make a grid whose buffers are read-only views of the shared block.
+
+    Nothing is copied or rebuilt per worker. The block stays open for as long as the worker runs, as the
+    grid reads straight from it.
+    """
+    global worker_grid, worker_block
+    name, rows, cols, connectivity, corner_rule, label_type, has_costs = spec
+    worker_block = shared_memory.SharedMemory(name=name)
+    shared = worker_block.buf.toreadonly()
+    grid = Grid(rows, cols, connectivity, corner_rule)
+    size = grid.size
+    offset = array(label_type).itemsize * size
+    grid.labels = shared[:offset].cast(label_type)
+    grid.cells = shared[offset:offset + size]
+    grid.masks = shared[offset + size:offset + 2 * size]
+    if has_costs:
+        grid.costs = shared[offset + 2 * size:offset + 3 * size]
+    worker_grid = grid
+
+def worker_route_group(goals, starts):
+    return route_group(worker_grid, goals, starts)
+
+def worker_route_each(queries, algorithm):
+    return route_each(worker_grid, queries, algorithm)
+
+def route_agents(grid, queries, algorithm=astar, jobs=1, share_trees=True):
+    """Find a path for every (start, goals) query on the grid and return their (path, node_count) in query order.
+
+    With share_trees, goal sets asked for by at least SHARED_TREE_MIN queries are answered from one reverse search
+    (a breadth-first wavefront, or Dijkstra on terrain costs), so those paths are shortest paths whatever the
+    algorithm, and their node_count is that of the shared search. Every other query runs the algorithm.
+
+    jobs > 1 (or None for one per CPU) spreads the work over a process pool sharing the grid through shared
+    memory; the algorithm must then be a module-level function, so that it can be sent to the workers.
+    """
+    results = [None] * len(queries)
+
+    # Group the queries by goal set (goal_key ignores goal order and repeats)
+    groups = {}
+    if share_trees:
+        for i, (start, goals) in enumerate(queries):
+            groups.setdefault(goal_key(goals), []).append(i)
+        groups = {goals: indices for goals, indices in groups.items() if len(indices) >= SHARED_TREE_MIN}
+    shared = {i for indices in groups.values() for i in indices}
+    independent = [i for i in range(len(queries)) if i not in shared]
+
+    if jobs == 1:
+        for goals, indices in groups.items():
+            for i, result in zip(indices, route_group(grid, goals, [queries[i][0] for i in indices])):
+                results[i] = result
+        for i, result in zip(independent, route_each(grid, [queries[i] for i in independent], algorithm)):
+            results[i] = result
+        return results
+
+    workers = jobs or os.cpu_count() or 1
+    chunk_size = max(1, -(-len(independent) // (workers * CHUNKS_PER_WORKER)))
+    chunks = [independent[k:k + chunk_size] for k in range(0, len(independent), chunk_size)]
+
+    block, spec = share_grid(grid)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=attach_grid, initargs=(spec,)) as executor:
+            tasks = [(indices, executor.submit(worker_route_group, goals, [queries[i][0] for i in indices]))
+                     for goals, indices in groups.items()]
+            tasks += [(indices, executor.submit(worker_route_each, [queries[i] for i in indices], algorithm))
+                      for indices in chunks]
+            for indices, future in tasks:
+                for i, result in zip(indices, future.result()):
+                    results[i] = result
+    finally:
+        block.close()
+        block.unlink()
+    return results
@@ -1,396 +1,1091 @@
 # pathfinding.py
 
 import heapq
+from array import array
+from grid import WALL, WALL_MASK, NO_COMPONENT, FOUR_CONNECTED
+from heuristics import nearest_goal_heuristic, cost_heuristic
+from stats import SETUP, SEARCH, RECONSTRUCTION
+
+# Search events, emitted as (event, cell_id) tuples into the optional events list of each search.
+# The searches only append to the list; the GUI replays it later at its own frame rate.
+RESET = 0     # A new search (or a new iterative deepening bound) starts; cell_id is -1
+EXPANDED = 1  # The node was taken off the frontier and expanded
+FRONTIER = 2  # The node was added to the frontier
+GOAL = 3      # The node is the goal that was reached
+
+# Every search also takes an optional stats object (see stats.SearchStats) that it fills in with its counters
+# and phase times. Counts that follow from the frontier at the end are worked out there instead of in the loop,
+# and the few checks left in the loop are skipped when stats is None.
 
 # Depth-First Search (DFS)
-def dfs(grid, start, goals, update_gui=None, clear_gui=None):
-
-    clear_gui()  # Clear the GUI before starting the search, in case there are multiple to be done
-
-    rows, cols = len(grid), len(grid[0])  # Get grid dimensions
-    walls = {(c, r) for r in range(rows) for c in range(cols) if grid[r][c] == 'W'}  # Collect wall positions
-    
-    # Stack for DFS: Each element is a tuple (current_node, path_taken)
-    stack = [(start, [start])]
-    
-    # Set to keep track of visited nodes
-    visited = set()
+def dfs(grid, start, goals, events=None, stats=None):
+
+    if stats is not None:
+        stats.begin()
+
+    if events is not None:
+        events.append((RESET, -1))  # Clear the GUI before starting the search, in case there are multiple to be done
+
+    # Goals in another connected area can never be reached, so leave them out (and stop at once if none is left)
+    goals = reachable_goals(grid, start, goals)
+    if not goals:
+        if stats is not None:
+            stats.end(SETUP, 0, 0)
+        return None, 0
+
+    start_id = grid.index(start)
+    goal_ids = {grid.index(goal) for goal in goals}  # Goal cell ids for O(1) goal checks
+
+    masks, moves = grid.neighbor_table()  # Open neighbours of a cell: current + offset for offset in moves[masks[current]]
+
+    # Stack for DFS: Each element is a cell id, the path is rebuilt from the parent array at the goal
+    stack = [start_id]
+    parent = new_parent_array(grid)
+
+    # Array to keep track of visited nodes, indexed by cell id
+    visited = bytearray(grid.size)
     node_count = 0  # Counter for nodes created
+    stale_pops = 0  # Nodes popped again after they were visited
+    peak_frontier = 0
+    if stats is not None:
+        stats.phase(SETUP)
 
     while stack:
+        if stats is not None and len(stack) > peak_frontier:
+            peak_frontier = len(stack)
+
         # Pop the most recent node (LIFO order)
-        current, path = stack.pop()
-        
+        current = stack.pop()
+
         # Mark the current node as visited
-        if current in visited:
+        if visited[current]:
+            stale_pops += 1
             continue
-        
-        visited.add(current)
+
+        visited[current] = 1
         node_count += 1  # Increment the node counter
-        
-        # Update the GUI with the current position, visited nodes, and potential nodes (if a GUI callback is provided)
-        if update_gui:
-            potential_nodes = get_neighbors(current, walls, rows, cols)
-            update_gui(current, visited, potential_nodes)
-        
+
+        # Record the expansion for the GUI (if an events list is provided)
+        if events is not None:
+            events.append((EXPANDED, current))
+
         # Check if the current node is a goal
-        if current in goals:
+        if current in goal_ids:
+            if events is not None:
+                events.append((GOAL, current))
+            if stats is not None:
+                stats.phase(SEARCH)
+            path = ids_to_cells(grid, reconstruct_path(parent, current))
+            if stats is not None:
+                stats.end(RECONSTRUCTION, node_count, node_count + stale_pops + len(stack), 0, stale_pops, peak_frontier)
             return path, node_count  # Return the path to the goal and the node count
-        
-        # Get neighbors using the provided get_neighbors function
-        neighbors = get_neighbors(current, walls, rows, cols)
-        
+
         # Add neighbors to the stack in reverse order to maintain UP, LEFT, DOWN, RIGHT expansion order
-        for neighbor in reversed(neighbors):
-            if neighbor not in visited:
-                stack.append((neighbor, path + [neighbor]))
-    
+        for offset in reversed(moves[masks[current]]):
+            neighbor = current + offset
+            if not visited[neighbor]:
+                parent[neighbor] = current  # The latest push is popped first, so it owns the parent link
+                stack.append(neighbor)
+                if events is not None:
+                    events.append((FRONTIER, neighbor))
+
     # If the stack is empty and no goal was found
+    if stats is not None:
+        stats.end(SEARCH, node_count, node_count + stale_pops, 0, stale_pops, peak_frontier)
     return None, node_count  # Return None for path and the node count
 
 # Breadth-First Search (BFS)
-def bfs(grid, start, goals, update_gui=None, clear_gui=None):
-    
-    clear_gui()  # Clear the GUI before starting the search, in case there are multiple to be done
-
-    rows, cols = len(grid), len(grid[0])  # Get grid dimensions
-    walls = {(c, r) for r in range(rows) for c in range(cols) if grid[r][c] == 'W'}  # Collect wall positions
-    
-    # Queue for BFS: Each element is a tuple (current_node, path_taken)
-    queue = [(start, [start])]
-    
-    # Set to keep track of visited nodes
-    visited = set()
+def bfs(grid, start, goals, events=None, stats=None):
+
+    if stats is not None:
+        stats.begin()
+
+    if events is not None:
+        events.append((RESET, -1))  # Clear the GUI before starting the search, in case there are multiple to be done
+
+    # Goals in another connected area can never be reached, so leave them out (and stop at once if none is left)
+    goals = reachable_goals(grid, start, goals)
+    if not goals:
+        if stats is not None:
+            stats.end(SETUP, 0, 0)
+        return None, 0
+
+    start_id = grid.index(start)
+    goal_ids = {grid.index(goal) for goal in goals}  # Goal cell ids for O(1) goal checks
+
+    masks, moves = grid.neighbor_table()  # Open neighbours of a cell: current + offset for offset in moves[masks[current]]
+
+    # Queue for BFS: a preallocated array of cell ids with head/tail indices, so every enqueue and dequeue is O(1)
+    # Each cell is enqueued at most once, so rows * cols slots are always enough
+    queue = array('i', [0]) * grid.size
+    queue[0] = start_id
+    head, tail = 0, 1
+    parent = new_parent_array(grid)
+
+    # Array to keep track of discovered nodes, indexed by cell id; a node is marked when it enters the queue
+    discovered = bytearray(grid.size)
+    discovered[start_id] = 1
     node_count = 0  # Counter for nodes created
+    peak_frontier = 0
+    if stats is not None:
+        stats.phase(SETUP)
+
+    while head < tail:
+        if stats is not None and tail - head > peak_frontier:
+            peak_frontier = tail - head
 
-    while queue:
         # Dequeue the oldest node (FIFO order)
-        current, path = queue.pop(0)
-        
-        # Mark the current node as visited
-        if current in visited:
-            continue
-        
-        visited.add(current)
+        current = queue[head]
+        head += 1
         node_count += 1  # Increment the node counter
-        
-        # Update the GUI with the current position, visited nodes, and potential nodes (if a GUI callback is provided)
-        if update_gui:
-            potential_nodes = get_neighbors(current, walls, rows, cols)
-            update_gui(current, visited, potential_nodes)
-        
+
+        # Record the expansion for the GUI (if an events list is provided)
+        if events is not None:
+            events.append((EXPANDED, current))
+
         # Check if the current node is a goal
-        if current in goals:
+        if current in goal_ids:
+            if events is not None:
+                events.append((GOAL, current))
+            if stats is not None:
+                stats.phase(SEARCH)
+            path = ids_to_cells(grid, reconstruct_path(parent, current))
+            if stats is not None:
+                stats.end(RECONSTRUCTION, node_count, tail, 0, 0, peak_frontier)  # Every cell enqueued was generated once
             return path, node_count  # Return the path to the goal and the node count
-        
-        # Get neighbors using the provided get_neighbors function
-        neighbors = get_neighbors(current, walls, rows, cols)
-        
+
         # Enqueue neighbors to the queue
-        for neighbor in neighbors:
-            if neighbor not in visited:
-                queue.append((neighbor, path + [neighbor]))
-    
+        for offset in moves[masks[current]]:
+            neighbor = current + offset
+            if not discovered[neighbor]:
+                discovered[neighbor] = 1
+                parent[neighbor] = current
+                queue[tail] = neighbor
+                tail += 1
+                if events is not None:
+                    events.append((FRONTIER, neighbor))
+
     # If the queue is empty and no goal was found
+    if stats is not None:
+        stats.end(SEARCH, node_count, tail, 0, 0, peak_frontier)
     return None, node_count  # Return None for path and the node count
 
 
-# Heuristic function for Greedy Best-First Search (GBFS)
-# Manhattan Distance
-def manhattan_distance(node, goals):
-    return min(abs(node[0] - goal[0]) + abs(node[1] - goal[1]) for goal in goals)
-
 # Greedy Best-First Search (GBFS)
-def gbfs(grid, start, goals, update_gui=None, clear_gui=None):
-
-    clear_gui()  # Clear the GUI before starting the search, in case there are multiple to be done
-    
-    rows, cols = len(grid), len(grid[0])  # Get grid dimensions
-    walls = {(c, r) for r in range(rows) for c in range(cols) if grid[r][c] == 'W'}  # Collect wall positions
-    
-    # Priority queue for GBFS: Each element is a tuple (priority, (current_node))
-    priority_queue = []
-    heapq.heappush(priority_queue, (0, start))  # Initial node has 0 priority
-    came_from = {start: None}  # To reconstruct the path
+def gbfs(grid, start, goals, events=None, heuristic=None, stats=None):
+
+    if stats is not None:
+        stats.begin()
+
+    if events is not None:
+        events.append((RESET, -1))  # Clear the GUI before starting the search, in case there are multiple to be done
+
+    # Goals in another connected area can never be reached, so leave them out (and stop at once if none is left)
+    goals = reachable_goals(grid, start, goals)
+    if not goals:
+        if stats is not None:
+            stats.end(SETUP, 0, 0)
+        return None, 0
+
+    start_id = grid.index(start)
+    goal_ids = {grid.index(goal) for goal in goals}  # Goal cell ids for O(1) goal checks
+
+    # Heuristic by cell id: Manhattan distance to the nearest goal (times the cheapest step cost) unless another one is given
+    if heuristic is None:
+        heuristic = cost_heuristic(grid, goals)
+
+    masks, moves = grid.neighbor_table()  # Open neighbours of a cell: current + offset for offset in moves[masks[current]]
+
+    # Priority queue for GBFS: each element is one integer, priority << tie_bits | tie-break (see priority_bits)
+    rows, cols = grid.rows, grid.cols
+    tie_bits, _ = priority_bits(grid)
+    tie_mask = (1 << tie_bits) - 1
+    priority_queue = [tie_break(grid, start_id)]  # Initial node has 0 priority
+    parent = new_parent_array(grid)  # To reconstruct the path
     node_count = 0  # Counter for nodes created
 
-    # Set to keep track of visited nodes
-    visited = set()
+    # Array to keep track of the nodes queued so far, indexed by cell id. A node's priority never changes,
+    # so it is queued once, when first seen, and every node popped is expanded (no visited check needed)
+    queued = bytearray(grid.size)
+    queued[start_id] = 1
+    peak_frontier = 0
+    if stats is not None:
+        stats.phase(SETUP)
 
     while priority_queue:
-        # Pop the node with the lowest heuristic cost (the best node)
-        current_priority, current = heapq.heappop(priority_queue)  # Unpack priority and current node
+        if stats is not None and len(priority_queue) > peak_frontier:
+            peak_frontier = len(priority_queue)
 
-        # Mark the current node as visited
-        if current in visited:
-            continue
-        
-        visited.add(current)
+        # Pop the node with the lowest heuristic cost (the best node), and turn its tie-break back into its cell id
+        current_col, current_row = divmod(heapq.heappop(priority_queue) & tie_mask, rows)
+        current = current_row * cols + current_col
         node_count += 1  # Increment the node counter
-        
-        # Update the GUI with the current position, visited nodes, and potential nodes (if a GUI callback is provided)
-        if update_gui:
-            potential_nodes = get_neighbors(current, walls, rows, cols)
-            update_gui(current, visited, potential_nodes)
-        
+
+        # Record the expansion for the GUI (if an events list is provided)
+        if events is not None:
+            events.append((EXPANDED, current))
+
         # Check if the current node is a goal
-        if current in goals:
-            # Reconstruct the path
-            path = []
-            while current is not None:
-                path.append(current)
-                current = came_from[current]
-            path.reverse()  # Reverse the path to get from start to goal
+        if current in goal_ids:
+            if events is not None:
+                events.append((GOAL, current))
+            if stats is not None:
+                stats.phase(SEARCH)
+            path = ids_to_cells(grid, reconstruct_path(parent, current))
+            if stats is not None:
+                pushes = node_count + len(priority_queue)  # Every push was either popped or is still queued
+                stats.end(RECONSTRUCTION, node_count, pushes, pushes, 0, peak_frontier)
             return path, node_count  # Return the path to the goal and the node count
-        
-        # Get neighbors using the provided get_neighbors function
-        neighbors = get_neighbors(current, walls, rows, cols)
-
-        # Enqueue neighbors with their heuristic cost (priority)
-        for neighbor in neighbors:
-            if neighbor not in visited:
-                # Calculate the priority using the heuristic function
-                priority = manhattan_distance(neighbor, goals)
-                heapq.heappush(priority_queue, (priority, neighbor))
-                if neighbor not in came_from:  # Only update if neighbor is seen for the first time
-                    came_from[neighbor] = current
+
+        # Enqueue the neighbors seen for the first time with their heuristic cost (priority)
+        for offset in moves[masks[current]]:
+            neighbor = current + offset
+            if not queued[neighbor]:
+                queued[neighbor] = 1
+                parent[neighbor] = current
+                row, col = divmod(neighbor, cols)
+                heapq.heappush(priority_queue, heuristic(neighbor) << tie_bits | col * rows + row)
+                if events is not None:
+                    events.append((FRONTIER, neighbor))
 
     # If the priority queue is empty and no goal was found
+    if stats is not None:
+        stats.end(SEARCH, node_count, node_count, node_count, 0, peak_frontier)
     return None, node_count  # Return None for path and the node count
 
 # A* Search Algorithm
-def astar(grid, start, goals, update_gui=None, clear_gui=None):
+def astar(grid, start, goals, events=None, heuristic=None, stats=None):
 
-    clear_gui()  # Clear the GUI before starting the search, in case there are multiple to be done
+    if stats is not None:
+        stats.begin()
 
-    rows, cols = len(grid), len(grid[0])  # Get grid dimensions
-    walls = {(c, r) for r in range(rows) for c in range(cols) if grid[r][c] == 'W'}  # Collect wall positions
+    if events is not None:
+        events.append((RESET, -1))  # Clear the GUI before starting the search, in case there are multiple to be done
 
-    # Priority queue for A* (min-heap)
-    open_list = []
-    start_f_value = manhattan_distance(start, goals)
-    heapq.heappush(open_list, (start_f_value, 0, start, [start]))  # (f(n), g(n), position, path)
+    # Goals in another connected area can never be reached, so leave them out (and stop at once if none is left)
+    goals = reachable_goals(grid, start, goals)
+    if not goals:
+        if stats is not None:
+            stats.end(SETUP, 0, 0)
+        return None, 0
+
+    start_id = grid.index(start)
+    goal_ids = {grid.index(goal) for goal in goals}  # Goal cell ids for O(1) goal checks
+
+    # Heuristic by cell id: Manhattan distance to the nearest goal (times the cheapest step cost) unless another one is given
+    if heuristic is None:
+        heuristic = cost_heuristic(grid, goals)
+
+    # Cost of entering each cell, None when every step costs 1
+    costs = grid.costs
+    masks, moves = grid.neighbor_table()  # Open neighbours of a cell: current + offset for offset in moves[masks[current]]
+
+    # Priority queue for A* (min-heap) of single integers (f(n) << cost_bits | g(n)) << tie_bits | tie-break:
+    # they order like the tuples (f(n), g(n), tie-break) would, but compare in one step (see priority_bits)
+    rows, cols = grid.rows, grid.cols
+    tie_bits, cost_bits = priority_bits(grid)
+    tie_mask = (1 << tie_bits) - 1
+    open_list = [heuristic(start_id) << cost_bits << tie_bits | tie_break(grid, start_id)]
 
     # To reconstruct the path
-    came_from = {start: None}
+    parent = new_parent_array(grid)
     node_count = 0  # Counter for nodes created
 
-    # g_score for each node
-    g_score = {start: 0}  
-    # f_score for each node
-    f_score = {start: start_f_value}
+    # g_score for each node, NO_SCORE until the node is first reached
+    g_score = new_score_array(grid)
+    g_score[start_id] = 0
 
-    visited = set()  # Set to keep track of visited nodes
+    # Array to keep track of visited nodes, indexed by cell id
+    visited = bytearray(grid.size)
+    stale_pops = 0  # Entries of nodes popped again after they were visited
+    peak_frontier = 0
+    if stats is not None:
+        stats.phase(SETUP)
 
     while open_list:
-        # Get the node with the lowest f(n) score
-        current_f, current_g, current, path = heapq.heappop(open_list)
+        if stats is not None and len(open_list) > peak_frontier:
+            peak_frontier = len(open_list)
+
+        # Get the node with the lowest f(n) score, turning its tie-break back into its cell id
+        current_col, current_row = divmod(heapq.heappop(open_list) & tie_mask, rows)
+        current = current_row * cols + current_col
 
-        # Skip if already visited
-        if current in visited:
+        # Skip if already visited (it was queued again after a cheaper path to it turned up)
+        if visited[current]:
+            stale_pops += 1
             continue
 
         # Mark the current node as visited
-        visited.add(current)
+        visited[current] = 1
 
         # Increment the node counter
-        node_count += 1  
+        node_count += 1
 
-        # Update the GUI with the current position, visited nodes, and potential nodes (if a GUI callback is provided)
-        if update_gui:
-            potential_nodes = get_neighbors(current, walls, rows, cols)
-            update_gui(current, visited, potential_nodes)
+        # Record the expansion for the GUI (if an events list is provided)
+        if events is not None:
+            events.append((EXPANDED, current))
 
         # Check if the current node is a goal
-        if current in goals:
+        if current in goal_ids:
+            if events is not None:
+                events.append((GOAL, current))
+            if stats is not None:
+                stats.phase(SEARCH)
             # Reconstruct the path to the goal
-            full_path = []
-            while current is not None:
-                full_path.append(current)
-                current = came_from[current]
-            full_path.reverse()  # Reverse to get path from start to goal
-            return full_path, len(visited)  # Return path and visited node count
-        
-        # Get neighbors using the provided get_neighbors function
-        for neighbor in get_neighbors(current, walls, rows, cols):
-            tentative_g_score = g_score[current] + 1  # Cost from current to neighbor is assumed to be 1
+            path = ids_to_cells(grid, reconstruct_path(parent, current))
+            if stats is not None:
+                pushes = node_count + stale_pops + len(open_list)  # Every push was either popped or is still queued
+                stats.end(RECONSTRUCTION, node_count, pushes, pushes, stale_pops, peak_frontier)
+            return path, node_count  # Return path and visited node count
+
+        for offset in moves[masks[current]]:
+            neighbor = current + offset
+            tentative_g_score = g_score[current] + (costs[neighbor] if costs is not None else 1)  # Cost of stepping onto neighbor
 
             # If this path to neighbor is better than any previous one
-            if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
-                came_from[neighbor] = current
+            if g_score[neighbor] == NO_SCORE or tentative_g_score < g_score[neighbor]:
+                parent[neighbor] = current
                 g_score[neighbor] = tentative_g_score
-                f_score[neighbor] = tentative_g_score + manhattan_distance(neighbor, goals)
+                f_score = tentative_g_score + heuristic(neighbor)
 
-                if neighbor not in visited:
-                    heapq.heappush(open_list, (f_score[neighbor], tentative_g_score, neighbor, path + [neighbor]))
+                if not visited[neighbor]:
+                    row, col = divmod(neighbor, cols)
+                    heapq.heappush(open_list, (f_score << cost_bits | tentative_g_score) << tie_bits | col * rows + row)
+                    if events is not None:
+                        events.append((FRONTIER, neighbor))
 
     # If the open_list is empty and no goal was found
+    if stats is not None:
+        stats.end(SEARCH, node_count, node_count + stale_pops, node_count + stale_pops, stale_pops, peak_frontier)
     return None, node_count  # Return None for path and the visited node count
 
 
+# Uniform-Cost Search (UCS), i.e. Dijkstra's algorithm on the terrain costs
+def ucs(grid, start, goals, events=None, stats=None):
+
+    if stats is not None:
+        stats.begin()
+
+    if events is not None:
+        events.append((RESET, -1))  # Clear the GUI before starting the search, in case there are multiple to be done
+
+    # Goals in another connected area can never be reached, so leave them out (and stop at once if none is left)
+    goals = reachable_goals(grid, start, goals)
+    if not goals:
+        if stats is not None:
+            stats.end(SETUP, 0, 0)
+        return None, 0
+
+    start_id = grid.index(start)
+    goal_ids = {grid.index(goal) for goal in goals}  # Goal cell ids for O(1) goal checks
+
+    # Cost of entering each cell, None when every step costs 1
+    costs = grid.costs
+    masks, moves = grid.neighbor_table()  # Open neighbours of a cell: current + offset for offset in moves[masks[current]]
+
+    # Bucket queue (Dial's algorithm): step costs are small integers, so the frontier is kept as one list of
+    # cell ids per cost. A node is never more than the largest step cost ahead of the one being expanded,
+    # so largest cost + 1 buckets, reused round-robin, are enough and push/pop are O(1) with no heap at all
+    bucket_count = (max(costs) if costs is not None else 1) + 1
+    buckets = [[] for _ in range(bucket_count)]
+    buckets[0].append(start_id)
+    queued = 1  # Entries across all buckets
+    distance = 0  # Cost of the bucket being expanded
+
+    parent = new_parent_array(grid)  # To reconstruct the path
+    g_score = new_score_array(grid)  # Cheapest known cost to each cell, NO_SCORE until the cell is first reached
+    g_score[start_id] = 0
+    visited = bytearray(grid.size)  # Array to keep track of expanded nodes, indexed by cell id
+    node_count = 0  # Counter for nodes created
+    stale_pops = 0  # Entries of nodes taken again after they were expanded
+    peak_frontier = 0
+    if stats is not None:
+        stats.phase(SETUP)
+
+    while queued:
+        if stats is not None and queued > peak_frontier:
+            peak_frontier = queued
+
+        # Take the whole bucket of the current cost; nodes found from it always land in later buckets
+        slot = distance % bucket_count
+        bucket = buckets[slot]
+        buckets[slot] = []
+        queued -= len(bucket)
+
+        for current in bucket:
+            # Skip entries left behind when a cheaper way to the node was found
+            if visited[current]:
+                stale_pops += 1
+                continue
+            visited[current] = 1
+            node_count += 1
+
+            # Record the expansion for the GUI (if an events list is provided)
+            if events is not None:
+                events.append((EXPANDED, current))
+
+            # Check if the current node is a goal; it is expanded in cost order, so no cheaper path exists
+            if current in goal_ids:
+                if events is not None:
+                    events.append((GOAL, current))
+                if stats is not None:
+                    stats.phase(SEARCH)
+                path = ids_to_cells(grid, reconstruct_path(parent, current))
+                if stats is not None:
+                    # Every entry was taken, is left in this bucket (after the first, expanded entry of current) or is still queued
+                    generated = node_count + stale_pops + (len(bucket) - bucket.index(current) - 1) + queued
+                    stats.end(RECONSTRUCTION, node_count, generated, 0, stale_pops, peak_frontier)
+                return path, node_count
+
+            for offset in moves[masks[current]]:
+                neighbor = current + offset
+                if visited[neighbor]:
+                    continue
+                tentative_g_score = distance + (costs[neighbor] if costs is not None else 1)  # Cost of stepping onto neighbor
+                if g_score[neighbor] == NO_SCORE or tentative_g_score < g_score[neighbor]:
+                    g_score[neighbor] = tentative_g_score
+                    parent[neighbor] = current
+                    buckets[tentative_g_score % bucket_count].append(neighbor)
+                    queued += 1
+                    if events is not None:
+                        events.append((FRONTIER, neighbor))
+
+        distance += 1
+
+    # If every bucket is empty and no goal was found
+    if stats is not None:
+        stats.end(SEARCH, node_count, node_count + stale_pops, 0, stale_pops, peak_frontier)
+    return None, node_count  # Return None for path and the node count
+
+
 # Custom 1: Iterative Deepening Depth-First Search (IDDFS)
-def iddfs(grid, start, goals, update_gui=None, clear_gui=None):
+def iddfs(grid, start, goals, events=None, stats=None):
+    return iterative_deepening(grid, start, goals, None, events, stats=stats)
 
-    print("") # Spacing for readability
+# Iterative Deepening A* (IDA*)
+def ida_star(grid, start, goals, events=None, heuristic=None, stats=None):
+    return iterative_deepening(grid, start, goals, heuristic or nearest_goal_heuristic(grid, goals), events, stats=stats)
 
-    def dls(current, depth, path, visited): # Depth-limited search function, to be called recursively by the IDDFS function
-    # Essentially DFS but simplified and modified to have a depth limit
+def iterative_deepening(grid, start, goals, heuristic=None, events=None, low_memory=False, stats=None):
+    """Iterative deepening depth-first search with an explicit stack, shared by IDDFS and IDA*.
 
-        # Stops the search if the depth limit is reached 
-        if depth == 0:
-            return None  
-        
-        # Mark the current node as visited
-        if current in visited:
-            return None
-
-        visited.add(current)
-        
-        # Update the GUI with the current position, visited nodes, and potential nodes (if a GUI callback is provided)
-        if update_gui:
-            potential_nodes = get_neighbors(current, walls, rows, cols)
-            update_gui(current, visited, potential_nodes)
-        
-        # Check if the current node is a goal
-        if current in goals:
-            return path  # Return the path to the goal
-        
-        # Get neighbors using the provided get_neighbors function
-        neighbors = get_neighbors(current, walls, rows, cols)
-        
-        for neighbor in neighbors:
-            result = dls(neighbor, depth - 1, path + [neighbor], visited)
-            if result is not None:
-                return result  # Return the found path if not None
-
-        return None  # No path found at this depth
-
-    rows, cols = len(grid), len(grid[0])  # Get grid dimensions
-    walls = {(c, r) for r in range(rows) for c in range(cols) if grid[r][c] == 'W'}  # Collect wall positions
-
-    # Iterate over depth limits until a goal is found
-    for depth in range(rows * cols):  # Arbitrary limit based on grid size
-        print(f"Depth: {depth}")
-        visited = set()  # Reset visited for each depth limit
-        path = dls(start, depth, [start], visited)  # Perform depth-limited search
-        if path is not None:
-            return path, len(visited)  # Return path and the number of unique nodes visited
-        clear_gui()
-
-    return None, 0  # If no path is found within the limits
+    Each iteration is a depth-first search that cuts off every node whose f = g + h is above the bound
+    (h is 0 when no heuristic is given, as in IDDFS). The next bound is the smallest f that was cut
+    off; if nothing was cut off, the whole reachable area was searched and there is no path.
+    Cells on the current path are marked in a bitset so a path never loops back on itself. Unless
+    low_memory is set, the best g reached at each cell in the current iteration is also kept, so longer
+    routes to the same cell are not searched again; low_memory keeps only the bitset (size / 8 bytes),
+    at the cost of time that can grow exponentially with the path length on open maps (and with the
+    size of the region when there is no path).
+    Returns (path, node_count), where node_count counts the expansions of every iteration.
+    """
+    if stats is not None:
+        stats.begin()
+
+    # Goals in another connected area can never be reached, so leave them out (and stop at once if none is left)
+    goals = reachable_goals(grid, start, goals)
+    if not goals:
+        if stats is not None:
+            stats.end(SETUP, 0, 0)
+        return None, 0
+
+    start_id = grid.index(start)
+    goal_ids = {grid.index(goal) for goal in goals}  # Goal cell ids for O(1) goal checks
+    use_heuristic = heuristic is not None
+
+    masks, moves = grid.neighbor_table()  # Open neighbours of a cell: current + offset for offset in moves[masks[current]]
+
+    # One bit per cell, set while the cell is on the current path
+    on_path = bytearray((grid.size + 7) >> 3)
+
+    if not low_memory:
+        # best_g[cell] is only valid if seen_in[cell] is the current iteration, so nothing is cleared between iterations
+        best_g = array('i', [0]) * grid.size
+        seen_in = array('i', [0]) * grid.size
+
+    bound = heuristic(start_id) if use_heuristic else 0
+    node_count = 0  # Counter for nodes expanded, over all iterations
+    cut_offs = 0  # Nodes generated but cut off by the bound, over all iterations
+    peak_frontier = 0  # Deepest path (the frontier of a depth-first search is its path)
+    iteration = 0
+    if stats is not None:
+        stats.phase(SETUP)
+
+    while True:
+        iteration += 1
+        if events is not None:
+            events.append((RESET, -1))  # Clear the GUI for each new bound
+
+        next_bound = None  # Smallest f above the bound, the bound of the next iteration
+        cut_off = []
+        node_count += 1
+        if events is not None:
+            events.append((EXPANDED, start_id))
+        if start_id in goal_ids:
+            if events is not None:
+                events.append((GOAL, start_id))
+            if stats is not None:
+                stats.end(SEARCH, node_count, node_count, 0, 0, 1)
+            return [start], node_count
+
+        # The path and, for each cell on it, the iterator over the move offsets still to be tried
+        path = [start_id]
+        stack = [iter(moves[masks[start_id]])]
+        on_path[start_id >> 3] |= 1 << (start_id & 7)
+        if not low_memory:
+            best_g[start_id] = 0
+            seen_in[start_id] = iteration
+
+        while stack:
+            offset = next(stack[-1], None)
+
+            # All neighbors tried, backtrack
+            if offset is None:
+                stack.pop()
+                current = path.pop()
+                on_path[current >> 3] &= ~(1 << (current & 7))
+                continue
+            neighbor = path[-1] + offset
+
+            # Skip cells already on the current path
+            if on_path[neighbor >> 3] & (1 << (neighbor & 7)):
+                continue
+
+            g = len(path)
+
+            # Skip cells already reached (or cut off) at least as cheaply in this iteration
+            if not low_memory:
+                if seen_in[neighbor] == iteration and best_g[neighbor] <= g:
+                    continue
+                seen_in[neighbor] = iteration
+                best_g[neighbor] = g
+
+            # Cut off nodes above the bound, they set the bound of the next iteration
+            f = g + heuristic(neighbor) if use_heuristic else g
+            if f > bound:
+                if low_memory:
+                    if next_bound is None or f < next_bound:
+                        next_bound = f
+                else:
+                    cut_off.append(neighbor)  # Might still be reached within the bound later in this iteration
+                cut_offs += 1
+                if events is not None:
+                    events.append((FRONTIER, neighbor))
+                continue
+
+            node_count += 1
+            path.append(neighbor)
+            on_path[neighbor >> 3] |= 1 << (neighbor & 7)
+            if stats is not None and len(path) > peak_frontier:
+                peak_frontier = len(path)
+
+            # Record the expansion for the GUI (if an events list is provided)
+            if events is not None:
+                events.append((EXPANDED, neighbor))
+
+            # Check if the neighbor is a goal
+            if neighbor in goal_ids:
+                if events is not None:
+                    events.append((GOAL, neighbor))
+                if stats is not None:
+                    stats.phase(SEARCH)
+                path = ids_to_cells(grid, path)
+                if stats is not None:
+                    stats.end(RECONSTRUCTION, node_count, node_count + cut_offs, 0, 0, peak_frontier)
+                return path, node_count
+
+            stack.append(iter(moves[masks[neighbor]]))
+
+        # Only cells that were never reached within the bound count towards the next bound
+        for cell_id in cut_off:
+            f = best_g[cell_id] + heuristic(cell_id) if use_heuristic else best_g[cell_id]
+            if f > bound and (next_bound is None or f < next_bound):
+                next_bound = f
+
+        # Nothing was cut off, so raising the bound would not reach any new cell
+        if next_bound is None:
+            if stats is not None:
+                stats.end(SEARCH, node_count, node_count + cut_offs, 0, 0, peak_frontier)
+            return None, node_count
+
+        bound = next_bound
 
 # Custom 2: Bidirectional A* Search
-def bidirectional_astar(grid, start, goals, update_gui=None, clear_gui=None):
-
-    clear_gui()  # Clear the GUI before starting the search, in case there are multiple to be done
-
-    rows, cols = len(grid), len(grid[0])  # Get grid dimensions
-    walls = {(c, r) for r in range(rows) for c in range(cols) if grid[r][c] == 'W'}  # Collect wall positions
-
-    # Priority queues for A* (one for each direction)
-    open_list_forward = []
-    open_list_backward = []
-
-    # Initialize both start points in priority queues
-    start_f_value = manhattan_distance(start, goals)
-    heapq.heappush(open_list_forward, (start_f_value, 0, start, [start]))  # (f(n), g(n), position, path)
-    goal_position = goals[0]  # For Bi-A*, assume a single goal for simplicity
-    heapq.heappush(open_list_backward, (start_f_value, 0, goal_position, [goal_position]))
-
-    # Data structures to track paths and visited nodes
-    forward_came_from = {start: None}
-    backward_came_from = {goal_position: None}
-    forward_g_score = {start: 0}
-    backward_g_score = {goal_position: 0}
-    visited_forward = set()
-    visited_backward = set()
-    node_count = 0
-
-    while open_list_forward and open_list_backward:
-        # Expand the forward search
-        current_f_forward, current_g_forward, current_forward, path_forward = heapq.heappop(open_list_forward)
-        if current_forward in visited_forward:
+def bidirectional_astar(grid, start, goals, events=None, heuristic=None, stats=None):
+    """Front-to-end bidirectional A*: forwards from the start, backwards from every goal at once.
+
+    The forward search is guided by the Manhattan distance to the nearest goal (or the given heuristic),
+    the backward search by the Manhattan distance to the start, both times the cheapest step cost. A step
+    costs what it costs to enter the cell it leads to, so the backward search pays for the cell it steps
+    back from. The cheapest meeting found so far (mu) is kept, and the search stops once mu is no more than
+    the larger of the two smallest f-values, so the path is optimal.
+    """
+    if stats is not None:
+        stats.begin()
+
+    if events is not None:
+        events.append((RESET, -1))  # Clear the GUI before starting the search, in case there are multiple to be done
+
+    # Goals in another connected area can never be reached, so leave them out (and stop at once if none is left)
+    goals = reachable_goals(grid, start, goals)
+    if not goals:
+        if stats is not None:
+            stats.end(SETUP, 0, 0)
+        return None, 0
+
+    start_id = grid.index(start)
+    goal_ids = {grid.index(goal) for goal in goals}  # Goal cell ids for O(1) goal checks
+
+    # Heuristic of each direction by cell id
+    heuristics = (heuristic or cost_heuristic(grid, goals), cost_heuristic(grid, [start]))
+
+    # Cost of entering each cell, None when every step costs 1
+    costs = grid.costs
+
+    masks, moves = grid.neighbor_table()  # Open neighbours of a cell: current + offset for offset in moves[masks[current]]
+
+    # State of each direction: index 0 searches forwards from the start, index 1 backwards from the goals
+    parents = (new_parent_array(grid), new_parent_array(grid))
+    g_scores = (new_score_array(grid), new_score_array(grid))
+    visited = (bytearray(grid.size), bytearray(grid.size))
+    # Min-heaps of (f(n), -g(n), tie-break, position); among equal f the deepest node goes first,
+    # so on open ground each side heads straight for the other instead of filling every cell with that f
+    open_lists = ([], [])
+
+    g_scores[0][start_id] = 0
+    open_lists[0].append((heuristics[0](start_id), 0, tie_break(grid, start_id), start_id))
+
+    # All goals are seeded into the backward search, as if they were joined to a single super-goal
+    for goal_id in goal_ids:
+        g_scores[1][goal_id] = 0
+        open_lists[1].append((heuristics[1](goal_id), 0, tie_break(grid, goal_id), goal_id))
+    heapq.heapify(open_lists[1])
+
+    # Cost of the best path found so far and the cell where its two halves meet
+    best_cost = 0 if start_id in goal_ids else None
+    meeting_point = start_id if start_id in goal_ids else NO_PARENT
+    node_count = 0  # Counter for nodes expanded in both directions
+    stale_pops = 0  # Heap entries taken off without an expansion
+    peak_frontier = 0
+    if stats is not None:
+        stats.phase(SETUP)
+
+    while True:
+        if stats is not None and len(open_lists[0]) + len(open_lists[1]) > peak_frontier:
+            peak_frontier = len(open_lists[0]) + len(open_lists[1])
+
+        # Drop heap entries of nodes that were already expanded
+        for direction in (0, 1):
+            open_list = open_lists[direction]
+            while open_list and visited[direction][open_list[0][3]]:
+                heapq.heappop(open_list)
+                stale_pops += 1
+
+        if not open_lists[0] or not open_lists[1]:
+            break  # One side ran out of nodes, so no better meeting can be found
+
+        # Stop once no path through the open nodes can be cheaper than the best one found
+        if best_cost is not None and best_cost <= max(open_lists[0][0][0], open_lists[1][0][0]):
+            break
+
+        # Expand the side with the smaller frontier
+        direction = 0 if len(open_lists[0]) <= len(open_lists[1]) else 1
+        current = heapq.heappop(open_lists[direction])[3]
+        visited[direction][current] = 1
+
+        # Already expanded by the other side: every path through it was counted when the two sides met there
+        if visited[1 - direction][current]:
+            stale_pops += 1
             continue
-        visited_forward.add(current_forward)
 
-        # Expand the backward search
-        current_f_backward, current_g_backward, current_backward, path_backward = heapq.heappop(open_list_backward)
-        if current_backward in visited_backward:
+        node_count += 1
+
+        # Record the expansion for the GUI (if an events list is provided)
+        if events is not None:
+            events.append((EXPANDED, current))
+
+        parent = parents[direction]
+        g_score = g_scores[direction]
+        heuristic = heuristics[direction]
+        other_g_score = g_scores[1 - direction]
+        for offset in moves[masks[current]]:
+            neighbor = current + offset
+            # Forwards the step enters the neighbour; backwards it is the step from the neighbour into current
+            if costs is None:
+                tentative_g_score = g_score[current] + 1
+            else:
+                tentative_g_score = g_score[current] + costs[current if direction else neighbor]
+            if g_score[neighbor] == NO_SCORE or tentative_g_score < g_score[neighbor]:
+                parent[neighbor] = current
+                g_score[neighbor] = tentative_g_score
+                f_score = tentative_g_score + heuristic(neighbor)
+                heapq.heappush(open_lists[direction], (f_score, -tentative_g_score, tie_break(grid, neighbor), neighbor))
+                if events is not None:
+                    events.append((FRONTIER, neighbor))
+
+                # The neighbor was reached from the other side too, so the two halves join there
+                if other_g_score[neighbor] != NO_SCORE:
+                    cost = tentative_g_score + other_g_score[neighbor]
+                    if best_cost is None or cost < best_cost:
+                        best_cost = cost
+                        meeting_point = neighbor
+
+    pushes = node_count + stale_pops + len(open_lists[0]) + len(open_lists[1])  # Every heap entry was popped or is still queued
+    if best_cost is None:
+        if stats is not None:
+            stats.end(SEARCH, node_count, pushes, pushes, stale_pops, peak_frontier)
+        return None, node_count  # If no path is found
+
+    if stats is not None:
+        stats.phase(SEARCH)
+    path = reconstruct_path_bidirectional(parents[0], parents[1], meeting_point)
+    if events is not None:
+        events.append((GOAL, path[-1]))
+    path = ids_to_cells(grid, path)
+    if stats is not None:
+        stats.end(RECONSTRUCTION, node_count, pushes, pushes, stale_pops, peak_frontier)
+    return path, node_count
+
+# Bidirectional Breadth-First Search
+def bidirectional_bfs(grid, start, goals, events=None, stats=None):
+    """Breadth-first search from the start and from every goal at once, a whole layer at a time.
+
+    Each step expands the next layer of the side with the smaller frontier. The first layer that
+    reaches the other side is finished, and the shortest join found in it gives the path.
+    """
+    if stats is not None:
+        stats.begin()
+
+    if events is not None:
+        events.append((RESET, -1))  # Clear the GUI before starting the search, in case there are multiple to be done
+
+    # Goals in another connected area can never be reached, so leave them out (and stop at once if none is left)
+    goals = reachable_goals(grid, start, goals)
+    if not goals:
+        if stats is not None:
+            stats.end(SETUP, 0, 0)
+        return None, 0
+
+    start_id = grid.index(start)
+    goal_ids = {grid.index(goal) for goal in goals}  # Goal cell ids for O(1) goal checks
+
+    if start_id in goal_ids:
+        if events is not None:
+            events.append((EXPANDED, start_id))
+            events.append((GOAL, start_id))
+        if stats is not None:
+            stats.end(SETUP, 1, 1, 0, 0, 1)
+        return [start], 1
+
+    masks, moves = grid.neighbor_table()  # Open neighbours of a cell: current + offset for offset in moves[masks[current]]
+
+    # State of each direction: index 0 searches forwards from the start, index 1 backwards from the goals
+    parents = (new_parent_array(grid), new_parent_array(grid))
+    distances = (new_score_array(grid), new_score_array(grid))
+    frontiers = [[start_id], []]
+
+    distances[0][start_id] = 0
+    for goal in goals:
+        goal_id = grid.index(goal)
+        if distances[1][goal_id] == NO_SCORE:
+            distances[1][goal_id] = 0
+            frontiers[1].append(goal_id)
+
+    node_count = 0  # Counter for nodes expanded in both directions
+    generated = len(frontiers[0]) + len(frontiers[1])
+    peak_frontier = 0
+    if stats is not None:
+        stats.phase(SETUP)
+
+    while frontiers[0] and frontiers[1]:
+        if stats is not None and len(frontiers[0]) + len(frontiers[1]) > peak_frontier:
+            peak_frontier = len(frontiers[0]) + len(frontiers[1])
+
+        # Expand the next layer of the side with the smaller frontier
+        direction = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        parent = parents[direction]
+        distance = distances[direction]
+        other_distance = distances[1 - direction]
+
+        next_frontier = []
+        best_cost = None
+        best_edge = None  # (cell on this side, cell on the other side) of the shortest join
+
+        for current in frontiers[direction]:
+            node_count += 1
+
+            # Record the expansion for the GUI (if an events list is provided)
+            if events is not None:
+                events.append((EXPANDED, current))
+
+            for offset in moves[masks[current]]:
+                neighbor = current + offset
+                # The other side has reached the neighbor, so the two halves join through this edge
+                if other_distance[neighbor] != NO_SCORE:
+                    cost = distance[current] + 1 + other_distance[neighbor]
+                    if best_cost is None or cost < best_cost:
+                        best_cost = cost
+                        best_edge = (current, neighbor)
+
+                if distance[neighbor] == NO_SCORE:
+                    distance[neighbor] = distance[current] + 1
+                    parent[neighbor] = current
+                    next_frontier.append(neighbor)
+                    if events is not None:
+                        events.append((FRONTIER, neighbor))
+
+        generated += len(next_frontier)
+        if best_edge is not None:
+            if stats is not None:
+                stats.phase(SEARCH)
+            forward_end, backward_end = best_edge if direction == 0 else best_edge[::-1]
+            path = reconstruct_path(parents[0], forward_end) + reconstruct_path(parents[1], backward_end)[::-1]
+            if events is not None:
+                events.append((GOAL, path[-1]))
+            path = ids_to_cells(grid, path)
+            if stats is not None:
+                stats.end(RECONSTRUCTION, node_count, generated, 0, 0, peak_frontier)
+            return path, node_count
+
+        frontiers[direction] = next_frontier
+
+    if stats is not None:
+        stats.end(SEARCH, node_count, generated, 0, 0, peak_frontier)
+    return None, node_count  # If no path is found
+
+# Jump Point Search (JPS) for 4-connected grids
+# Shortest paths are made canonical by turning from vertical to horizontal anywhere, but from horizontal to
+# vertical only where a wall forces it. Straight runs are then "jumped" without pushing every cell on the heap.
+def jps(grid, start, goals, events=None, stats=None):
+
+    # The jump rules only hold for 4-connected moves where every step costs the same, so 8-connected grids
+    # and grids with terrain are searched with plain A*
+    if grid.connectivity != FOUR_CONNECTED or grid.costs is not None:
+        return astar(grid, start, goals, events, stats=stats)
+
+    if stats is not None:
+        stats.begin()
+
+    if events is not None:
+        events.append((RESET, -1))  # Clear the GUI before starting the search, in case there are multiple to be done
+
+    rows, cols, cells = grid.rows, grid.cols, grid.cells
+    # Goals in another connected area can never be reached, so leave them out (and stop at once if none is left)
+    goals = reachable_goals(grid, start, goals)
+    if not goals:
+        if stats is not None:
+            stats.end(SETUP, 0, 0)
+        return None, 0
+
+    start_id = grid.index(start)
+    goal_ids = {grid.index(goal) for goal in goals}  # Goal cell ids for O(1) goal checks
+
+    def is_open(col, row):
+        return 0 <= col < cols and 0 <= row < rows and cells[row * cols + col] != WALL
+
+    # Wall mask (1 for walls, 0 for open cells) so rows can be scanned with bytes find/rfind instead of Python loops
+    blocked = bytes(grid.cells).translate(WALL_MASK)
+    goal_cols = {}  # Goal columns by row
+    for goal_id in goal_ids:
+        goal_cols.setdefault(goal_id // cols, []).append(goal_id % cols)
+
+    def jump_horizontal(col, row, d_col):
+        # Jump along the row to the first goal, or the first cell with a forced vertical neighbour
+        # (open above/below while the cell above/below the previous one is a wall). None if a wall comes first.
+        base = row * cols
+        if d_col > 0:
+            wall = blocked.find(1, base + col + 1, base + cols)
+            end = wall - base if wall != -1 else cols  # First column that cannot be entered
+            best = end
+            for goal_col in goal_cols.get(row, ()):
+                if col < goal_col < best:
+                    best = goal_col
+            for n_row in (row - 1, row + 1):
+                if 0 <= n_row < rows:
+                    n_base = n_row * cols
+                    wall = blocked.find(1, n_base + col, n_base + best - 1)
+                    if wall != -1:
+                        opening = blocked.find(0, wall, n_base + best)
+                        if opening != -1:
+                            best = opening - n_base
+            return base + best if best < end else None
+        else:
+            wall = blocked.rfind(1, base, base + col)
+            end = wall - base if wall != -1 else -1  # Last column that cannot be entered
+            best = end
+            for goal_col in goal_cols.get(row, ()):
+                if best < goal_col < col:
+                    best = goal_col
+            for n_row in (row - 1, row + 1):
+                if 0 <= n_row < rows:
+                    n_base = n_row * cols
+                    wall = blocked.rfind(1, n_base + best + 2, n_base + col + 1)
+                    if wall != -1:
+                        opening = blocked.rfind(0, n_base + best + 1, wall)
+                        if opening != -1:
+                            best = opening - n_base
+            return base + best if best > end else None
+
+    def jump_vertical(col, row, d_row):
+        # Step along the column until a wall, a goal, or a cell from which a horizontal jump finds a jump point
+        while True:
+            row += d_row
+            if not is_open(col, row):
+                return None
+            cell_id = row * cols + col
+            if cell_id in goal_ids:
+                return cell_id
+            if jump_horizontal(col, row, -1) is not None or jump_horizontal(col, row, 1) is not None:
+                return cell_id
+
+    def directions(col, row, d_col, d_row):
+        # Pruned directions to search from a jump point, given the direction it was reached in
+        if d_col == 0 and d_row == 0:
+            return ((0, -1), (-1, 0), (0, 1), (1, 0))  # Start: UP, LEFT, DOWN, RIGHT
+        if d_row == 0:
+            # Moving horizontally: keep going, or turn where the turn is forced by a wall
+            result = [(d_col, 0)]
+            for turn in (-1, 1):
+                if is_open(col, row + turn) and not is_open(col - d_col, row + turn):
+                    result.append((0, turn))
+            return result
+        # Moving vertically: keep going, or turn either way
+        return ((0, d_row), (-1, 0), (1, 0))
+
+    # Priority queue of jump points: (f(n), g(n), tie-break, position, direction it was reached in)
+    open_list = []
+    heuristic = nearest_goal_heuristic(grid, goals)  # Manhattan distance to the nearest goal by cell id
+    heapq.heappush(open_list, (heuristic(start_id), 0, tie_break(grid, start_id), start_id, 0, 0))
+
+    parent = new_parent_array(grid)  # Parent jump point of each jump point
+    g_score = new_score_array(grid)
+    g_score[start_id] = 0
+    visited = bytearray(grid.size)
+    node_count = 0  # Counter for jump points expanded
+    stale_pops = 0  # Entries of jump points popped again after they were expanded
+    peak_frontier = 0
+    if stats is not None:
+        stats.phase(SETUP)
+
+    while open_list:
+        if stats is not None and len(open_list) > peak_frontier:
+            peak_frontier = len(open_list)
+
+        current_f, current_g, _, current, d_col, d_row = heapq.heappop(open_list)
+
+        if visited[current]:
+            stale_pops += 1
             continue
-        visited_backward.add(current_backward)
-
-        # Increment node count for both searches
-        node_count += 2
-
-        # GUI updates for both directions
-        if update_gui:
-            update_gui(current_forward, visited_forward, get_neighbors(current_forward, walls, rows, cols))
-            update_gui(current_backward, visited_backward, get_neighbors(current_backward, walls, rows, cols))
-
-        # Check for intersection
-        if current_forward in visited_backward or current_backward in visited_forward:
-            # Decrement node_count by 1 to avoid double-counting the meeting point
-            node_count -= 1
-            meeting_point = current_forward if current_forward in visited_backward else current_backward
-            return reconstruct_path_bidirectional(forward_came_from, backward_came_from, meeting_point), node_count
-
-        # Get neighbors and expand for forward direction
-        for neighbor in get_neighbors(current_forward, walls, rows, cols):
-            tentative_g_score = forward_g_score[current_forward] + 1
-            if neighbor not in forward_g_score or tentative_g_score < forward_g_score[neighbor]:
-                forward_came_from[neighbor] = current_forward
-                forward_g_score[neighbor] = tentative_g_score
-                f_score = tentative_g_score + manhattan_distance(neighbor, goals)
-                heapq.heappush(open_list_forward, (f_score, tentative_g_score, neighbor, path_forward + [neighbor]))
-
-        # Get neighbors and expand for backward direction
-        for neighbor in get_neighbors(current_backward, walls, rows, cols):
-            tentative_g_score = backward_g_score[current_backward] + 1
-            if neighbor not in backward_g_score or tentative_g_score < backward_g_score[neighbor]:
-                backward_came_from[neighbor] = current_backward
-                backward_g_score[neighbor] = tentative_g_score
-                f_score = tentative_g_score + manhattan_distance(neighbor, [start])
-                heapq.heappush(open_list_backward, (f_score, tentative_g_score, neighbor, path_backward + [neighbor]))
-
-    # If no path is found
+        visited[current] = 1
+        node_count += 1
+
+        # Record the expansion for the GUI (if an events list is provided)
+        if events is not None:
+            events.append((EXPANDED, current))
+
+        if current in goal_ids:
+            if events is not None:
+                events.append((GOAL, current))
+            if stats is not None:
+                stats.phase(SEARCH)
+            path = ids_to_cells(grid, expand_jump_path(grid, reconstruct_path(parent, current)))
+            if stats is not None:
+                pushes = node_count + stale_pops + len(open_list)  # Every push was either popped or is still queued
+                stats.end(RECONSTRUCTION, node_count, pushes, pushes, stale_pops, peak_frontier)
+            return path, node_count
+
+        row, col = divmod(current, cols)
+        for step_col, step_row in directions(col, row, d_col, d_row):
+            if step_row == 0:
+                jump_point = jump_horizontal(col, row, step_col)
+            else:
+                jump_point = jump_vertical(col, row, step_row)
+            if jump_point is None or visited[jump_point]:
+                continue
+
+            # Jump points lie on a straight line from the current node, so the step cost is their Manhattan distance
+            jump_row, jump_col = divmod(jump_point, cols)
+            tentative_g_score = current_g + abs(jump_col - col) + abs(jump_row - row)
+            if g_score[jump_point] == NO_SCORE or tentative_g_score < g_score[jump_point]:
+                parent[jump_point] = current
+                g_score[jump_point] = tentative_g_score
+                f_score = tentative_g_score + heuristic(jump_point)
+                heapq.heappush(open_list, (f_score, tentative_g_score, tie_break(grid, jump_point), jump_point, step_col, step_row))
+                if events is not None:
+                    events.append((FRONTIER, jump_point))
+
+    # If the open_list is empty and no goal was found
+    if stats is not None:
+        stats.end(SEARCH, node_count, node_count + stale_pops, node_count + stale_pops, stale_pops, peak_frontier)
     return None, node_count
 
+# Helper function to expand a path of jump points (each on a straight line from the last) into unit steps
+def expand_jump_path(grid, jump_points):
+    path = jump_points[:1]
+    for jump_point in jump_points[1:]:
+        step = grid.cols if abs(jump_point - path[-1]) >= grid.cols else 1
+        if jump_point < path[-1]:
+            step = -step
+        path.extend(range(path[-1] + step, jump_point + step, step))
+    return path
+
 # Helper function to reconstruct path for bidirectional A*
 def reconstruct_path_bidirectional(forward_came_from, backward_came_from, meeting_point):
     # Reconstruct the forward path
-    path_forward = []
-    current = meeting_point
-    while current is not None:
-        path_forward.append(current)
-        current = forward_came_from[current]
-    path_forward.reverse()
+    path_forward = reconstruct_path(forward_came_from, meeting_point)
 
     # Reconstruct the backward path
-    path_backward = []
-    current = meeting_point
-    while current is not None:
-        path_backward.append(current)
-        current = backward_came_from[current]
+    path_backward = reconstruct_path(backward_came_from, meeting_point)
+    path_backward.reverse()
 
     # Combine the forward and backward paths
     return path_forward + path_backward[1:]
 
-#Helper function to get valid neighbors of a cell that are not walls.
-def get_neighbors(cell, walls, rows, cols):
-    col, row = cell
-    neighbors = []
-
-    # UP
-    if row > 0 and (col, row - 1) not in walls:
-        neighbors.append((col, row - 1))
-    # LEFT
-    if col > 0 and (col - 1, row) not in walls:
-        neighbors.append((col - 1, row))
-    # DOWN
-    if row < rows - 1 and (col, row + 1) not in walls:
-        neighbors.append((col, row + 1))
-    # RIGHT
-    if col < cols - 1 and (col + 1, row) not in walls:
-        neighbors.append((col + 1, row))
-    
-    return neighbors
\ No newline at end of file
+# Sentinels for the per-cell parent and score arrays
+NO_PARENT = -1
+NO_SCORE = -1
+
+# Helper function to create a parent array (one entry per cell) used to reconstruct paths
+def new_parent_array(grid):
+    return array('i', [NO_PARENT]) * grid.size
+
+# Helper function to create a g-score array (one entry per cell)
+def new_score_array(grid):
+    return array('i', [NO_SCORE]) * grid.size
+
+# Helper function to rebuild the path from the search root to a cell by following parent links
+def reconstruct_path(parent, cell_id):
+    path = []
+    while cell_id != NO_PARENT:
+        path.append(cell_id)
+        cell_id = parent[cell_id]
+    path.reverse()  # Reverse the path to get from start to goal
+    return path
+
+# Helper function for heap tie-breaking; orders cells by (col, row) like the original tuple comparison did
+def tie_break(grid, cell_id):
+    row, col = divmod(cell_id, grid.cols)
+    return col * grid.rows + row
+
+# Helper function for packing heap priorities into single integers: the bits a tie-break value and a path cost can
+# take up on this grid, so that (f << cost_bits | g) << tie_bits | tie_break(grid, cell_id) orders like the tuple
+# (f, g, tie_break) and the cell id can be read back from the low tie_bits bits (see astar and gbfs)
+def priority_bits(grid):
+    max_cost = max(grid.costs) if grid.costs is not None else 1
+    return grid.size.bit_length(), (grid.size * max_cost).bit_length()
+
+# Helper function to keep only the goals in the same connected area as the start, using the grid's component labels
+def reachable_goals(grid, start, goals):
+    labels = grid.component_labels()
+    start_label = labels[grid.index(start)]
+    if start_label == NO_COMPONENT:
+        return goals  # The start is inside a wall, leave it to the search
+    return [goal for goal in goals if labels[grid.index(goal)] == start_label]
+
+# Helper function to add up the terrain cost of a (col, row) path: the cost of every cell stepped onto after the start
+def path_cost(grid, path):
+    return sum(grid.cost(grid.index(cell)) for cell in path[1:])
+
+# Helper function to convert a list of cell ids into (col, row) cells
+def ids_to_cells(grid, path):
+    return [grid.cell(cell_id) for cell_id in path]
@@ -2,23 +2,36 @@
 
 import sys
 import os
-import time
+import json
 from file_parser import read_input_file
-from grid import create_grid
-from gui import display_grid_gui
+from grid import create_grid, FOUR_CONNECTED, CORNERS_BLOCKED
 import pathfinding
+import hpa
+import memory_bounded
+from stats import SearchStats
+
+# Maps the algorithm name to the corresponding function
+ALGORITHMS = {
+    'DFS': pathfinding.dfs,
+    'BFS': pathfinding.bfs,
+    'GBFS': pathfinding.gbfs,
+    'ASTAR': pathfinding.astar,
+    'CUS1': pathfinding.iddfs,
+    'CUS2': pathfinding.bidirectional_astar,
+    'JPS': pathfinding.jps,
+    'IDASTAR': pathfinding.ida_star,
+    'BIBFS': pathfinding.bidirectional_bfs,
+    'HPA': hpa.hpa_star,
+    'UCS': pathfinding.ucs,
+    'BEAM': memory_bounded.beam_search,
+    'SMASTAR': memory_bounded.sma_star
+}
+
+# The searches that may settle for a longer path than the optimum: their --stats output also holds the optimality gap
+INEXACT_ALGORITHMS = ('BEAM', 'SMASTAR')
 
 def select_algorithm(algorithm_name):
-    # Maps the algorithm name to the corresponding function
-    algorithms = {
-        'DFS': pathfinding.dfs,
-        'BFS': pathfinding.bfs,
-        'GBFS': pathfinding.gbfs,
-        'ASTAR': pathfinding.astar,
-        'CUS1': pathfinding.iddfs,
-        'CUS2': pathfinding.bidirectional_astar
-    }
-    return algorithms.get(algorithm_name.upper(), None)
+    return ALGORITHMS.get(algorithm_name.upper(), None)
 
 def convert_path_to_directions(path):
     directions = []
@@ -26,7 +39,11 @@ def convert_path_to_directions(path):
         (0, -1): 'up',
         (0, 1): 'down',
         (-1, 0): 'left',
-        (1, 0): 'right'
+        (1, 0): 'right',
+        (-1, -1): 'up-left',
+        (1, -1): 'up-right',
+        (-1, 1): 'down-left',
+        (1, 1): 'down-right'
     }
     
     for i in range(len(path) - 1):
@@ -39,16 +56,183 @@ def convert_path_to_directions(path):
     
     return directions
 
+def search_goals(algorithm, grid, start, goals, find_all_goals=False, events=None, stats=None):
+    """Search from goal to goal, yielding (path, node_count) for each search. The path is None when no goal is reachable.
+
+    A stats object, if given, is passed to every search, so it ends up with the totals over all of them.
+    """
+    current_position = start
+    remaining_goals = goals[:]
+
+    while remaining_goals:
+        # Find the path to the closest goal
+        if stats is None:
+            path, node_count = algorithm(grid, current_position, remaining_goals, events)
+        else:
+            path, node_count = algorithm(grid, current_position, remaining_goals, events, stats=stats)
+        yield path, node_count
+
+        if not path:
+            break
+
+        # Remove the reached goal from the list of remaining goals and continue from there
+        reached_goal = path[-1]
+        remaining_goals.remove(reached_goal)
+        current_position = reached_goal
+
+        if not find_all_goals:
+            break  # Stop after finding the first goal if --all-goals is not specified
+
+def optimality_gaps(grid, start, goals, paths):
+    """The optimality gap of each search of a search_goals run, given the paths it yielded, as JSON-ready dicts
+    (see memory_bounded.optimality_gap). The infinite gap of a search that missed a reachable goal becomes None.
+    """
+    gaps = []
+    remaining_goals = goals[:]
+    for path in paths:
+        cost, optimal, gap = memory_bounded.optimality_gap(grid, start, remaining_goals, path)
+        gaps.append({'cost': cost, 'optimal': optimal, 'gap': None if gap == memory_bounded.UNBOUNDED else gap})
+        if path:
+            # The next search starts from the reached goal, as in search_goals
+            remaining_goals.remove(path[-1])
+            start = path[-1]
+    return gaps
+
+def get_option(name, default):
+    # Returns the integer value following an option such as --fps 30, or the default if the option is missing
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            try:
+                return int(sys.argv[index + 1])
+            except ValueError:
+                print(f"Error: {name} must be an integer.")
+                sys.exit(1)
+    return default
+
+def get_text_option(name, default):
+    # Returns the text following an option such as --corners cut, or the default if the option is missing
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return default
+
+def stats_output():
+    # Returns where --stats sends the search metrics: a file name, '-' for the console, or None without --stats
+    if '--stats' not in sys.argv:
+        return None
+    output = get_text_option('--stats', '-')
+    return '-' if output.startswith('--') else output
+
+def print_phase(phase, seconds, stats):
+    # Profiler hook for --profile: print each phase of each search as it ends
+    print(f"  [{phase}] {seconds * 1000:.3f} ms")
+
+def write_stats(stats, output, gaps=None):
+    """Dump the search metrics, and the optimality gaps if given, as JSON, to the console if output is '-'."""
+    metrics = stats.as_dict()
+    if gaps is not None:
+        metrics['optimality_gaps'] = gaps
+    text = json.dumps(metrics)
+    if output == '-':
+        print(f"Search stats: {text}")
+    else:
+        with open(output, 'w') as file:
+            file.write(text + "\n")
+
+def run_tour(input_file, grid, start, goals, jobs=1):
+    """Visit every goal in an order planned from a goal-to-goal distance matrix, print the results and return the final path."""
+    import tour
+
+    os.system('cls' if os.name == 'nt' else 'clear')
+    print("Finding path to all goals...")
+
+    result = tour.solve_tour(grid, start, goals, jobs)
+    node_counts = result['node_counts']
+    source_node_counts = dict(node_counts['per_source'])
+
+    for goal_number, (goal, segment) in enumerate(zip(result['order'], result['segments'])):
+        print(f"\nGoal {goal_number + 1} reached!")
+        print(f"<Node {goal}> {source_node_counts[segment[0]]}")  # Display the reached goal and the nodes expanded by the flood the leg came from
+        print(convert_path_to_directions(segment))
+
+    if result['unreachable']:
+        print("\nNo path to:", result['unreachable'])
+
+    final_path = result['path']
+    flood = "BFS" if grid.costs is None else "Dijkstra"  # The distance matrix pays terrain costs where there are any
+    if final_path:
+        solver = "Held-Karp" if len(result['order']) <= tour.HELD_KARP_LIMIT else "2-opt/Or-opt"
+        method = f"TOUR ({flood} distance matrix, {solver})"
+        print("\nAll goals reached!" if not result['unreachable'] else "\nAll reachable goals reached!")
+        print("Algorithm:", method)
+        print("Map used:", input_file)
+        print(f"Goals reached: {result['order']}")
+        print(f"Total nodes expanded: {node_counts['distance_matrix'] + node_counts['stitching']}")
+        print(f"  Distance matrix: {node_counts['distance_matrix']}")
+        for source, node_count in node_counts['per_source']:
+            print(f"    {flood} from {source}: {node_count}")
+        print(f"  Stitching: {node_counts['stitching']}")
+        print(f"Final path length: {len(final_path)}")
+        if grid.costs is not None:
+            print(f"Final path cost: {pathfinding.path_cost(grid, final_path)}")
+        print(f"Final path to all goals: {convert_path_to_directions(final_path)}")
+    else:
+        print("No goal is reachable.", node_counts['distance_matrix'])
+
+    return final_path
+
+def show_search(grid_display, events, final_path):
+    """Replay the search events in the GUI, draw the final path and keep the window open."""
+    # Draw the entire final path once the replay of the search has finished
+    def show_final_path():
+        if final_path:
+            grid_display.draw_final_path(final_path)  # Draw the blue line representing the entire final path
+            grid_display.update_pathfinding_cell(final_path[-1])  # Updates path cell again so it appears on top of the final path
+
+    # Replay the search at --fps frames per second, drawing --speed expansions per frame
+    # By default the speed is picked so the replay takes at most about 30 seconds
+    fps = get_option('--fps', 10)
+    expansion_count = sum(1 for event, cell_id in events if event == pathfinding.EXPANDED)
+    expansions_per_frame = get_option('--speed', max(1, -(-expansion_count // (fps * 30))))
+    grid_display.play_events(events, fps, expansions_per_frame, show_final_path)
+
+    # Keep the GUI open after pathfinding is complete
+    grid_display.root.mainloop()
+
 def main():
+    # Headless batch mode, e.g. python script.py --batch test_cases/*.txt --algorithms ALL --jobs 4
+    if '--batch' in sys.argv:
+        import batch
+        batch.main(sys.argv[1:])
+        return
+
+    # Query service, e.g. python script.py --serve input.txt [--port 8765], answering JSON-lines path queries
+    if '--serve' in sys.argv:
+        import session
+        session.main(sys.argv[1:])
+        return
+
     if len(sys.argv) < 3:
-        print("Usage: python script.py <input_file> <algorithm> [--all-goals]")
-        print("Available algorithms: DFS, BFS, GBFS, ASTAR, CUS1, CUS2")
+        print("Usage: python script.py <input_file> <algorithm> [--all-goals] [--fps N] [--speed N] [--connectivity 4|8] [--corners blocked|cut|free]")
+        print("                                               [--stats [FILE]] [--trace-memory] [--profile]")
+        print("       python script.py <input_file> <algorithm> --all-goals --tour [--jobs N]")
+        print("       python script.py --batch <input_files...> [--algorithms ALL] [--jobs N] [--all-goals] [--tour] [--stats] [--output report.json|report.csv]")
+        print("       python script.py --serve <input_files...> [--port N] [--cache-size N]")
+        print("Available algorithms:", ", ".join(ALGORITHMS))
         sys.exit(1)
 
     input_file = sys.argv[1]
     algorithm_name = sys.argv[2]
     find_all_goals = '--all-goals' in sys.argv
 
+    # The replay divides by the frame rate, so both replay options need to be positive
+    for option in ('--fps', '--speed'):
+        if get_option(option, 1) < 1:
+            print(f"Error: {option} must be at least 1.")
+            sys.exit(1)
+
     # Read input file
     result = read_input_file(input_file)
     if result is None:
@@ -56,56 +240,69 @@ def main():
 
     rows, cols, markers, goals, walls = result
 
-    # Create the grid
-    grid = create_grid(rows, cols, markers, goals, walls)
+    # Create the grid, moving in 4 directions unless --connectivity 8 allows diagonal moves too
+    try:
+        grid = create_grid(rows, cols, markers, goals, walls, get_option('--connectivity', FOUR_CONNECTED),
+                           get_text_option('--corners', CORNERS_BLOCKED))
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
 
     # Specify the starting position of the light gray square (the marker cell)
     start_position = (markers[0][0], markers[0][1])
 
-    # Create the GUI display
+    # Create the GUI display (imported here so batch mode works without Tk)
+    from gui import display_grid_gui
     grid_display = display_grid_gui(rows, cols, markers=markers, goals=goals, walls=walls)
 
     # Select the search algorithm
     algorithm = select_algorithm(algorithm_name)
     if algorithm is None:
         print(f"Error: Algorithm '{algorithm_name}' not recognized.")
-        print("Available algorithms: DFS, BFS, GBFS, ASTAR, CUS1, CUS2")
+        print("Available algorithms:", ", ".join(ALGORITHMS))
         sys.exit(1)
 
-    # Define GUI update functions
-    def update_gui(current, visited, potential_nodes):
-        grid_display.update_potential_nodes(potential_nodes)  # Update potential nodes
-        grid_display.update_search_cells(visited)  # Update visited cells
-        grid_display.update_pathfinding_cell(current)  # Update current cell
-        time.sleep(0.1)  # Delay for visualization
+    # HPA* reads its abstract graph from the file next to the map, building and saving it on the first run
+    if algorithm_name.upper() == 'HPA':
+        hpa.abstract_graph(grid, map_file=input_file)
 
-    def clear_gui():
-        grid_display.reset()  # Reset the grid to its initial state
+    # Tour mode: plan the order of all goals from a goal-to-goal distance matrix instead of searching greedily goal by goal
+    if find_all_goals and '--tour' in sys.argv:
+        final_path = run_tour(input_file, grid, start_position, goals, get_option('--jobs', 1))
+        show_search(grid_display, [], final_path)
+        return
+
+    # The searches record their progress as events, which the GUI replays afterwards at its own pace
+    events = []
+
+    # Search metrics are only collected when asked for (--stats, --profile), the searches skip them otherwise
+    stats = None
+    if stats_output() is not None or '--profile' in sys.argv:
+        stats = SearchStats(print_phase if '--profile' in sys.argv else None, '--trace-memory' in sys.argv)
 
     # Find paths to all goals
-    current_position = start_position
-    remaining_goals = goals[:]
+    total_goal_count = 0
     total_node_count = 0
     final_path = []
+    paths = []  # Every search's path, for the optimality gaps
 
     # Display the input file and algorithm name, if all goals mode is not enabled
     if find_all_goals == False:
-        if algorithm_name.upper() == "CUS2":
-            os.system('cls' if os.name == 'nt' else 'clear')
+        os.system('cls' if os.name == 'nt' else 'clear')
+        if algorithm_name.upper() == "CUS1":
+            print(sys.argv[1], "CUS1 (IDDFS)")
+        elif algorithm_name.upper() == "CUS2":
             print(sys.argv[1], "CUS2 (Bidirectional A*)")
-        elif algorithm_name.upper() != "CUS1":
-            os.system('cls' if os.name == 'nt' else 'clear')
+        else:
             print(sys.argv[1], algorithm_name.upper())  # Display the input file and algorithm name
 
     if find_all_goals:
         os.system('cls' if os.name == 'nt' else 'clear')
         print("Finding path to all goals...")
 
-    while remaining_goals:
-        # Find the path to the closest goal
-        path, node_count = algorithm(grid, current_position, remaining_goals, update_gui, clear_gui)
+    for path, node_count in search_goals(algorithm, grid, start_position, goals, find_all_goals, events, stats):
         total_node_count += node_count
-        total_goal_count = len(goals) - len(remaining_goals)
+        paths.append(path)
 
         if path:
             # Get the reached goal from the last element of the path
@@ -120,33 +317,18 @@ def main():
             else:
                 final_path.extend(path)
 
-            # CUS1 (IDDFS) name is only printed here as it will constantly print current depth while searching
-            if algorithm_name.upper() == "CUS1" and find_all_goals == False:
-                os.system('cls' if os.name == 'nt' else 'clear')
-                print(sys.argv[1], "CUS1 (IDDFS)")
-                
             print(f"<Node {reached_goal}> {node_count}")  # Display the coordinates of the reached goal
 
             directions = convert_path_to_directions(path)
             print(directions)  # Display the directions in the console
+            if grid.costs is not None:
+                print(f"Path cost: {pathfinding.path_cost(grid, path)}")  # Only maps with terrain costs differ from the path length
 
-            # Remove the reached goal from the list of remaining goals
-            remaining_goals.remove(reached_goal)
-
-            # Update the current position to the reached goal
-            current_position = reached_goal
-
-            if not find_all_goals:
-                break  # Stop after finding the first goal if --all-goals is not specified
+            total_goal_count += 1
         else:
             print("No goal is reachable.", total_node_count)  # Display the node count when no goal is reachable
-            break
 
-    # Draw the entire final path if all goals are found
     if final_path:
-        grid_display.draw_final_path(final_path)  # Draw the blue line representing the entire final path
-        grid_display.update_pathfinding_cell(final_path[-1])  # Updates path cell again so it appears on top of the final path
-
         if find_all_goals:
             
             # Assign algorithm name 
@@ -157,18 +339,24 @@ def main():
             else:
                 method = algorithm_name.upper()   
 
-            grid_display.update_pathfinding_cell(final_path[-1])  # Updates path cell again; mainly for Bidirectional A*
             print("\nAll goals reached!")
             print("Algorithm:", method)
             print("Map used:", sys.argv[1])
             print(f"Goals reached: {goals}")
             print(f"Total nodes expanded: {total_node_count}")
             print(f"Final path length: {len(final_path)}")       
+            if grid.costs is not None:
+                print(f"Final path cost: {pathfinding.path_cost(grid, final_path)}")
             print(f"Final path to all goals: {convert_path_to_directions(final_path)}")
 
+    if stats_output() is not None:
+        gaps = None
+        if algorithm_name.upper() in INEXACT_ALGORITHMS:
+            gaps = optimality_gaps(grid, start_position, goals, paths)
+        write_stats(stats, stats_output(), gaps)
 
-    # Keep the GUI open after pathfinding is complete
-    grid_display.root.mainloop()
+    # Replay the search in the GUI and keep it open
+    show_search(grid_display, events, final_path)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,185 @@
+# session.py
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+from collections import OrderedDict
+from file_parser import MapFormatError, load_grid
+from grid import WALL_MASK, FOUR_CONNECTED, EIGHT_CONNECTED, CORNERS_BLOCKED, CORNER_RULES, create_grid
+from heuristics import goal_key
+from script import ALGORITHMS, select_algorithm, convert_path_to_directions, search_goals
+
+DEFAULT_CACHE_SIZE = 1024  # Results kept per map
+
+class MapSession:
+    """A map loaded once that answers many (start, goals, algorithm) queries, keeping recent results in an LRU cache.
+
+    The grid and the heuristic caches it feeds stay in memory for the life of the session, so a query
+    only pays for its own search. Queries may come from several threads at once.
+    """
+
+    def __init__(self, rows, cols, walls, start=None, goals=None, cache_size=DEFAULT_CACHE_SIZE, grid=None,
+                 connectivity=FOUR_CONNECTED, corner_rule=CORNERS_BLOCKED):
+        # A ready grid (walls only) can be passed instead of wall rectangles
+        self.grid = grid if grid is not None else create_grid(rows, cols, walls=walls)
+        self.grid.set_connectivity(connectivity, corner_rule)
+        self.default_start = start  # Start and goals of the map file, used when a query leaves them out
+        self.default_goals = goals or []
+        self.cache_size = cache_size
+        self.results = OrderedDict()  # (start, goal key, algorithm, all goals) -> result, least recently used first
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_file(cls, input_file, cache_size=DEFAULT_CACHE_SIZE, connectivity=FOUR_CONNECTED, corner_rule=CORNERS_BLOCKED):
+        """Load a text or binary map file, or print the reason and return None if it cannot be read."""
+        try:
+            grid, markers, goals = load_grid(input_file)
+        except (OSError, MapFormatError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return None
+        grid.cells = bytearray(bytes(grid.cells).translate(WALL_MASK))  # Keep only the walls, queries bring their own start and goals
+        return cls(grid.rows, grid.cols, None, markers[0], goals, cache_size, grid, connectivity, corner_rule)
+
+    def check_cell(self, cell):
+        """Return a (col, row) cell as a tuple, or raise ValueError if it is outside the map or a wall."""
+        cell = tuple(cell)
+        if len(cell) != 2 or not self.grid.in_bounds(cell):
+            raise ValueError(f"Cell {cell} is outside the {self.grid.cols}x{self.grid.rows} map")
+        if self.grid.is_wall(self.grid.index(cell)):
+            raise ValueError(f"Cell {cell} is a wall")
+        return cell
+
+    def query(self, start=None, goals=None, algorithm='ASTAR', all_goals=False):
+        """Find the path from start to the nearest goal (or through every goal) and return it as a result dict.
+
+        The dict holds the goals reached, the path, its directions, the node count and whether it came
+        from the cache. Cached results are shared, so callers must not change them.
+        """
+        start = self.check_cell(start if start is not None else self.default_start)
+        goals = [self.check_cell(goal) for goal in (goals if goals is not None else self.default_goals)]
+        if not isinstance(algorithm, str):
+            raise ValueError(f"Algorithm must be a name such as 'ASTAR', got {algorithm!r}")
+        algorithm_name = algorithm.upper()
+        search = select_algorithm(algorithm_name)
+        if search is None:
+            raise ValueError(f"Algorithm '{algorithm}' not recognized, available algorithms: {', '.join(ALGORITHMS)}")
+
+        key = (start, goal_key(goals), algorithm_name, all_goals)
+        with self.lock:
+            result = self.results.get(key)
+            if result is not None:
+                self.results.move_to_end(key)
+                self.hits += 1
+                return dict(result, cached=True)
+            self.misses += 1
+
+        goals_reached = []
+        final_path = []
+        total_node_count = 0
+        for path, node_count in search_goals(search, self.grid, start, goals, all_goals):
+            total_node_count += node_count
+            if path:
+                goals_reached.append(path[-1])
+                final_path.extend(path[1:] if final_path else path)
+
+        result = {
+            'goals_reached': goals_reached,
+            'path': final_path or None,
+            'directions': convert_path_to_directions(final_path),
+            'node_count': total_node_count
+        }
+        with self.lock:
+            self.results[key] = result
+            if len(self.results) > self.cache_size:
+                self.results.popitem(last=False)  # Drop the least recently used result
+        return dict(result, cached=False)
+
+def answer(sessions, line):
+    """Answer one JSON-lines request and return the JSON response line.
+
+    A request looks like {"id": 1, "map": "input.txt", "start": [0, 1], "goals": [[7, 0]], "algorithm": "ASTAR"};
+    every field is optional except "map" when more than one map is loaded.
+    """
+    response = {}
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("A request must be a JSON object")
+        response['id'] = request.get('id')
+
+        map_name = request.get('map')
+        if map_name is None and len(sessions) == 1:
+            session = next(iter(sessions.values()))
+        elif map_name in sessions:
+            session = sessions[map_name]
+        else:
+            raise ValueError(f"Unknown map {map_name!r}, loaded maps: {', '.join(sessions)}")
+
+        response.update(session.query(request.get('start'), request.get('goals'),
+                                      request.get('algorithm', 'ASTAR'), bool(request.get('all_goals', False))))
+    except (ValueError, TypeError) as e:
+        response['error'] = str(e)
+    return json.dumps(response)
+
+def serve_stdin(sessions, input_stream=sys.stdin, output_stream=sys.stdout):
+    """Answer JSON-lines requests from stdin until it is closed, one response line per request."""
+    for line in input_stream:
+        if line.strip():
+            output_stream.write(answer(sessions, line) + "\n")
+            output_stream.flush()
+
+async def serve_socket(sessions, host='127.0.0.1', port=8765):
+    """Answer JSON-lines requests over TCP. Each query runs in a worker thread, so clients are served concurrently."""
+    loop = asyncio.get_running_loop()
+
+    async def handle_client(reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    writer.write((await loop.run_in_executor(None, answer, sessions, line)).encode() + b"\n")
+                    await writer.drain()
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle_client, host, port)
+    print(f"Serving {', '.join(sessions)} on {host}:{port}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='script.py --serve', description='Load maps once and answer path queries as JSON lines.')
+    parser.add_argument('--serve', nargs='+', required=True, metavar='INPUT_FILE', help='map files to load')
+    parser.add_argument('--port', type=int, help='serve over TCP on this port instead of stdin/stdout')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on with --port (default: 127.0.0.1)')
+    parser.add_argument('--connectivity', type=int, choices=(FOUR_CONNECTED, EIGHT_CONNECTED), default=FOUR_CONNECTED, help='4 (default) or 8 to allow diagonal moves')
+    parser.add_argument('--corners', choices=CORNER_RULES, default=CORNERS_BLOCKED, help='corner rule for diagonal moves (default: blocked)')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE, help=f'results cached per map (default: {DEFAULT_CACHE_SIZE})')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    sessions = {}
+    for input_file in args.serve:
+        session = MapSession.from_file(input_file, args.cache_size, args.connectivity, args.corners)
+        if session is None:
+            sys.exit(1)
+        sessions[input_file] = session
+
+    if args.port is None:
+        serve_stdin(sessions)
+    else:
+        try:
+            asyncio.run(serve_socket(sessions, args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()
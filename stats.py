@@ -0,0 +1,94 @@
+# stats.py
+
+import time
+import tracemalloc
+
+# Phases of a search, timed separately: building the search state, the search loop, and turning parent links into the path
+SETUP = 'setup'
+SEARCH = 'search'
+RECONSTRUCTION = 'reconstruction'
+PHASES = (SETUP, SEARCH, RECONSTRUCTION)
+
+class SearchStats:
+    """Counters and timings of a search, filled in by every search it is passed to (stats=...).
+
+    The same object can be handed to several searches in a row (as search_goals does for every goal):
+    counts and times add up, peaks keep the largest value. Searches given stats=None skip all of this,
+    so collecting metrics costs nothing unless asked for.
+
+    expansions     nodes taken off the frontier and expanded (the node_count the search returns)
+    generated      nodes added to the frontier, the start and goals it is seeded with included
+    heap_pushes    entries pushed onto a priority queue (0 for searches without one)
+    stale_pops     frontier entries taken off but skipped, as their node had already been expanded
+    peak_frontier  largest number of entries on the frontier at once
+    peak_memory    peak bytes allocated during a search, only measured with trace_memory (None otherwise)
+
+    profiler, if given, is called as profiler(phase, seconds, stats) as each phase of each search ends.
+    """
+
+    def __init__(self, profiler=None, trace_memory=False):
+        self.profiler = profiler
+        self.trace_memory = trace_memory
+        self.searches = 0
+        self.expansions = 0
+        self.generated = 0
+        self.heap_pushes = 0
+        self.stale_pops = 0
+        self.peak_frontier = 0
+        self.peak_memory = None
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.phase_start = None
+        self.started_tracing = False
+        self.memory_base = 0
+
+    def begin(self):
+        """Start timing a search (its setup phase first)."""
+        if self.trace_memory:
+            # Measure from here; a trace someone else started is left running when the search ends
+            self.started_tracing = not tracemalloc.is_tracing()
+            if self.started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self.memory_base = tracemalloc.get_traced_memory()[0]
+        self.phase_start = time.perf_counter()
+
+    def phase(self, name):
+        """End the phase with the given name, adding its time and passing it to the profiler."""
+        now = time.perf_counter()
+        seconds = now - self.phase_start
+        self.times[name] += seconds
+        self.phase_start = now
+        if self.profiler is not None:
+            self.profiler(name, seconds, self)
+
+    def end(self, phase, expansions, generated, heap_pushes=0, stale_pops=0, peak_frontier=0):
+        """End the last phase of a search and add its counters."""
+        self.phase(phase)
+        self.searches += 1
+        self.expansions += expansions
+        self.generated += generated
+        self.heap_pushes += heap_pushes
+        self.stale_pops += stale_pops
+        self.peak_frontier = max(self.peak_frontier, peak_frontier)
+        if self.trace_memory:
+            peak = tracemalloc.get_traced_memory()[1] - self.memory_base
+            self.peak_memory = max(self.peak_memory or 0, peak)
+            if self.started_tracing:
+                tracemalloc.stop()
+
+    def total_time(self):
+        return sum(self.times.values())
+
+    def as_dict(self):
+        """The metrics as plain JSON-ready values."""
+        return {
+            'searches': self.searches,
+            'expansions': self.expansions,
+            'generated': self.generated,
+            'heap_pushes': self.heap_pushes,
+            'stale_pops': self.stale_pops,
+            'peak_frontier': self.peak_frontier,
+            'peak_memory': self.peak_memory,
+            'times': dict(self.times),
+            'total_time': self.total_time()
+        }
@@ -0,0 +1,74 @@
+# test_pathfinding.py
+
+import random
+import hpa
+import pathfinding
+import script
+from grid import FOUR_CONNECTED, EIGHT_CONNECTED, create_grid
+
+def band_map():
+    # An expensive band across the middle of a 4-connected map, with a cheap gap at the far right:
+    # the straight path down the left costs far more than the detour through the gap
+    walls = [(0, 3, 9, 1, 50)]
+    return create_grid(7, 10, [(0, 0)], [(0, 6)], walls, FOUR_CONNECTED)
+
+def random_terrain_maps(seed, connectivity, count=200):
+    # Yield (grid, start, goals) for small random maps with walls and terrain, skipping starts inside walls
+    rng = random.Random(seed)
+    for _ in range(count):
+        rows, cols = rng.randint(2, 16), rng.randint(2, 16)
+        walls = [(rng.randrange(cols), rng.randrange(rows), rng.randint(1, 3), rng.randint(1, 3))
+                 for _ in range(rng.randint(0, rows * cols // 8))]
+        walls += [(rng.randrange(cols), rng.randrange(rows), rng.randint(1, 6), rng.randint(1, 6), rng.randint(2, 40))
+                  for _ in range(rng.randint(1, 4))]
+        start = (rng.randrange(cols), rng.randrange(rows))
+        goals = [(rng.randrange(cols), rng.randrange(rows)) for _ in range(rng.randint(1, 2))]
+        grid = create_grid(rows, cols, [start], goals, walls, connectivity)
+        if not grid.is_wall(grid.index(start)):
+            yield grid, start, goals
+
+def assert_same_cost_as_ucs(search, grid, start, goals):
+    path, _ = search(grid, start, goals)
+    optimal, _ = pathfinding.ucs(grid, start, goals)
+    assert (path is None) == (optimal is None)
+    if path is not None:
+        assert path[0] == start and path[-1] in goals
+        assert pathfinding.path_cost(grid, path) == pathfinding.path_cost(grid, optimal)
+
+def test_jps_pays_terrain_costs_on_four_connected_maps():
+    grid = band_map()
+    path, _ = pathfinding.jps(grid, (0, 0), [(0, 6)])
+    assert pathfinding.path_cost(grid, path) == 24
+    assert_same_cost_as_ucs(pathfinding.jps, grid, (0, 0), [(0, 6)])
+
+def test_jps_matches_ucs_cost_on_random_terrain_maps():
+    for grid, start, goals in random_terrain_maps(17, FOUR_CONNECTED):
+        assert_same_cost_as_ucs(pathfinding.jps, grid, start, goals)
+
+def test_hpa_pays_terrain_costs():
+    grid = band_map()
+    path, _ = hpa.hpa_star(grid, (0, 0), [(0, 6)])
+    assert pathfinding.path_cost(grid, path) == 24
+
+def test_hpa_matches_ucs_cost_on_random_terrain_maps():
+    for connectivity in (FOUR_CONNECTED, EIGHT_CONNECTED):
+        for grid, start, goals in random_terrain_maps(23, connectivity):
+            assert_same_cost_as_ucs(hpa.hpa_star, grid, start, goals)
+
+def test_bidirectional_astar_pays_terrain_costs():
+    grid = band_map()
+    path, _ = pathfinding.bidirectional_astar(grid, (0, 0), [(0, 6)])
+    assert pathfinding.path_cost(grid, path) == 24
+
+def test_bidirectional_astar_matches_ucs_cost_on_random_terrain_maps():
+    for connectivity in (FOUR_CONNECTED, EIGHT_CONNECTED):
+        for grid, start, goals in random_terrain_maps(29, connectivity):
+            assert_same_cost_as_ucs(pathfinding.bidirectional_astar, grid, start, goals)
+
+def test_optimality_gaps_follow_the_searches_from_goal_to_goal():
+    grid = band_map()
+    straight = [(0, row) for row in range(7)]  # Through the expensive band: costs 55, against 21 to (3, 6) through the gap
+    along = [(col, 6) for col in range(4)]
+    gaps = script.optimality_gaps(grid, (0, 0), [(3, 6), (0, 6)], [straight, along])
+    assert gaps == [{'cost': 55, 'optimal': 21, 'gap': (55 - 21) / 21}, {'cost': 3, 'optimal': 3, 'gap': 0.0}]
+    assert script.optimality_gaps(grid, (0, 0), [(0, 6)], [None]) == [{'cost': None, 'optimal': 24, 'gap': None}]
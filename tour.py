@@ -0,0 +1,287 @@
+# tour.py
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from pathfinding import new_parent_array, reconstruct_path, ids_to_cells
+
+# Largest number of goals solved exactly with Held-Karp; O(2^n * n^2) gets slow in Python beyond this
+HELD_KARP_LIMIT = 12
+
+UNREACHABLE = -1  # Distance marker for cells the flood never reached
+
+def bfs_from(grid, source, targets):
+    """Breadth-first flood from one cell until every target is reached (or the region is exhausted).
+
+    Returns (distances, paths, node_count), where distances[i] is the step count to targets[i]
+    (UNREACHABLE if it cannot be reached) and paths[i] is the (col, row) path to it, or None.
+    """
+    source_id = grid.index(source)
+    target_ids = [grid.index(target) for target in targets]
+    remaining = set(target_ids)
+    remaining.discard(source_id)
+
+    distance = array('i', [UNREACHABLE]) * grid.size
+    parent = new_parent_array(grid)
+    distance[source_id] = 0
+
+    masks, moves = grid.neighbor_table()  # Open neighbours of a cell: current + offset for offset in moves[masks[current]]
+
+    # Preallocated FIFO queue, each cell is enqueued at most once
+    queue = array('i', [0]) * grid.size
+    queue[0] = source_id
+    head, tail = 0, 1
+    node_count = 0
+
+    while head < tail and remaining:
+        current = queue[head]
+        head += 1
+        node_count += 1
+        for offset in moves[masks[current]]:
+            neighbor = current + offset
+            if distance[neighbor] == UNREACHABLE:
+                distance[neighbor] = distance[current] + 1
+                parent[neighbor] = current
+                queue[tail] = neighbor
+                tail += 1
+                remaining.discard(neighbor)
+
+    distances = [distance[target_id] for target_id in target_ids]
+    paths = [ids_to_cells(grid, reconstruct_path(parent, target_id)) if distance[target_id] != UNREACHABLE else None
+             for target_id in target_ids]
+    return distances, paths, node_count
+
+def dijkstra_from(grid, source, targets):
+    """Cheapest-first flood from one cell over a grid with terrain, until every target is settled.
+
+    Same results as bfs_from, with distances[i] the cost of the cheapest path to targets[i] (every step
+    costs what it costs to enter the cell it leads to). Uses the same bucket queue as pathfinding.ucs.
+    """
+    source_id = grid.index(source)
+    target_ids = [grid.index(target) for target in targets]
+    remaining = set(target_ids)
+    remaining.discard(source_id)
+
+    costs = grid.costs
+    distance = array('i', [UNREACHABLE]) * grid.size
+    parent = new_parent_array(grid)
+    distance[source_id] = 0
+    settled = bytearray(grid.size)
+
+    masks, moves = grid.neighbor_table()  # Open neighbours of a cell: current + offset for offset in moves[masks[current]]
+
+    # One list of cell ids per cost, reused round-robin: nothing is ever more than the largest step cost ahead
+    bucket_count = max(costs) + 1
+    buckets = [[] for _ in range(bucket_count)]
+    buckets[0].append(source_id)
+    queued = 1
+    cost = 0
+    node_count = 0
+
+    while queued and remaining:
+        slot = cost % bucket_count
+        bucket = buckets[slot]
+        buckets[slot] = []
+        queued -= len(bucket)
+
+        for current in bucket:
+            if settled[current]:
+                continue  # Left behind when a cheaper way to the cell was found
+            settled[current] = 1
+            remaining.discard(current)
+            node_count += 1
+            for offset in moves[masks[current]]:
+                neighbor = current + offset
+                new_cost = cost + costs[neighbor]
+                if not settled[neighbor] and (distance[neighbor] == UNREACHABLE or new_cost < distance[neighbor]):
+                    distance[neighbor] = new_cost
+                    parent[neighbor] = current
+                    buckets[new_cost % bucket_count].append(neighbor)
+                    queued += 1
+        cost += 1
+
+    distances = [distance[target_id] for target_id in target_ids]
+    paths = [ids_to_cells(grid, reconstruct_path(parent, target_id)) if distance[target_id] != UNREACHABLE else None
+             for target_id in target_ids]
+    return distances, paths, node_count
+
+def distance_matrix(grid, points, jobs=1):
+    """Run one BFS per point (Dijkstra on grids with terrain) to get the all-pairs distances and the paths between the points.
+
+    Returns (matrix, paths, node_counts): matrix[i][j] is the distance from points[i] to points[j],
+    paths[i][j] the path between them, and node_counts[i] the nodes expanded by the flood from points[i].
+    With terrain the matrix is not symmetric, as a path costs its cells except the one it starts from.
+    """
+    flood = bfs_from if grid.costs is None else dijkstra_from
+    if jobs == 1 or len(points) < 2:
+        results = [flood(grid, point, points) for point in points]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(flood, [grid] * len(points), points, [points] * len(points)))
+
+    matrix = [result[0] for result in results]
+    paths = [result[1] for result in results]
+    node_counts = [result[2] for result in results]
+    return matrix, paths, node_counts
+
+def tour_length(order, matrix):
+    """Total distance of an open tour that visits the point indexes in order."""
+    return sum(matrix[order[i]][order[i + 1]] for i in range(len(order) - 1))
+
+def held_karp(matrix, goals):
+    """Exact shortest open tour from point 0 through every goal index, by dynamic programming over subsets."""
+    count = len(goals)
+    if count == 0:
+        return [0]
+
+    full = (1 << count) - 1
+    infinity = float('inf')
+    # cost[mask][j]: shortest route from the start through the goals in mask, ending at goal j
+    cost = [[infinity] * count for _ in range(full + 1)]
+    previous = [[-1] * count for _ in range(full + 1)]
+    for j in range(count):
+        cost[1 << j][j] = matrix[0][goals[j]]
+
+    for mask in range(1, full + 1):
+        for j in range(count):
+            if not mask & (1 << j) or cost[mask][j] == infinity:
+                continue
+            for k in range(count):
+                if mask & (1 << k):
+                    continue
+                next_mask = mask | (1 << k)
+                new_cost = cost[mask][j] + matrix[goals[j]][goals[k]]
+                if new_cost < cost[next_mask][k]:
+                    cost[next_mask][k] = new_cost
+                    previous[next_mask][k] = j
+
+    # Walk back from the cheapest final goal
+    last = min(range(count), key=lambda j: cost[full][j])
+    order = []
+    mask = full
+    while last != -1:
+        order.append(goals[last])
+        mask, last = mask ^ (1 << last), previous[mask][last]
+    order.append(0)
+    order.reverse()
+    return order
+
+def nearest_neighbour(matrix, goals):
+    """Greedy open tour from point 0, always moving to the closest unvisited goal."""
+    order = [0]
+    remaining = set(goals)
+    while remaining:
+        closest = min(remaining, key=lambda goal: (matrix[order[-1]][goal], goal))
+        order.append(closest)
+        remaining.remove(closest)
+    return order
+
+def two_opt(order, matrix):
+    """Reverse tour segments while that shortens the open tour. The start (index 0) stays in place."""
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(order) - 1):
+            reversal = 0  # Change in the edges inside order[i..j] when they are walked backwards (0 if the matrix is symmetric)
+            for j in range(i + 1, len(order)):
+                a, b, c = order[i - 1], order[i], order[j]
+                reversal += matrix[c][order[j - 1]] - matrix[order[j - 1]][c]
+                delta = matrix[a][c] - matrix[a][b] + reversal
+                if j + 1 < len(order):
+                    e = order[j + 1]
+                    delta += matrix[b][e] - matrix[c][e]
+                if delta < 0:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    improved = True
+                    reversal = sum(matrix[y][x] - matrix[x][y] for x, y in zip(order[i:j], order[i + 1:j + 1]))
+    return order
+
+def or_opt(order, matrix):
+    """Move runs of 1 to 3 consecutive goals (possibly reversed) to a better place while that shortens the open tour."""
+    improved = True
+    while improved:
+        improved = False
+        for length in (1, 2, 3):
+            for i in range(1, len(order) - length + 1):
+                segment = order[i:i + length]
+                previous = order[i - 1]
+                following = order[i + length] if i + length < len(order) else None
+
+                # Distance saved by taking the segment out of the tour
+                saving = matrix[previous][segment[0]]
+                if following is not None:
+                    saving += matrix[segment[-1]][following] - matrix[previous][following]
+
+                rest = order[:i] + order[i + length:]
+                # Change in the edges inside the segment when it is put back reversed (0 if the matrix is symmetric)
+                reversal = sum(matrix[y][x] - matrix[x][y] for x, y in zip(segment, segment[1:]))
+                best = None
+                for position in range(1, len(rest) + 1):
+                    if position == i:
+                        continue  # Same place as before
+                    before = rest[position - 1]
+                    after = rest[position] if position < len(rest) else None
+                    for first, last, reverse in ((segment[0], segment[-1], False), (segment[-1], segment[0], True)):
+                        # Distance added by putting the segment back between before and after
+                        cost = matrix[before][first] + (reversal if reverse else 0)
+                        if after is not None:
+                            cost += matrix[last][after] - matrix[before][after]
+                        if cost < saving and (best is None or cost < best[0]):
+                            best = (cost, position, reverse)
+
+                if best is not None:
+                    cost, position, reverse = best
+                    order[:] = rest[:position] + (segment[::-1] if reverse else segment) + rest[position:]
+                    improved = True
+                    break
+            if improved:
+                break
+    return order
+
+def solve_order(matrix, goals):
+    """Pick the visiting order of the goal indexes: exact for small goal counts, heuristic otherwise."""
+    if len(goals) <= HELD_KARP_LIMIT:
+        return held_karp(matrix, goals)
+
+    order = nearest_neighbour(matrix, goals)
+    improved = True
+    while improved:
+        length = tour_length(order, matrix)
+        two_opt(order, matrix)
+        or_opt(order, matrix)
+        improved = tour_length(order, matrix) < length
+    return order
+
+def solve_tour(grid, start, goals, jobs=1):
+    """Find a short path from the start through every reachable goal.
+
+    Returns a dict with the visiting order of the goals, the path segment to each goal, the stitched
+    final path, the goals that cannot be reached, and the node counts of each phase.
+    """
+    points = [start] + list(goals)
+    matrix, paths, node_counts = distance_matrix(grid, points, jobs)
+
+    # Goals the start cannot reach are left out of the tour
+    reachable = [i for i in range(1, len(points)) if matrix[0][i] != UNREACHABLE]
+    unreachable = [points[i] for i in range(1, len(points)) if matrix[0][i] == UNREACHABLE]
+
+    order = solve_order(matrix, reachable)
+
+    # Stitch the cached sub-paths together
+    segments = []
+    final_path = [start]
+    for i in range(len(order) - 1):
+        segment = paths[order[i]][order[i + 1]]
+        segments.append(segment)
+        final_path.extend(segment[1:])
+
+    return {
+        'order': [points[i] for i in order[1:]],
+        'segments': segments,
+        'path': final_path if segments else None,
+        'unreachable': unreachable,
+        'node_counts': {
+            'distance_matrix': sum(node_counts),
+            'per_source': list(zip(points, node_counts)),
+            'stitching': 0  # The sub-paths come from the flood trees, so no further nodes are expanded
+        }
+    }
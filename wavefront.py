@@ -0,0 +1,175 @@
+# wavefront.py
+
+import sys
+from array import array
+from grid import OPEN_MASK
+from pathfinding import NO_SCORE, ids_to_cells
+
+# Whole-grid breadth-first search that grows the frontier one layer at a time with big-integer bit operations.
+# Every cell is one bit of a Python integer (bit cell_id), so moving the whole frontier one step in a direction
+# is a single shift, and walls, grid edges and the corner rule are a single AND with the bitmask of the cells
+# that allow that move, read off the grid's neighbour table. No Python code runs per cell while the wave grows;
+# the distances are kept as bit-planes and only turned into a per-cell array at the end.
+
+NO_DIRECTION = 255  # Parent direction of the sources and of the cells no source can reach
+
+CELL_DIGITS = bytes.maketrans(b'\x00\x01', b'01')  # 0/1 bytes per cell to binary digits
+DIGIT_CELLS = bytes.maketrans(b'01', b'\x00\x01')  # And back
+# A layer with at most size // NARROW_LAYER_RATIO cells is cheaper to grow cell by cell from a queue than with
+# whole-grid bitmask operations (corridors and mazes have thousands of such layers); the queue hands back to the
+# bitmasks once a layer is WIDE_LAYER_FACTOR times past that, so a wave wobbling around the limit does not keep switching
+NARROW_LAYER_RATIO = 400
+WIDE_LAYER_FACTOR = 4
+
+MOVE_DIGITS = [bytes(b'1'[0] if mask >> move & 1 else b'0'[0] for mask in range(256)) for move in range(8)]  # Neighbour masks to the digit of one move
+
+def cells_to_bits(cell_bytes):
+    """Turn one 0/1 byte per cell id into an integer with bit cell_id set for the 1s."""
+    return int(bytes(cell_bytes)[::-1].translate(CELL_DIGITS) or b'0', 2)
+
+def bits_to_cells(bits, size):
+    """Turn an integer bitmask back into one 0/1 byte per cell id, as a little-endian integer of those bytes."""
+    return int.from_bytes(bin(bits)[2:].zfill(size)[::-1].encode().translate(DIGIT_CELLS), 'little')
+
+def distance_field(grid, sources):
+    """Breadth-first step distances from the nearest of the (col, row) sources to every cell.
+
+    Returns (distance, direction): distance is an array('i') by cell id, NO_SCORE where no source can be
+    reached, and direction a bytearray with, for every other cell, the move towards its parent one step
+    closer to a source, so parent = cell_id + grid.move_offsets[direction]. Sources and unreached cells
+    get NO_DIRECTION. Between equally close parents the first move in UP, LEFT, DOWN, RIGHT order
+    (then the diagonals) wins. Sources inside walls reach nothing.
+    """
+    size = grid.size
+    everything = (1 << size) - 1
+    masks, _ = grid.neighbor_table()
+    offsets = grid.move_offsets[:grid.connectivity]
+
+    # Per move, the cells whose neighbour that way can be stepped onto (walls are masked out by remaining)
+    allowed = [int(bytes(masks[::-1]).translate(MOVE_DIGITS[move]), 2) for move in range(len(offsets))]
+    open_bits = cells_to_bits(bytes(grid.cells).translate(OPEN_MASK))
+    remaining = open_bits  # Open cells no layer has claimed yet
+
+    frontier = 0
+    for source in sources:
+        frontier |= 1 << grid.index(source)
+    frontier &= remaining
+    remaining &= ~frontier
+    source_bits = frontier
+    frontier_ids = None  # The frontier as a list of cell ids while the layers are narrow, None while it is a bitmask
+
+    parents = [0] * len(offsets)  # Per move, the cells whose parent lies that way
+    planes = []  # planes[bit] holds the cells whose distance has that bit set
+    queue_distance = queue_direction = None  # Per cell, for the cells claimed by queue layers
+    queue_cells = []
+    narrow = size // NARROW_LAYER_RATIO
+    distance = 0
+    while frontier:
+        distance += 1
+
+        if frontier_ids is None and frontier.bit_count() <= narrow:
+            # Too few cells to pay for whole-grid operations: carry on with a plain queue, one layer at a time
+            if queue_distance is None:
+                queue_distance = array('i', [NO_SCORE]) * size
+                queue_direction = bytearray([NO_DIRECTION]) * size
+                steps = [tuple((offsets[move], move ^ 2) for move in range(len(offsets)) if mask >> move & 1) for mask in range(256)]
+            unclaimed = bytearray(bits_to_cells(remaining, size).to_bytes(size, 'little'))
+            frontier_bytes = bits_to_cells(frontier, size).to_bytes(size, 'little')
+            frontier_ids = []
+            cell_id = frontier_bytes.find(1)
+            while cell_id != -1:
+                frontier_ids.append(cell_id)
+                cell_id = frontier_bytes.find(1, cell_id + 1)
+
+        if frontier_ids is not None:
+            layer_ids = []
+            for current in frontier_ids:
+                for offset, back in steps[masks[current]]:
+                    neighbor = current + offset
+                    if unclaimed[neighbor]:
+                        unclaimed[neighbor] = 0
+                        queue_distance[neighbor] = distance
+                        queue_direction[neighbor] = back
+                        layer_ids.append(neighbor)
+                    elif queue_distance[neighbor] == distance and back < queue_direction[neighbor]:
+                        queue_direction[neighbor] = back  # Same tie-break as the bitmask layers: the first move wins
+            queue_cells += layer_ids
+            frontier_ids = layer_ids
+            if len(layer_ids) <= WIDE_LAYER_FACTOR * narrow:
+                frontier = len(layer_ids)  # Only its truth value matters until the layer widens again
+                continue
+
+            # Wide again: back to bitmasks
+            frontier_bytes = bytearray(size)
+            for cell_id in layer_ids:
+                frontier_bytes[cell_id] = 1
+            frontier = cells_to_bits(frontier_bytes)
+            remaining = cells_to_bits(unclaimed)
+            frontier_ids = None
+            continue
+
+        unclaimed_before = remaining
+        for move, offset in enumerate(offsets):
+            # A cell joins the layer if its neighbour this way is on the frontier, i.e. shift the frontier back by the offset
+            step = (frontier >> offset if offset > 0 else frontier << -offset) & allowed[move] & remaining
+            if step:
+                remaining ^= step  # Claimed, so the later moves in tie-break order skip these cells
+                if move:
+                    parents[move] |= step  # Move 0 is whatever is left over at the end, no need to track it
+        layer = unclaimed_before ^ remaining
+
+        while distance.bit_length() > len(planes):
+            planes.append(0)
+        for bit in range(len(planes)):
+            if distance >> bit & 1:
+                planes[bit] |= layer
+        frontier = layer
+
+    # Spread every plane to one byte per cell so that byte k of the distances is just planes 8k to 8k + 7
+    # shifted into place; the unreached cells get every bit set, which is NO_SCORE in two's complement
+    # (cells claimed by queue layers may still count as unreached here, they are filled in below)
+    unreached_bits = (everything ^ open_bits) | remaining
+    unreached = bits_to_cells(unreached_bits, size) * 0xFF
+    spread = [bits_to_cells(plane, size) for plane in planes]
+    distance_bytes = bytearray(4 * size)
+    for k in range(4):
+        value = unreached
+        for bit, plane in enumerate(spread[8 * k:8 * k + 8]):
+            value |= plane << bit
+        distance_bytes[k::4] = value.to_bytes(size, 'little')
+    distances = array('i')
+    distances.frombytes(distance_bytes)
+    if sys.byteorder == 'big':
+        distances.byteswap()
+
+    # Every reached cell other than a source has exactly one parent move, so the move numbers simply add up
+    direction = bits_to_cells(unreached_bits | source_bits, size) * NO_DIRECTION
+    for move in range(1, len(parents)):
+        direction += bits_to_cells(parents[move], size) * move
+    direction = bytearray(direction.to_bytes(size, 'little'))
+
+    # The queue layers left their cells out of the bitmasks, so fill those in one by one
+    for cell_id in queue_cells:
+        distances[cell_id] = queue_distance[cell_id]
+        direction[cell_id] = queue_direction[cell_id]
+    return distances, direction
+
+def field_path(grid, field, cell):
+    """Shortest path from the nearest source of a distance_field to a (col, row) cell, as (col, row) cells
+    starting at the source, or None if no source can reach the cell.
+
+    With the search start as the only source this is a shortest path to any goal, the same length as the one
+    bfs finds, without searching again. The cells can differ from bfs's path, since ties between equally close
+    parents go by move order (see distance_field) rather than by the order bfs queued them.
+    """
+    distances, direction = field
+    cell_id = grid.index(cell)
+    if distances[cell_id] == NO_SCORE:
+        return None
+    offsets = grid.move_offsets
+    path = [cell_id]
+    while direction[cell_id] != NO_DIRECTION:
+        cell_id += offsets[direction[cell_id]]
+        path.append(cell_id)
+    path.reverse()  # Reverse the path to get from the source to the cell
+    return ids_to_cells(grid, path)